@@ -1,32 +1,35 @@
 import argparse
 
+import numpy as np
 import matplotlib.pyplot as plt
 
 from hvqadata.util.func import get_video_dicts, increment_in_map_, append_in_dict_
-from hvqadata.util.definitions import CHANGE_COLOUR_LENGTH
-
-
-def extract_event(event):
-    if event[0:CHANGE_COLOUR_LENGTH] == "change colour":
-        event = "change colour"
-
-    return event
+from hvqadata.util.definitions import EVENTS, COLOURS
+from hvqadata.util.tables import load_tables
+from hvqadata.util.schema import video_frames
+from hvqadata.util.vocab import CLASS_CODES, EAT_FISH, event_type, parse_events
 
 
 def count_events(video_dicts):
-    event_list = []
+    event_codes = [np.zeros(0, dtype=np.int32)]
     num_frame_changes = 0
     for video in video_dicts:
         events = video["events"]
         num_frame_changes += len(events)
-        flat_events = [event for subevents in events for event in subevents]
-        events = [extract_event(event) for event in flat_events]
-        event_list.extend(events)
+        event_codes.append(parse_events(events)[0])
+
+    event_types = event_type(np.concatenate(event_codes))
+    event_dict = {EVENTS[code]: num for code, num in _first_seen_counts(event_types)}
+    _print_events(event_dict, num_frame_changes)
 
-    event_dict = {}
-    for event in event_list:
-        increment_in_map_(event_dict, event)
 
+def count_events_table(tables):
+    num_frame_changes = int(tables["videos"]["num_transitions"].sum())
+    event_dict = {EVENTS[code]: num for code, num in _first_seen_counts(tables["events"]["event_code"])}
+    _print_events(event_dict, num_frame_changes)
+
+
+def _print_events(event_dict, num_frame_changes):
     print(f"{'Event name' :<20}{'Occurrences' :<15}Frequency")
     for event, num in event_dict.items():
         print(f"{event:<20}{num:<15}{(num / num_frame_changes) * 100:.3g}%")
@@ -39,7 +42,7 @@ def count_colours(video_dicts):
     octo_colours = {}
     num_frames = 0
     for video in video_dicts:
-        frames = video["frames"]
+        frames = video_frames(video)
         for frame in frames:
             num_frames += 1
             objects = frame["objects"]
@@ -49,6 +52,21 @@ def count_colours(video_dicts):
                 elif obj["class"] == "octopus":
                     increment_in_map_(octo_colours, obj["colour"])
 
+    _print_colours(rock_colours, octo_colours, num_frames)
+
+
+def count_colours_table(tables):
+    objects = tables["objects"]
+    num_frames = int(tables["videos"]["num_frames"].sum())
+    colour_dicts = []
+    for cls in ["rock", "octopus"]:
+        colour_codes = objects["colour_code"][objects["class_code"] == CLASS_CODES[cls]]
+        colour_dicts.append({COLOURS[code]: num for code, num in _first_seen_counts(colour_codes)})
+
+    _print_colours(*colour_dicts, num_frames)
+
+
+def _print_colours(rock_colours, octo_colours, num_frames):
     print(f"{'Rock colour' :<20}{'Occurrences' :<15}Frequency")
     for colour, num in rock_colours.items():
         print(f"{colour:<20}{num:<15}{(num / num_frames) * 100:.3g}%")
@@ -64,7 +82,7 @@ def count_rotations(video_dicts):
     rotations = {}
     num_frames = 0
     for video in video_dicts:
-        frames = video["frames"]
+        frames = video_frames(video)
         for frame in frames:
             num_frames += 1
             objects = frame["objects"]
@@ -72,6 +90,17 @@ def count_rotations(video_dicts):
                 if obj["class"] == "octopus":
                     increment_in_map_(rotations, obj["rotation"])
 
+    _print_rotations(rotations, num_frames)
+
+
+def count_rotations_table(tables):
+    objects = tables["objects"]
+    num_frames = int(tables["videos"]["num_frames"].sum())
+    rotations = objects["rotation"][objects["class_code"] == CLASS_CODES["octopus"]]
+    _print_rotations(dict(_first_seen_counts(rotations)), num_frames)
+
+
+def _print_rotations(rotations, num_frames):
     print(f"{'Octopus rotations' :<20}{'Occurrences' :<15}Frequency")
     for rotation, num in rotations.items():
         print(f"{rotation:<20}{num:<15}{(num / num_frames) * 100:.3g}%")
@@ -83,15 +112,27 @@ def count_fish_eaten(video_dicts):
     fish_eaten = {}
     num_videos = 0
     for video in video_dicts:
-        events = video["events"]
+        event_codes, frame_idxs = parse_events(video["events"])
         num_videos += 1
-        num_fish_eaten = 0
-        for event_list in events:
-            if "eat fish" in event_list:
-                num_fish_eaten += 1
-
+        num_fish_eaten = len(np.unique(frame_idxs[event_codes == EAT_FISH]))
         increment_in_map_(fish_eaten, num_fish_eaten)
 
+    _print_fish_eaten(fish_eaten, num_videos)
+
+
+def count_fish_eaten_table(tables):
+    events = tables["events"]
+    num_videos = len(tables["videos"]["video_id"])
+
+    # Count the frame changes of each video with a fish eaten
+    video_idxs = np.repeat(np.arange(num_videos), tables["videos"]["num_events"])
+    eaten = events["event_code"] == EAT_FISH
+    keys = np.unique(video_idxs[eaten] * 256 + events["frame_idx"][eaten])
+    num_fish_eaten = np.bincount(keys // 256, minlength=num_videos)
+    _print_fish_eaten(dict(_first_seen_counts(num_fish_eaten)), num_videos)
+
+
+def _print_fish_eaten(fish_eaten, num_videos):
     fish_eaten = fish_eaten.items()
     fish_eaten = sorted(fish_eaten, key=lambda eaten: eaten[0])
 
@@ -109,6 +150,14 @@ def analyse_questions(video_dicts):
         for question in question_types:
             increment_in_map_(counts, question)
 
+    _show_questions(counts)
+
+
+def analyse_questions_table(tables):
+    _show_questions(dict(_first_seen_counts(tables["qa"]["question_type"])))
+
+
+def _show_questions(counts):
     num_questions = sum([cnt for _, cnt in counts.items()])
 
     counts = counts.items()
@@ -154,6 +203,32 @@ def analyse_answers(video_dicts):
             answer = video["answers"][q_idx]
             append_in_dict_(q_type_video_dict_map, q_type, (question, answer))
 
+    _analyse_qa_pairs(q_type_video_dict_map)
+
+
+def analyse_answers_table(tables):
+    qa = tables["qa"]
+    q_type_video_dict_map = {}
+    for q_type, question, answer in zip(qa["question_type"].tolist(), qa["question"].tolist(), qa["answer"].tolist()):
+        append_in_dict_(q_type_video_dict_map, q_type, (question, answer))
+
+    _analyse_qa_pairs(q_type_video_dict_map)
+
+
+def _first_seen_counts(values):
+    """
+    Count each distinct value of a numpy array
+
+    :param values: Numpy array
+    :return: List of (value, count), in order of first occurrence
+    """
+
+    distinct, first_idxs, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.argsort(first_idxs)
+    return list(zip(distinct[order].tolist(), counts[order].tolist()))
+
+
+def _analyse_qa_pairs(q_type_video_dict_map):
     _analyse_q_0(q_type_video_dict_map[0])
     _analyse_q_1(q_type_video_dict_map[1])
     _analyse_q_2(q_type_video_dict_map[2])
@@ -281,7 +356,11 @@ def _analyse_q_8(qa_pairs):
     _print_cnt_dict(answers, "Answer")
 
 
-def main(data_dir, events, colours, rotations, fish, questions, answers):
+def main(data_dir, events, colours, rotations, fish, questions, answers, tables):
+    if tables:
+        main_tables(data_dir, events, colours, rotations, fish, questions, answers)
+        return
+
     video_dicts = get_video_dicts(data_dir)
 
     if events:
@@ -309,6 +388,34 @@ def main(data_dir, events, colours, rotations, fish, questions, answers):
         analyse_answers(video_dicts)
 
 
+def main_tables(tables_file, events, colours, rotations, fish, questions, answers):
+    tables = load_tables(tables_file)
+
+    if events:
+        print("\nAnalysing event occurrences...")
+        count_events_table(tables)
+
+    if colours:
+        print("\nAnalysing object colours...")
+        count_colours_table(tables)
+
+    if rotations:
+        print("\nAnalysing octopus rotations...")
+        count_rotations_table(tables)
+
+    if fish:
+        print("\nAnalysing number of fish eaten...")
+        count_fish_eaten_table(tables)
+
+    if questions:
+        print("\nAnalysing question distribution...")
+        analyse_questions_table(tables)
+
+    if answers:
+        print("\nAnalysing distributions of answers to questions...")
+        analyse_answers_table(tables)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Script for analysing built dataset")
     parser.add_argument("-e", "--events", action="store_true", default=False)
@@ -317,6 +424,8 @@ if __name__ == '__main__':
     parser.add_argument("-f", "--fish", action="store_true", default=False)
     parser.add_argument("-q", "--questions", action="store_true", default=False)
     parser.add_argument("-a", "--answers", action="store_true", default=False)
+    parser.add_argument("-t", "--tables", action="store_true", default=False,
+                        help="Analyse tables exported with 'python -m hvqadata.export tables', given as data_dir")
     parser.add_argument("data_dir", type=str)
     args = parser.parse_args()
     main(args.data_dir,
@@ -325,4 +434,5 @@ if __name__ == '__main__':
          args.rotations,
          args.fish,
          args.questions,
-         args.answers)
+         args.answers,
+         args.tables)
@@ -1,75 +1,849 @@
+import io
+import os
+import time
+import zlib
 import json
 import argparse
 import shutil
+import random
+import numpy as np
 from PIL import Image
 from pathlib import Path
 
 from hvqadata.video.video import Video
-from hvqadata.draw import Drawer
+from hvqadata.draw import Drawer, PALETTE_RGB
+from hvqadata.util.backend import BACKENDS, set_backend
+from hvqadata.util.func import video_rng, parallel_imap, print_progress
+from hvqadata.util.definitions import NUM_FRAMES, FRAME_SIZE
+from hvqadata.util.writer import AsyncWriter, WriterStats
+from hvqadata.util.manifest import BuildManifest, file_record
+from hvqadata.util.jobs import JobTable
+from hvqadata.util.layout import DatasetLayout, LAYOUTS, FLAT, JSON_FORMATS, FILES, JSONL, LAYOUT_FILE
+from hvqadata.util.compression import COMPRESSIONS, NONE, ZSTD, DICT_SAMPLES, JsonCodec, train_dictionary
+from hvqadata.util.schema import SCHEMAS, SCHEMA_V1, to_schema, video_frames
+from hvqadata.util.shards import JsonlShardWriter
+from hvqadata.util.tars import TarShardWriter, VIDEOS_PER_TAR_SHARD, MAX_TAR_SHARD_BYTES
+from hvqadata.util.store import FrameStore
+from hvqadata.util.clips import CONTAINERS, PNG_FRAMES, NPY, NPZ, APNG, CLIP_FILES, APNG_FRAME_DURATION, \
+    remove_other_containers
 
 
-def write_json(out_dir, num_videos):
-    print("Writing json to file...")
+ZLIB_STRATEGIES = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+    "fixed": zlib.Z_FIXED
+}
 
-    num_videos_written = 0
-    for video_num in range(num_videos):
-        # Create video
-        video_builder = Video()
-        video_builder.random_video()
-        video = video_builder.to_dict()
+VIDEOS_PER_CHUNK = 16
+
+# Distributed builds, each process claims a range of videos at a time and heartbeats while building it
+VIDEOS_PER_RANGE = 256
+STALE_TIMEOUT = 120.0
+
+# Writer threads and queue sizes, the queue limits the number of drawn videos (or json files) held in memory
+ENCODE_THREADS = 2
+MAX_PENDING_SAVES = 4
+WRITE_THREADS = 4
+MAX_PENDING_WRITES = 256
+
+# Zstd dictionaries are trained on sample videos generated from a fixed seed, so every dataset gets the same dictionary
+DICT_SEED = 0
+
+
+def write_json(out_dir, num_videos, workers=1, seed=None):
+    """
+    Generate <num_videos> videos and write each to video.json in its directory, or to JSONL shards (see DatasetLayout)
+    Ranges of video ids are generated by a pool of <workers> processes
+    Files are written by a pool of writer threads in this process, while generation continues
+    Each video is generated from its own random number generator, so output does not depend on <workers>
+
+    :param out_dir: Output directory
+    :param num_videos: Number of videos to generate
+    :param workers: Number of processes
+    :param seed: Dataset seed (int), a random seed is chosen if None
+    :return: Dataset seed
+    """
 
-        # Write text to file
-        text = json.dumps(video)
-        video_dir = Path(f"./{out_dir}/{video_num}")
-        if not video_dir.exists():
-            video_dir.mkdir(parents=True, exist_ok=False)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
 
-        file = open(f"./{out_dir}/{video_num}/video.json", "w")
-        file.write(text)
-        file.close()
+    layout = DatasetLayout.load(out_dir)
+    print(f"Writing json to file with seed {seed}...")
 
-        num_videos_written += 1
+    starts = range(0, num_videos, VIDEOS_PER_CHUNK)
+    tasks = [(start, min(start + VIDEOS_PER_CHUNK, num_videos), seed, layout.json_schema) for start in starts]
+
+    # Shards are appended to in order, so they are written by a single thread
+    shard_writer = JsonlShardWriter(layout.data_dir) if layout.json_format == JSONL else None
+    num_threads = WRITE_THREADS if shard_writer is None else 1
+
+    num_videos_written = 0
+    with AsyncWriter(num_threads, MAX_PENDING_WRITES) as writer:
+        for videos in parallel_imap(_gen_chunk_json, tasks, workers):
+            for video_num, text in videos:
+                if shard_writer is None:
+                    writer.submit(write_video_json, layout, video_num, text)
+                else:
+                    writer.submit(shard_writer.write, video_num, text)
+
+            print_progress("Written json for", num_videos_written + len(videos), num_videos, num_videos_written)
+            num_videos_written += len(videos)
+
+    if shard_writer is not None:
+        shard_writer.close()
 
     print(f"Successfully written {num_videos_written} json files")
+    print(f"Writer: {writer.stats}")
+    return seed
+
+
+def _gen_chunk_json(task):
+    """
+    Generate the json text for a range of videos
+
+    :param task: (First video id, last video id + 1, dataset seed, schema version)
+    :return: List of (video_num, json text)
+    """
+
+    start, end, seed, schema = task
+    videos = []
+    for video_num in range(start, end):
+        video = gen_video_dict(seed, video_num)
+        videos.append((video_num, video_json(video, schema)))
+
+    return videos
+
+
+def gen_video_dict(seed, video_num):
+    video_builder = Video(video_rng(seed, video_num))
+    video_builder.random_video()
+    return video_builder.to_dict()
+
+
+def video_json(video, schema=SCHEMA_V1):
+    """
+    :param video: Video dictionary
+    :param schema: Schema version of json (see hvqadata.util.schema)
+    :return: Json text
+    """
+
+    return json.dumps(to_schema(video, schema))
+
+
+def write_video_json(layout, video_num, text):
+    return layout.write_video(video_num, text)
+
+
+def _write_json_record(layout, video_num, text):
+    return file_record(write_video_json(layout, video_num, text))
+
+
+def train_json_dict(layout):
+    """
+    Train a zstd dictionary for the json files of a dataset and save it in the dataset directory
+    Note: This must be done before any json files are written
+
+    :param layout: DatasetLayout
+    """
+
+    print(f"Training zstd dictionary on {DICT_SAMPLES} sample videos...")
+    texts = [video_json(gen_video_dict(DICT_SEED, video_num), layout.json_schema) for video_num in range(DICT_SAMPLES)]
+    zdict = train_dictionary(texts)
+    layout.save_dict(zdict)
+    print(f"Saved {len(zdict)} byte dictionary")
+
+
+def build_videos(out_dir, num_videos, options=None, workers=1, seed=None, json_only=False, resume=False,
+                 verify=False):
+    """
+    Generate, draw and write videos in a single pass
+    Each video's frames are drawn from its in-memory dictionary, rather than from its json file,
+    and its json and frames are written by the same process
+
+    Completed videos are recorded in the build's manifest (see BuildManifest)
+    If <resume>, videos whose files are complete and up to date are skipped,
+    so only missing, stale or corrupt videos are rebuilt
+    Datasets with JSONL shards are written in one go, so they cannot be resumed
+
+    :param out_dir: Output directory
+    :param num_videos: Number of videos to generate
+    :param options: FrameOptions
+    :param workers: Number of processes
+    :param seed: Dataset seed (int), a random seed (or the seed of the resumed build) is chosen if None
+    :param json_only: Only write json files
+    :param resume: Skip videos which are already complete
+    :param verify: When resuming, check the hash of every file (rather than only its size)
+    :return: Dataset seed
+    """
+
+    options = FrameOptions() if options is None else options
+    options_key = None if json_only else options.key()
+    layout = DatasetLayout.load(out_dir)
+    if resume and layout.json_format == JSONL:
+        raise ValueError("Builds which write JSONL shards cannot be resumed")
+
+    manifest = BuildManifest(out_dir)
+    if resume:
+        manifest.load()
+        if manifest.seed is not None:
+            if seed is not None and seed != manifest.seed:
+                raise ValueError(f"Seed {seed} does not match seed {manifest.seed} of the build being resumed")
+            seed = manifest.seed
+
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if manifest.seed is None:
+        manifest.start(seed)
+
+    video_nums = list(range(num_videos))
+    if resume:
+        video_nums = [video_num for video_num in video_nums
+                      if not manifest.is_complete(video_num, layout.video_dir(video_num), options_key, verify,
+                                                  layout.json_file(video_num).name)]
+        print(f"Resuming build, {num_videos - len(video_nums)} of {num_videos} videos are already complete")
+
+    print(f"Building videos with seed {seed}...")
+    start_time = time.time()
+
+    chunks = [video_nums[idx:idx + VIDEOS_PER_CHUNK] for idx in range(0, len(video_nums), VIDEOS_PER_CHUNK)]
+    tasks = [(chunk, seed, layout, options, json_only) for chunk in chunks]
+
+    shard_writer = JsonlShardWriter(layout.data_dir) if layout.json_format == JSONL else None
+
+    num_videos_written = 0
+    num_frames_total = 0
+    num_frames_linked = 0
+    writer_stats = WriterStats()
+    for results, stats in parallel_imap(_build_chunk_videos, tasks, workers, _init_frames_worker, (options,)):
+        writer_stats.merge(stats)
+        manifest.record([result[0] for result in results])
+        for record, num_frames, num_linked, text in results:
+            num_frames_total += num_frames
+            num_frames_linked += num_linked
+            if shard_writer is not None:
+                shard_writer.write(record["video"], text)
+
+        print_progress("Built", num_videos_written + len(results), len(video_nums), num_videos_written)
+        num_videos_written += len(results)
+
+    if shard_writer is not None:
+        shard_writer.close()
+
+    elapsed = time.time() - start_time
+    print(f"Successfully built {num_videos_written} videos with {num_frames_total} total frames in {elapsed:.1f}s")
+    if options.dedup:
+        print(f"Linked {num_frames_linked} repeated frames")
+    print(f"Writer: {writer_stats}")
+
+    return seed
+
+
+def _build_chunk_videos(task, keep_going=None):
+    """
+    Generate, draw and write a chunk of videos
+    Json files and frames are written by writer threads, while the next video is generated and drawn
+    Json for JSONL shards is returned rather than written, since shards are written by a single process
+
+    :param task: (List of video numbers, dataset seed, DatasetLayout, FrameOptions, json only)
+    :param keep_going: Function checked before each video, the chunk is abandoned once it returns False
+    :return: (List containing (manifest record, num_frames, num_linked, json text or None) for each video built,
+              WriterStats)
+    """
+
+    video_nums, seed, layout, options, json_only = task
+    options_key = None if json_only else options.key()
+
+    videos = []
+    with AsyncWriter(ENCODE_THREADS, MAX_PENDING_SAVES) as writer:
+        for video_num in video_nums:
+            if keep_going is not None and not keep_going():
+                break
+
+            video = gen_video_dict(seed, video_num)
+            text = video_json(video, layout.json_schema)
+            if layout.json_format == FILES:
+                json_record = writer.submit(_write_json_record, layout, video_num, text)
+            else:
+                json_record = file_record(text.encode())
+
+            frames = None
+            if not json_only:
+                np_imgs, frame_idxs = draw_video_frames(video["frames"], options)
+                video_dir = layout.video_dir(video_num)
+                frames = writer.submit(save_video_frames, video_dir, np_imgs, frame_idxs, options)
+
+            videos.append((video_num, text, json_record, frames))
+
+    results = []
+    for video_num, text, json_record, frames in videos:
+        json_record = json_record if layout.json_format == JSONL else json_record.result()
+        num_frames, num_linked, frame_records = (0, 0, None) if frames is None else frames.result()
+        record = BuildManifest.video_record(video_num, options_key, json_record, frame_records)
+        results.append((record, num_frames, num_linked, text if layout.json_format == JSONL else None))
+
+    return results, writer.stats
+
+
+def build_distributed(out_dir, num_videos, options=None, workers=1, seed=None, json_only=False,
+                      range_size=VIDEOS_PER_RANGE, stale_timeout=STALE_TIMEOUT, layout_name=FLAT,
+                      json_compression=NONE, json_schema=SCHEMA_V1):
+    """
+    Join a build which is spread across several machines sharing <out_dir> (eg. over NFS)
+    Videos are split into ranges in a JobTable, each of the <workers> processes repeatedly claims a range and
+    builds it in a single pass, until no ranges are left. Ranges claimed by dead workers are taken over.
+    The first machine to join sets the seed, range size and layout used by every machine
+    Once every machine has finished, run finalize_build to check the build is complete
+
+    :param out_dir: Output directory
+    :param num_videos: Number of videos to generate
+    :param options: FrameOptions
+    :param workers: Number of processes on this machine
+    :param seed: Dataset seed (int), a random seed (or the seed of the existing build) is chosen if None
+    :param json_only: Only write json files
+    :param range_size: Number of videos in each range
+    :param stale_timeout: Seconds after which a range claimed by a worker without a heartbeat is taken over
+    :param layout_name: Directory layout of the dataset (see DatasetLayout)
+    :param json_compression: Compression of json files (see DatasetLayout)
+    :param json_schema: Schema version of json files (see DatasetLayout)
+    :return: Dataset seed
+    """
+
+    options = FrameOptions() if options is None else options
+
+    table = JobTable(out_dir, stale_timeout)
+    config = {
+        "num_videos": num_videos,
+        "range_size": range_size,
+        "seed": random.randrange(2 ** 32) if seed is None else seed,
+        "json_only": json_only,
+        "options": options.key(),
+        "layout": layout_name,
+        "json_compression": json_compression,
+        "json_schema": json_schema
+    }
+    table_config = table.create(config)
+    for key in ["num_videos", "json_only", "options", "layout", "json_compression", "json_schema"]:
+        value = table_config[key]
+        if value != config[key]:
+            raise ValueError(f"Build settings do not match the existing build: {key} is {value}")
+    if seed is not None and seed != table_config["seed"]:
+        raise ValueError(f"Seed {seed} does not match seed {table_config['seed']} of the existing build")
+
+    seed = table_config["seed"]
+    layout = DatasetLayout(out_dir, layout_name, json_compression=json_compression, json_schema=json_schema)
+    layout.save()
+    print(f"Joining distributed build with seed {seed}...")
+    start_time = time.time()
+
+    task = (out_dir, seed, layout, options, json_only, stale_timeout)
+    num_videos_built = 0
+    writer_stats = WriterStats()
+    for num_built, stats in parallel_imap(_run_job_worker, [task] * workers, workers, _init_frames_worker, (options,)):
+        num_videos_built += num_built
+        writer_stats.merge(stats)
+
+    elapsed = time.time() - start_time
+    print(f"No ranges left. Built {num_videos_built} videos on this machine in {elapsed:.1f}s")
+    print(f"Writer: {writer_stats}")
+
+    return seed
+
+
+def _run_job_worker(task):
+    """
+    Claim and build ranges from the job table until none are left
+
+    :param task: (Output directory, dataset seed, DatasetLayout, FrameOptions, json only, stale timeout)
+    :return: (Number of videos built, WriterStats)
+    """
+
+    out_dir, seed, layout, options, json_only, stale_timeout = task
+    table = JobTable(out_dir, stale_timeout)
+    table.load()
+
+    num_videos = 0
+    writer_stats = WriterStats()
+    job = table.claim()
+    while job is not None:
+        start, end = job
+        heartbeat = table.keep_alive(start)
+        try:
+            # Stop as soon as the claim is taken over, so two workers don't write the same videos
+            task = (list(range(start, end)), seed, layout, options, json_only)
+            results, stats = _build_chunk_videos(task, heartbeat.held)
+        finally:
+            held = heartbeat.stop()
+
+        # If the claim was taken over, the new owner will build the range and mark it as done
+        if held:
+            table.complete(start, [result[0] for result in results])
+            print(f"{table.worker}: Built videos {start} to {end - 1}")
+        else:
+            print(f"WARNING: {table.worker} lost its claim on videos {start} to {end - 1}")
+
+        num_videos += len(results)
+        writer_stats.merge(stats)
+        job = table.claim()
+
+    return num_videos, writer_stats
+
+
+def finalize_build(out_dir, verify=False):
+    """
+    Check that every range of a distributed build is done and that every video is complete
+    The records of every range are gathered into the build's manifest, so any incomplete videos can be rebuilt
+    by resuming the build
+
+    :param out_dir: Output directory
+    :param verify: Check the hash of every file (rather than only its size)
+    :return: Whether the build is complete
+    """
+
+    table = JobTable(out_dir)
+    config = table.load()
+    layout = DatasetLayout.load(out_dir)
+
+    ranges = table.ranges()
+    missing = [start for start, _ in ranges if not table.is_done(start)]
+    if len(missing) > 0:
+        print(f"{len(missing)} of {len(ranges)} ranges are not done, starting at videos: {missing}")
+        return False
+
+    manifest = BuildManifest(out_dir)
+    manifest.start(config["seed"])
+    for start, _ in ranges:
+        manifest.record(table.records(start))
+
+    options_key = None if config["json_only"] else config["options"]
+    incomplete = [video_num for video_num in range(config["num_videos"])
+                  if not manifest.is_complete(video_num, layout.video_dir(video_num), options_key, verify,
+                                              layout.json_file(video_num).name)]
+    if len(incomplete) > 0:
+        print(f"{len(incomplete)} videos are incomplete: {incomplete}. Use --resume to rebuild them")
+        return False
+
+    print(f"Build is complete: {config['num_videos']} videos with seed {config['seed']}")
+    return True
+
+
+def build_tar_shards(out_dir, num_videos, options=None, workers=1, seed=None,
+                     videos_per_shard=VIDEOS_PER_TAR_SHARD, max_shard_bytes=MAX_TAR_SHARD_BYTES):
+    """
+    Generate, draw and write videos straight into tar shards (see TarShardWriter), without writing any other files
+    Chunks of videos are generated, drawn and encoded by a pool of <workers> processes,
+    and appended to the shards in order by a writer thread in this process
+
+    :param out_dir: Output directory
+    :param num_videos: Number of videos to generate
+    :param options: FrameOptions
+    :param workers: Number of processes
+    :param seed: Dataset seed (int), a random seed is chosen if None
+    :param videos_per_shard: Maximum number of videos in each shard
+    :param max_shard_bytes: Maximum size of each shard in bytes
+    :return: Dataset seed
+    """
+
+    options = FrameOptions() if options is None else options
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    print(f"Building tar shards with seed {seed}...")
+    start_time = time.time()
+
+    starts = range(0, num_videos, VIDEOS_PER_CHUNK)
+    tasks = [(list(range(start, min(start + VIDEOS_PER_CHUNK, num_videos))), seed, options) for start in starts]
+
+    num_videos_written = 0
+    shard_writer = TarShardWriter(out_dir, videos_per_shard, max_shard_bytes)
+    with AsyncWriter(1, MAX_PENDING_SAVES) as writer:
+        for videos in parallel_imap(_encode_chunk_videos, tasks, workers, _init_frames_worker, (options,)):
+            for video_num, text, frames in videos:
+                writer.submit(shard_writer.write, video_num, text, frames)
+
+            print_progress("Built", num_videos_written + len(videos), num_videos, num_videos_written)
+            num_videos_written += len(videos)
+
+    shard_writer.close()
+
+    elapsed = time.time() - start_time
+    print(f"Successfully built {num_videos_written} videos in {len(shard_writer.shards)} shards in {elapsed:.1f}s")
+    print(f"Writer: {writer.stats}")
+
+    return seed
+
+
+def _encode_chunk_videos(task):
+    """
+    Generate, draw and encode a chunk of videos
+
+    :param task: (List of video numbers, dataset seed, FrameOptions)
+    :return: List of (video_num, json text, list of PNG bytes for each frame)
+    """
+
+    video_nums, seed, options = task
+    videos = []
+    for video_num in video_nums:
+        video = gen_video_dict(seed, video_num)
+        np_imgs, frame_idxs = draw_video_frames(video["frames"], options)
+        pngs = [encode_frame(np_img, options) for np_img in np_imgs]
+        videos.append((video_num, json.dumps(video), [pngs[frame_idx] for frame_idx in frame_idxs]))
+
+    return videos
+
 
+class FrameOptions:
 
-def create_videos(out_dir):
-    basepath = Path(out_dir)
-    video_dirs = basepath.iterdir()
+    def __init__(self, static_layer=False, dedup=False, scale=1, palette=False, png_options=None,
+                 container=PNG_FRAMES):
+        """
+        Options for drawing and saving frames
+
+        :param static_layer: Draw static objects once per video and only redraw the octopus in each frame
+        :param dedup: Encode each distinct frame once per video and hard link repeated frames
+        :param scale: Integer factor to scale the resolution of frames by
+        :param palette: Save frames as 8-bit palette PNGs rather than RGB PNGs
+        :param png_options: Dict of options passed to PIL when saving PNGs
+        :param container: Save frames as frame_{i}.png files (png), or every frame of a video in one file:
+                          a numpy array (npy), a compressed numpy array (npz) or an animated PNG (apng)
+        """
+
+        self.static_layer = static_layer
+        self.dedup = dedup
+        self.scale = scale
+        self.palette = palette
+        self.png_options = {} if png_options is None else png_options
+        self.container = container
+
+    def key(self):
+        """
+        String which identifies the options, used to find frames drawn with different options
+        """
+
+        return json.dumps(vars(self), sort_keys=True)
+
+
+def create_videos(out_dir, options=None, workers=1):
+    """
+    Draw and save the frames for every video in <out_dir>
+    Videos are split into chunks, which are processed by a pool of <workers> processes
+    Within each process PNGs are saved by writer threads while the next video is drawn
+
+    :param out_dir: Dataset directory containing a directory for each video (see DatasetLayout)
+    :param options: FrameOptions
+    :param workers: Number of processes
+    """
+
+    options = FrameOptions() if options is None else options
+    layout = DatasetLayout.load(out_dir)
+    video_nums = layout.video_nums()
+    chunks = [video_nums[idx:idx + VIDEOS_PER_CHUNK] for idx in range(0, len(video_nums), VIDEOS_PER_CHUNK)]
+    tasks = [(chunk, layout, options) for chunk in chunks]
 
     print("Creating frames from json...")
+    start_time = time.time()
 
+    num_videos_done = 0
     num_videos_total = 0
+    num_videos_missing = 0
     num_frames_total = 0
-    for video_dir in video_dirs:
-        json_file = video_dir / "video.json"
-        if json_file.exists():
-            with json_file.open() as f:
-                json_text = f.read()
+    num_frames_linked = 0
+    writer_stats = WriterStats()
+    chunk_results = parallel_imap(_create_chunk_frames, tasks, workers, _init_frames_worker, (options,))
+    for chunk, (results, stats) in zip(chunks, chunk_results):
+        writer_stats.merge(stats)
+        for video_num, result in zip(chunk, results):
+            if result is None:
+                print(f"No json found for video {video_num}")
+                num_videos_missing += 1
+            else:
+                num_frames, num_linked, _ = result
+                num_frames_total += num_frames
+                num_frames_linked += num_linked
+                num_videos_total += 1
+
+        print_progress("Created frames for", num_videos_done + len(chunk), len(video_nums), num_videos_done)
+        num_videos_done += len(chunk)
+
+    elapsed = time.time() - start_time
+    print(f"Successfully created {num_videos_total} videos with {num_frames_total} total frames in {elapsed:.1f}s")
+    if options.dedup:
+        print(f"Linked {num_frames_linked} repeated frames")
+    if num_videos_missing > 0:
+        print(f"Skipped {num_videos_missing} directories without a json file")
+    print(f"Writer: {writer_stats}")
+
+
+def _init_frames_worker(options):
+    # Upsample sprites before drawing any frames
+    Drawer._get_sprites(options.scale)
+    Drawer._get_background(options.scale, options.palette)
+
+
+def _create_chunk_frames(task):
+    """
+    Draw and save frames for a chunk of videos
+    Frames are saved by writer threads, PIL releases the GIL while compressing PNGs
+
+    :param task: (List of video numbers, DatasetLayout, FrameOptions)
+    :return: (List containing (num_frames, num_linked, frame records) for each video, or None if the video has no
+              json, WriterStats)
+    """
+
+    video_nums, layout, options = task
+    results = []
+    with AsyncWriter(ENCODE_THREADS, MAX_PENDING_SAVES) as writer:
+        for video_num in video_nums:
+            json_text = layout.read_video(video_num)
+            if json_text is None:
+                results.append(None)
+                continue
 
             video_dict = json.loads(json_text)
-            frames = video_dict["frames"]
-            for i, frame in enumerate(frames):
-                img = create_frame(frame)
-                img.save(f"{video_dir}/frame_{i}.png")
-                num_frames_total += 1
+            np_imgs, frame_idxs = draw_video_frames(video_frames(video_dict), options)
+            video_dir = layout.video_dir(video_num)
+            results.append(writer.submit(save_video_frames, video_dir, np_imgs, frame_idxs, options))
+
+    return [None if result is None else result.result() for result in results], writer.stats
+
+
+def create_frame_store(out_dir, options=None, workers=1):
+    """
+    Draw the frames of every video in <out_dir> into the dataset's frame store (see FrameStore)
+    The store is preallocated, then each of the <workers> processes draws chunks of videos and writes them straight
+    into their rows of the memory-mapped array
+
+    :param out_dir: Dataset directory
+    :param options: FrameOptions, frames are stored as palette indices if options.palette (PNG options are ignored)
+    :param workers: Number of processes
+    """
+
+    options = FrameOptions() if options is None else options
+    layout = DatasetLayout.load(out_dir)
+    video_nums = layout.video_nums()
+
+    frame_size = FRAME_SIZE * options.scale
+    frame_shape = (NUM_FRAMES, frame_size, frame_size) if options.palette else (NUM_FRAMES, frame_size, frame_size, 3)
+    FrameStore.create(out_dir, len(video_nums), frame_shape)
+
+    rows = list(range(len(video_nums)))
+    starts = range(0, len(video_nums), VIDEOS_PER_CHUNK)
+    tasks = [(video_nums[start:start + VIDEOS_PER_CHUNK], rows[start:start + VIDEOS_PER_CHUNK], layout, options)
+             for start in starts]
+
+    print("Creating frame store from json...")
+    start_time = time.time()
+
+    num_videos_done = 0
+    row_video_nums = []
+    for chunk_video_nums in parallel_imap(_store_chunk_frames, tasks, workers, _init_frames_worker, (options,)):
+        for video_num in chunk_video_nums:
+            if video_num is None:
+                print(f"No json found for video {video_nums[len(row_video_nums)]}")
+            row_video_nums.append(video_num)
+
+        print_progress("Stored frames for", num_videos_done + len(chunk_video_nums), len(video_nums), num_videos_done)
+        num_videos_done += len(chunk_video_nums)
 
+    FrameStore.write_sidecar(out_dir, row_video_nums)
+
+    elapsed = time.time() - start_time
+    num_stored = len([video_num for video_num in row_video_nums if video_num is not None])
+    print(f"Successfully stored frames for {num_stored} videos in {elapsed:.1f}s")
+
+
+def _store_chunk_frames(task):
+    """
+    Draw a chunk of videos into their rows of the frame store
+
+    :param task: (List of video numbers, row of each video, DatasetLayout, FrameOptions)
+    :return: List containing the video number written to each row, or None if the video has no json
+    """
+
+    video_nums, rows, layout, options = task
+    store = FrameStore.open_rows(layout.data_dir)
+
+    row_video_nums = []
+    for video_num, row in zip(video_nums, rows):
+        json_text = layout.read_video(video_num)
+        if json_text is None:
+            row_video_nums.append(None)
+            continue
+
+        video_dict = json.loads(json_text)
+        np_imgs, frame_idxs = draw_video_frames(video_frames(video_dict), options)
+        store[row] = np_imgs[frame_idxs]
+        row_video_nums.append(video_num)
+
+    store.flush()
+    return row_video_nums
+
+
+def draw_video_frames(frames, options):
+    """
+    Draw the frames of a video
+
+    :param frames: List of frame dictionaries
+    :param options: FrameOptions
+    :return: (Numpy array of drawn frames, index into drawn frames for each frame of the video)
+    """
+
+    if options.dedup:
+        frames, frame_idxs = unique_frames(frames)
+    else:
+        frame_idxs = list(range(len(frames)))
+
+    if options.static_layer:
+        np_imgs = Drawer.draw_video(frames, options.scale, options.palette)
+    else:
+        np_imgs = Drawer.draw_frames(frames, scale=options.scale, indexed=options.palette)
+
+    return np_imgs, frame_idxs
+
+
+def save_video_frames(video_dir, np_imgs, frame_idxs, options):
+    """
+    Save the frames of a video as frame_{i}.png files, or as a single clip file (see FrameOptions.container)
+    Each drawn frame is encoded once, repeated frames are linked to the first occurrence
+    Frame files of other containers are deleted
+
+    :param video_dir: Path of video directory
+    :param np_imgs: Numpy array of drawn frames
+    :param frame_idxs: Index into <np_imgs> for each frame of the video
+    :param options: FrameOptions
+    :return: (Number of frames, number of frames linked, dict of manifest file record for each file written)
+    """
+
+    video_dir.mkdir(parents=True, exist_ok=True)
+    remove_other_containers(video_dir, options.container)
+
+    if options.container != PNG_FRAMES:
+        file_name, data = encode_clip(np_imgs[frame_idxs], options)
+        (video_dir / file_name).write_bytes(data)
+        return len(frame_idxs), 0, {file_name: file_record(data)}
+
+    num_linked = 0
+    frame_files = {}
+    frame_records = {}
+    for i, frame_idx in enumerate(frame_idxs):
+        frame_file = video_dir / f"frame_{i}.png"
+        if frame_file.exists():
+            frame_file.unlink()
+
+        if frame_idx in frame_files:
+            src_file, record = frame_files[frame_idx]
+            link_file(src_file, frame_file)
+            num_linked += 1
         else:
-            print(f"No 'video.json' file found for {video_dir}/")
+            data = encode_frame(np_imgs[frame_idx], options)
+            frame_file.write_bytes(data)
+            record = file_record(data)
+            frame_files[frame_idx] = (frame_file, record)
+
+        frame_records[frame_file.name] = record
+
+    return len(frame_idxs), num_linked, frame_records
+
+
+def encode_clip(np_imgs, options):
+    """
+    Encode every frame of a video as a single file
 
-        num_videos_total += 1
+    :param np_imgs: Numpy array of every frame of the video
+    :param options: FrameOptions
+    :return: (File name, bytes)
+    """
 
-    print(f"Successfully created {num_videos_total} videos with {num_frames_total} total frames")
+    buffer = io.BytesIO()
+    if options.container == NPY:
+        np.save(buffer, np_imgs)
+    elif options.container == NPZ:
+        np.savez_compressed(buffer, frames=np_imgs)
+    elif options.container == APNG:
+        imgs = [to_image(np_img) for np_img in np_imgs]
+        imgs[0].save(buffer, "PNG", save_all=True, append_images=imgs[1:], duration=APNG_FRAME_DURATION,
+                     **options.png_options)
+    else:
+        raise ValueError(f"Unknown container: {options.container}. Available containers: {CONTAINERS}")
 
+    return CLIP_FILES[options.container], buffer.getvalue()
+
+
+def encode_frame(np_img, options):
+    """
+    Encode a drawn frame as a PNG
+
+    :param np_img: Numpy array of drawn frame
+    :param options: FrameOptions
+    :return: PNG bytes
+    """
+
+    buffer = io.BytesIO()
+    img = to_image(np_img)
+    img.save(buffer, "PNG", **options.png_options)
+    return buffer.getvalue()
+
+
+def to_image(np_img):
+    """
+    Create a PIL image from a drawn frame
+    Frames of palette indices produce 8-bit palette images using the project palette
+
+    :param np_img: Numpy array (RGB, or palette indices) of image
+    :return: PIL Image
+    """
+
+    if np_img.ndim == 2:
+        img = Image.fromarray(np_img, "P")
+        img.putpalette(PALETTE_RGB.tobytes())
+    else:
+        img = Image.fromarray(np_img, "RGB")
 
-def create_frame(frame):
-    np_img = Drawer.draw_frame(frame)
-    img = Image.fromarray(np_img, "RGB")
     return img
 
 
+def unique_frames(frames):
+    """
+    Find the distinct frames of a video
+    Frames are identified by their (ordered) list of objects
+
+    :param frames: List of frame dictionaries
+    :return: (List of distinct frame dictionaries, index of the distinct frame for each input frame)
+    """
+
+    distinct = []
+    frame_idxs = []
+    keys = {}
+    for frame in frames:
+        key = json.dumps(frame["objects"], sort_keys=True)
+        frame_idx = keys.get(key)
+        if frame_idx is None:
+            frame_idx = len(distinct)
+            keys[key] = frame_idx
+            distinct.append(frame)
+
+        frame_idxs.append(frame_idx)
+
+    return distinct, frame_idxs
+
+
+def link_file(src, dst):
+    """
+    Create a hard link at <dst> to <src>, copying the file if the filesystem does not support hard links
+
+    :param src: Path of existing file
+    :param dst: Path of new file
+    """
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
 def delete_directory(name):
-    directory = Path(f"./{name}")
+    directory = Path(name)
     if directory.exists():
         response = input(f"About to delete {name} directory. Are you sure you want to continue? [y/n] ")
         if response != "y":
@@ -81,12 +855,95 @@ def delete_directory(name):
             print("Error while deleting directory: %s - %s." % (e.filename, e.strerror))
 
 
-def main(out_dir, num_videos, json_only, frames_only):
+def main(out_dir, num_videos, json_only, frames_only, frame_options, workers, seed, single_pass, resume, verify,
+         distributed, finalize, range_size, stale_timeout, layout, json_format, tar_shards, videos_per_shard,
+         max_shard_bytes, frame_store, json_compression, json_dict, json_schema):
+    # Layout flags which were not given are None, so a resumed build only checks the flags which were given
+    layout_flags = {"layout": layout, "json_format": json_format, "json_compression": json_compression,
+                    "json_dict": json_dict or None, "schema": json_schema}
+    layout = FLAT if layout is None else layout
+    json_format = FILES if json_format is None else json_format
+    json_compression = NONE if json_compression is None else json_compression
+    json_schema = SCHEMA_V1 if json_schema is None else json_schema
+
+    if finalize:
+        complete = finalize_build(out_dir, verify)
+        exit(0 if complete else 1)
+
+    # Frame stores are drawn from the json of a whole dataset, so they cannot be written while videos are generated
+    if frame_store and (tar_shards or distributed or resume or (single_pass and not frames_only)):
+        print("A frame store can only be created by a two pass build, or from an existing dataset with -f. Exiting...")
+        exit()
+
+    if tar_shards:
+        # Tar shards always hold v1 json and PNG frames, so they cannot honour any other json or frame format
+        given = [f"--{flag}" for flag, value in layout_flags.items() if value is not None]
+        if json_only or frames_only:
+            given.append("--json_only" if json_only else "--frames_only")
+        if frame_options.container != PNG_FRAMES:
+            given.append("--container")
+        if given:
+            print(f"Tar shards cannot be built with {', '.join(given)}. Exiting...")
+            exit()
+
+        delete_directory(out_dir)
+        path = Path(out_dir)
+        path.mkdir(parents=True, exist_ok=False)
+        build_tar_shards(out_dir, num_videos, frame_options, workers, seed, videos_per_shard, max_shard_bytes)
+        return
+
+    # Flags are checked before any directory is deleted, so a bad combination leaves an existing dataset untouched
+    _check_json_flags(json_format, json_compression, json_dict)
+
+    if distributed:
+        if frames_only or json_format == JSONL:
+            print("Only builds which generate videos as json files can be distributed. Exiting...")
+            exit()
+        if json_dict:
+            print("Distributed builds cannot train a zstd dictionary. Exiting...")
+            exit()
+
+        path = Path(out_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        build_distributed(out_dir, num_videos, frame_options, workers, seed, json_only, range_size, stale_timeout,
+                          layout, json_compression, json_schema)
+        return
+
+    if resume:
+        if frames_only:
+            print("Only builds which generate videos can be resumed. Exiting...")
+            exit()
+
+        path = Path(out_dir)
+        saved_layout = DatasetLayout.load(out_dir) if (path / LAYOUT_FILE).exists() else None
+        if (json_format if saved_layout is None else saved_layout.json_format) == JSONL:
+            print("Builds with JSONL shards cannot be resumed. Exiting...")
+            exit()
+
+        path.mkdir(parents=True, exist_ok=True)
+        if saved_layout is not None:
+            _check_layout(saved_layout, layout_flags)
+            _check_json_flags(saved_layout.json_format, saved_layout.json_compression, saved_layout.json_dict)
+        else:
+            _create_layout(out_dir, layout, json_format, json_compression, json_dict, json_schema)
+
+        build_videos(out_dir, num_videos, frame_options, workers, seed, json_only, resume=True, verify=verify)
+        return
+
+    if single_pass and not frames_only:
+        delete_directory(out_dir)
+        path = Path(out_dir)
+        path.mkdir(parents=True, exist_ok=False)
+        _create_layout(out_dir, layout, json_format, json_compression, json_dict, json_schema)
+        build_videos(out_dir, num_videos, frame_options, workers, seed, json_only)
+        return
+
     if not frames_only:
         delete_directory(out_dir)
-        path = Path(f"./{out_dir}")
+        path = Path(out_dir)
         path.mkdir(parents=True, exist_ok=False)
-        write_json(out_dir, num_videos)
+        _create_layout(out_dir, layout, json_format, json_compression, json_dict, json_schema)
+        write_json(out_dir, num_videos, workers, seed)
 
     if not json_only:
         response = input(f"About to create frames. This could overwrite old frames. "
@@ -95,14 +952,118 @@ def main(out_dir, num_videos, json_only, frames_only):
             print("Exiting...")
             exit()
 
-        create_videos(out_dir)
+        if frame_store:
+            create_frame_store(out_dir, frame_options, workers)
+        else:
+            create_videos(out_dir, frame_options, workers)
+
+
+def _check_json_flags(json_format, json_compression, json_dict):
+    if json_dict and json_compression != ZSTD:
+        print("A dictionary can only be used with zstd compression. Exiting...")
+        exit()
+    if json_format == JSONL and json_compression != NONE:
+        print("JSONL shards cannot be compressed. Exiting...")
+        exit()
+    try:
+        JsonCodec(json_compression)
+    except ImportError as e:
+        print(f"{e}. Exiting...")
+        exit()
+
+
+def _create_layout(out_dir, name, json_format, json_compression, json_dict, json_schema):
+    layout = DatasetLayout(out_dir, name, json_format, json_compression, json_dict, json_schema)
+    if json_dict:
+        train_json_dict(layout)
+    layout.save()
+
+
+def _check_layout(layout, layout_flags):
+    saved = {"layout": layout.name, "json_format": layout.json_format, "json_compression": layout.json_compression,
+             "json_dict": layout.json_dict, "schema": layout.json_schema}
+    for flag, value in layout_flags.items():
+        if value is not None and value != saved[flag]:
+            print(f"--{flag} {value} does not match the saved layout of the dataset ({saved[flag]}). Exiting...")
+            exit()
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Script for building dataset")
     parser.add_argument("-j", "--json_only", action="store_true", default=False)
     parser.add_argument("-f", "--frames_only", action="store_true", default=False)
+    parser.add_argument("--single_pass", action="store_true", default=False,
+                        help="Generate, draw and write each video in one pass, without re-reading json files")
+    parser.add_argument("-r", "--resume", action="store_true", default=False,
+                        help="Resume a single pass build, only rebuilding videos which are missing, stale or corrupt")
+    parser.add_argument("--verify", action="store_true", default=False,
+                        help="When resuming, check the hash of every file rather than only its size")
+    parser.add_argument("--distributed", action="store_true", default=False,
+                        help="Join a build spread across machines which share out_dir, each machine runs this command")
+    parser.add_argument("--finalize", action="store_true", default=False,
+                        help="Check that a distributed build is complete and write its manifest")
+    parser.add_argument("--range_size", type=int, default=VIDEOS_PER_RANGE,
+                        help="Number of videos claimed at a time by each process in a distributed build")
+    parser.add_argument("--stale_timeout", type=float, default=STALE_TIMEOUT,
+                        help="Seconds without a heartbeat after which a claimed range is taken by another process")
+    parser.add_argument("--layout", type=str, choices=LAYOUTS, default=None,
+                        help="Directory layout of a new dataset (default: flat), "
+                             "bucketed keeps directories small for large datasets")
+    parser.add_argument("--json_format", type=str, choices=JSON_FORMATS, default=None,
+                        help="Write json of a new dataset as a file per video (default: files), "
+                             "or packed into indexed JSONL shards")
+    parser.add_argument("--json_compression", type=str, choices=COMPRESSIONS, default=None,
+                        help="Compress the json file of each video (default: none), "
+                             "zstd requires the zstandard package")
+    parser.add_argument("--json_dict", action="store_true", default=False,
+                        help="Train a shared dictionary for zstd compressed json files")
+    parser.add_argument("--schema", type=int, choices=SCHEMAS, default=None,
+                        help="Schema of new json files (default: 1), "
+                             "v2 stores each static object once rather than in every frame")
+    parser.add_argument("--tar_shards", action="store_true", default=False,
+                        help="Write videos and frames straight into tar shards, rather than a directory per video")
+    parser.add_argument("--videos_per_shard", type=int, default=VIDEOS_PER_TAR_SHARD,
+                        help="Maximum number of videos in each tar shard")
+    parser.add_argument("--max_shard_bytes", type=int, default=MAX_TAR_SHARD_BYTES,
+                        help="Maximum size of each tar shard in bytes, a new shard is started before a shard grows "
+                             "larger")
+    parser.add_argument("--frame_store", action="store_true", default=False,
+                        help="Draw frames into one memory-mapped array for the whole dataset, rather than image files "
+                             "(two pass builds only, with -f converts an existing dataset)")
+    parser.add_argument("-s", "--static_layer", action="store_true", default=False,
+                        help="Draw static objects once per video and only redraw the octopus in each frame")
+    parser.add_argument("-d", "--dedup", action="store_true", default=False,
+                        help="Encode each distinct frame once per video and hard link repeated frames")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="Integer factor to scale the resolution of frames by")
+    parser.add_argument("-p", "--palette", action="store_true", default=False,
+                        help="Save frames as 8-bit palette PNGs rather than RGB PNGs")
+    parser.add_argument("--container", type=str, choices=CONTAINERS, default=PNG_FRAMES,
+                        help="Save each frame as a PNG, or every frame of a video in one npy, npz or animated PNG file")
+    parser.add_argument("--compress_level", type=int, choices=range(10), default=None,
+                        help="zlib compression level for PNGs")
+    parser.add_argument("--zlib_strategy", type=str, choices=list(ZLIB_STRATEGIES.keys()), default=None,
+                        help="zlib compression strategy for PNGs")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of processes to use")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Dataset seed, each video is generated from this seed and its video number")
+    parser.add_argument("--backend", type=str, choices=list(BACKENDS.keys()), default=None,
+                        help="Backend for simulation kernels, overrides the HVQA_BACKEND environment variable")
     parser.add_argument("out_dir", type=str)
     parser.add_argument("num_videos", type=int)
     args = parser.parse_args()
-    main(args.out_dir, args.num_videos, args.json_only, args.frames_only)
+    if args.backend is not None:
+        set_backend(args.backend)
+
+    png_opts = {}
+    if args.compress_level is not None:
+        png_opts["compress_level"] = args.compress_level
+    if args.zlib_strategy is not None:
+        png_opts["compress_type"] = ZLIB_STRATEGIES[args.zlib_strategy]
+
+    frame_opts = FrameOptions(args.static_layer, args.dedup, args.scale, args.palette, png_opts, args.container)
+    main(args.out_dir, args.num_videos, args.json_only, args.frames_only, frame_opts, args.workers, args.seed,
+         args.single_pass, args.resume, args.verify, args.distributed, args.finalize, args.range_size,
+         args.stale_timeout, args.layout, args.json_format, args.tar_shards, args.videos_per_shard,
+         args.max_shard_bytes, args.frame_store, args.json_compression, args.json_dict, args.schema)
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import shutil
+import argparse
+
+from hvqadata.util.func import parallel_imap, print_progress
+from hvqadata.util.layout import DatasetLayout, JSONL
+from hvqadata.util.manifest import BuildManifest, file_record
+from hvqadata.util.schema import SCHEMAS, to_schema
+from hvqadata.util.shards import JsonlShardWriter, INDEX_FILE
+
+
+VIDEOS_PER_CHUNK = 256
+
+# Shards are converted into this directory, then moved into the dataset once every video is converted
+TMP_SHARD_DIR = "convert.tmp"
+
+
+def convert_schema(data_dir, schema, workers=1):
+    """
+    Convert the json of every video in a dataset to another schema (see hvqadata.util.schema), in place
+    Json files keep their compression, JSONL shards are rewritten
+    The json records of a build manifest are updated, so a converted build can still be resumed
+    Chunks of videos are read, converted and (for json files) written by a pool of <workers> processes
+
+    :param data_dir: Dataset directory
+    :param schema: Schema version to convert to
+    :param workers: Number of processes
+    """
+
+    layout = DatasetLayout.load(data_dir)
+    video_nums = layout.video_nums()
+    starts = range(0, len(video_nums), VIDEOS_PER_CHUNK)
+    tasks = [(video_nums[start:start + VIDEOS_PER_CHUNK], layout, schema) for start in starts]
+
+    print(f"Converting json to schema v{schema}...")
+    start_time = time.time()
+
+    tmp_dir = layout.data_dir / TMP_SHARD_DIR
+    shard_writer = None
+    if layout.json_format == JSONL:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        shard_writer = JsonlShardWriter(tmp_dir)
+
+    manifest = BuildManifest(layout.data_dir)
+    manifest.load()
+
+    num_videos_done = 0
+    for videos in parallel_imap(_convert_chunk, tasks, workers):
+        if shard_writer is not None:
+            for video_num, text in videos:
+                shard_writer.write(video_num, text)
+        elif manifest.seed is not None:
+            manifest.record([dict(manifest.videos[video_num], json=json_record) for video_num, json_record in videos
+                             if video_num in manifest.videos])
+
+        print_progress("Converted", num_videos_done + len(videos), len(video_nums), num_videos_done)
+        num_videos_done += len(videos)
+
+    # Old shards must not be held open once they are replaced
+    layout.close()
+    if shard_writer is not None:
+        shard_writer.close()
+        _replace_shards(layout.data_dir, tmp_dir)
+
+    layout.json_schema = schema
+    layout.save()
+
+    elapsed = time.time() - start_time
+    print(f"Successfully converted {num_videos_done} videos in {elapsed:.1f}s")
+
+
+def _convert_chunk(task):
+    """
+    Convert a chunk of videos, json files are rewritten and JSONL text is returned
+
+    :param task: (List of video numbers, DatasetLayout, schema version)
+    :return: List of (video_num, json text) for JSONL datasets, list of (video_num, file record of json) otherwise
+    """
+
+    video_nums, layout, schema = task
+    videos = []
+    with layout:
+        for video_num in video_nums:
+            json_text = layout.read_video(video_num)
+            if json_text is None:
+                print(f"WARNING: No json found for video {video_num}. Skipping...")
+                continue
+
+            text = json.dumps(to_schema(json.loads(json_text), schema))
+            if layout.json_format == JSONL:
+                videos.append((video_num, text))
+            else:
+                data = layout.write_video(video_num, text)
+                videos.append((video_num, file_record(data)))
+
+    return videos
+
+
+def _replace_shards(data_dir, tmp_dir):
+    for shard in data_dir.glob("videos-*.jsonl"):
+        shard.unlink()
+    for shard in tmp_dir.glob("videos-*.jsonl"):
+        os.replace(shard, data_dir / shard.name)
+
+    os.replace(tmp_dir / INDEX_FILE, data_dir / INDEX_FILE)
+    tmp_dir.rmdir()
+
+
+def main(data_dir, schema, workers):
+    convert_schema(data_dir, schema, workers)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Script for converting the json of a built dataset to another schema")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of processes to use")
+    parser.add_argument("data_dir", type=str)
+    parser.add_argument("schema", type=int, choices=SCHEMAS)
+    args = parser.parse_args()
+    main(args.data_dir, args.schema, args.workers)
@@ -4,38 +4,319 @@ from hvqadata.util.definitions import *
 from hvqadata.util.exceptions import *
 
 
+class Sprite:
+
+    def __init__(self, rgb, mask, x_offset, y_offset, frame_size=FRAME_SIZE):
+        """
+        Pre-rasterised image of an object, drawn relative to the top-left corner of the object's position
+
+        :param rgb: Numpy array (RGB) of the sprite's pixels
+        :param mask: Boolean numpy array of pixels which belong to the sprite
+        :param x_offset: Offset of the stamp's left column from the object's x1
+        :param y_offset: Offset of the stamp's top row from the object's y1
+        :param frame_size: Width of the frames the sprite is drawn onto
+        """
+
+        self.rgb = rgb
+        self.idxs = Drawer.to_palette(np.where(mask[:, :, None], rgb, PALETTE_RGB[0]))
+        self.mask = mask
+        self.x_offset = x_offset
+        self.y_offset = y_offset
+        self.height, self.width = mask.shape
+
+        # Sprite bytes as offsets into a flattened frame, used for drawing batches of frames
+        ys, xs = np.nonzero(mask)
+        self.flat_idx_offsets = (ys * frame_size) + xs
+        self.flat_idxs = self.idxs[mask]
+        self.flat_offsets = ((self.flat_idx_offsets[:, None] * 3) + np.arange(3)).reshape(-1)
+        self.flat_rgb = rgb[mask].reshape(-1)
+
+    def upsample(self, scale):
+        """
+        Create a copy of the sprite for frames drawn at <scale> times the original resolution
+        Each pixel becomes a <scale> x <scale> block
+
+        :param scale: Integer scale factor
+        :return: Sprite
+        """
+
+        rgb = self.rgb.repeat(scale, axis=0).repeat(scale, axis=1)
+        mask = self.mask.repeat(scale, axis=0).repeat(scale, axis=1)
+        return Sprite(rgb, mask, self.x_offset * scale, self.y_offset * scale, FRAME_SIZE * scale)
+
+
 class Drawer:
 
     @staticmethod
-    def draw_frame(frame_dict):
+    def draw_frame(frame_dict, scale=1, indexed=False):
         """
         Draw a frame from a dictionary description of the frame
 
         :param frame_dict: Dictionary corresponding to frame to draw
-        :return: Numpy array (RGB) of image
+        :param scale: Integer scale factor, the frame is drawn at FRAME_SIZE * scale pixels square
+        :param indexed: Draw indices into PALETTE rather than RGB values (see to_rgb)
+        :return: Numpy array (RGB, or uint8 palette indices if <indexed>) of image
         """
 
-        red = np.ones((FRAME_SIZE, FRAME_SIZE), dtype=np.uint8) * BACKGROUND_R
-        green = np.ones((FRAME_SIZE, FRAME_SIZE), dtype=np.uint8) * BACKGROUND_G
-        blue = np.ones((FRAME_SIZE, FRAME_SIZE), dtype=np.uint8) * BACKGROUND_B
-        img = np.stack([red, green, blue], axis=2)
-
-        # Draw objects
+        img = Drawer._get_background(scale, indexed).copy()
         for obj in frame_dict["objects"]:
-            obj_type = obj["class"]
-            if obj_type == "octopus":
-                Drawer._draw_octopus(img, obj)
-            elif obj_type == "fish":
-                Drawer._draw_fish(img, obj)
-            elif obj_type == "bag":
-                Drawer._draw_bag(img, obj)
-            elif obj_type == "rock":
-                Drawer._draw_rock(img, obj)
-            else:
-                raise UnknownObjectTypeException()
+            Drawer.draw_obj(img, obj, scale)
 
         return img
 
+    @staticmethod
+    def draw_frames(frame_dicts, out=None, scale=1, indexed=False):
+        """
+        Draw a batch of frames in a single pass
+        Frames can come from any number of videos
+
+        Objects are drawn in layers, where layer k contains the k-th object of every frame
+        Within a layer each frame contains at most one object, so overlapping objects are drawn in order
+
+        :param frame_dicts: List of dictionaries corresponding to frames to draw
+        :param out: Optional contiguous uint8 array to draw into, allows buffers to be reused between batches
+        :param scale: Integer scale factor, frames are drawn at FRAME_SIZE * scale pixels square
+        :param indexed: Draw indices into PALETTE rather than RGB values, images then have no colour channel
+        :return: Numpy array (RGB, or palette indices if <indexed>) of images,
+                 shape [num_frames, FRAME_SIZE * scale, FRAME_SIZE * scale(, 3)]
+        """
+
+        background = Drawer._get_background(scale, indexed)
+        channels = 1 if indexed else 3
+        frame_size = FRAME_SIZE * scale
+        num_frames = len(frame_dicts)
+        shape = (num_frames,) + background.shape
+        if out is None:
+            imgs = np.empty(shape, dtype=np.uint8)
+        elif out.shape != shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise ValueError(f"Output array must be a contiguous uint8 array of shape {shape}")
+        else:
+            imgs = out
+
+        imgs[:] = background
+        flat_imgs = imgs.reshape(-1)
+
+        # Gather placements of all objects, grouped by layer
+        layers = []
+        for frame_idx, frame_dict in enumerate(frame_dicts):
+            for layer_idx, obj in enumerate(frame_dict["objects"]):
+                if layer_idx == len(layers):
+                    layers.append(([], []))
+
+                sprite = Drawer._get_sprite(obj, scale)
+                x1, y1, _, _ = obj["position"]
+                row = (frame_idx * frame_size) + (y1 * scale) + sprite.y_offset
+                start = ((row * frame_size) + (x1 * scale) + sprite.x_offset) * channels
+
+                starts, sprites = layers[layer_idx]
+                starts.append(start)
+                sprites.append(sprite)
+
+        # Scatter sprite pixels for each layer
+        for starts, sprites in layers:
+            if indexed:
+                offsets = [sprite.flat_idx_offsets for sprite in sprites]
+                values = [sprite.flat_idxs for sprite in sprites]
+            else:
+                offsets = [sprite.flat_offsets for sprite in sprites]
+                values = [sprite.flat_rgb for sprite in sprites]
+
+            num_bytes = [len(sprite_offsets) for sprite_offsets in offsets]
+            idxs = np.repeat(np.array(starts, dtype=np.int64), num_bytes) + np.concatenate(offsets)
+            np.put(flat_imgs, idxs, np.concatenate(values))
+
+        return imgs
+
+    @staticmethod
+    def draw_video(frame_dicts, scale=1, indexed=False):
+        """
+        Draw the frames of a single video, reusing the layer of static objects between frames
+        The static layer is only redrawn when the static objects change (eg. an object is eaten)
+        Each frame is then a copy of the static layer with the octopus drawn on top
+
+        :param frame_dicts: List of dictionaries corresponding to frames of a video
+        :param scale: Integer scale factor, frames are drawn at FRAME_SIZE * scale pixels square
+        :param indexed: Draw indices into PALETTE rather than RGB values, images then have no colour channel
+        :return: Numpy array (RGB, or palette indices if <indexed>) of images,
+                 shape [num_frames, FRAME_SIZE * scale, FRAME_SIZE * scale(, 3)]
+        """
+
+        background = Drawer._get_background(scale, indexed)
+        imgs = np.empty((len(frame_dicts),) + background.shape, dtype=np.uint8)
+
+        static_objs = None
+        static_layer = None
+        for frame_idx, frame_dict in enumerate(frame_dicts):
+            objs = frame_dict["objects"]
+
+            # The octopus is drawn last, so it can be composited over the static layer
+            octopus = None
+            if len(objs) > 0 and objs[-1]["class"] == "octopus":
+                octopus = objs[-1]
+                objs = objs[:-1]
+
+            if objs != static_objs:
+                static_layer = Drawer.draw_frame({"objects": objs}, scale, indexed)
+                static_objs = objs
+
+            img = imgs[frame_idx]
+            img[:] = static_layer
+            if octopus is not None:
+                Drawer.draw_obj(img, octopus, scale)
+
+        return imgs
+
+    @staticmethod
+    def draw_obj(img, obj, scale=1):
+        """
+        Draw an object onto an image in place, using the object's pre-rasterised sprite
+
+        :param img: Numpy array (RGB, or palette indices if it has no colour channel) of image
+        :param obj: Dictionary corresponding to object to draw
+        :param scale: Integer scale factor the image is drawn at
+        """
+
+        sprite = Drawer._get_sprite(obj, scale)
+        x1, y1, _, _ = obj["position"]
+        x1 = (x1 * scale) + sprite.x_offset
+        y1 = (y1 * scale) + sprite.y_offset
+        region = img[y1:y1 + sprite.height, x1:x1 + sprite.width]
+        if img.ndim == 2:
+            np.copyto(region, sprite.idxs, where=sprite.mask)
+        else:
+            np.copyto(region, sprite.rgb, where=sprite.mask[:, :, None])
+
+    @staticmethod
+    def to_palette(imgs):
+        """
+        Convert RGB images to indices into PALETTE
+        Palette colours are identified by their green and blue channels, which are unique within the palette
+
+        :param imgs: Numpy array (RGB) of one or more images
+        :return: Numpy array (uint8) of palette indices, with the colour channel removed
+        """
+
+        keys = (imgs[..., 1].astype(np.uint16) << 8) | imgs[..., 2]
+        idxs = PALETTE_LUT[keys]
+        if idxs.size > 0 and idxs.max() == UNKNOWN_COLOUR:
+            raise UnknownPropertyValueException("Image contains a colour which is not in the palette")
+
+        return idxs
+
+    @staticmethod
+    def to_rgb(idxs, palette=None):
+        """
+        Expand images of palette indices to RGB
+        A different palette can be given to produce colour-swapped images without redrawing
+
+        :param idxs: Numpy array (uint8) of palette indices for one or more images
+        :param palette: Numpy array (uint8) of RGB values for each palette index, defaults to PALETTE
+        :return: Numpy array (RGB) of images
+        """
+
+        palette = PALETTE_RGB if palette is None else palette
+        return palette.take(idxs, axis=0)
+
+    @staticmethod
+    def _get_background(scale, indexed=False):
+        background = SCALED_BACKGROUNDS.get((scale, indexed))
+        if background is None:
+            Drawer._check_scale(scale)
+            background = BACKGROUND_IDXS if indexed else BACKGROUND
+            background = background.repeat(scale, axis=0).repeat(scale, axis=1)
+            SCALED_BACKGROUNDS[(scale, indexed)] = background
+
+        return background
+
+    @staticmethod
+    def _get_sprites(scale):
+        sprites = SCALED_SPRITES.get(scale)
+        if sprites is None:
+            Drawer._check_scale(scale)
+            sprites = {key: sprite.upsample(scale) for key, sprite in SPRITES.items()}
+            SCALED_SPRITES[scale] = sprites
+
+        return sprites
+
+    @staticmethod
+    def _check_scale(scale):
+        if not isinstance(scale, int) or scale < 1:
+            raise ValueError(f"Scale must be a positive integer, got: {scale}")
+
+    @staticmethod
+    def _get_sprite(obj, scale=1):
+        obj_type = obj["class"]
+        if obj_type not in SPRITE_COLOURS:
+            raise UnknownObjectTypeException(f"Unknown object type: {obj_type}")
+
+        colour = obj["colour"] if SPRITE_COLOURS[obj_type] is not None else None
+        rotation = obj["rotation"]
+        sprite = Drawer._get_sprites(scale).get((obj_type, rotation, colour))
+        if sprite is None:
+            if rotation not in ROTATIONS:
+                raise UnknownPropertyValueException(f"Unknown rotation value: {rotation}")
+            raise UnknownPropertyException(f"Unknown {obj_type} colour: {colour}")
+
+        return sprite
+
+    @staticmethod
+    def _rasterise_sprite(obj_type, rotation, colour):
+        """
+        Rasterise a sprite by drawing the object pixel by pixel onto two blank canvases
+        Pixels which match on both canvases (each filled with a different colour) belong to the sprite
+
+        :param obj_type: Class of object
+        :param rotation: Rotation of object
+        :param colour: Colour of object (None for classes which are always drawn in the same colour)
+        :return: Sprite
+        """
+
+        width, height = SPRITE_SIZES[obj_type]
+        if rotation == 1 or rotation == 3:
+            width, height = height, width
+
+        # Leave space around the object since some rotated sprites extend past their position
+        border = 2
+        canvas_size = max(width, height) + (2 * border)
+        position = [border, border, border + width - 1, border + height - 1]
+        obj = {"position": position, "class": obj_type, "colour": colour, "rotation": rotation}
+
+        zeros = np.zeros((canvas_size, canvas_size, 3), dtype=np.uint8)
+        ones = np.full((canvas_size, canvas_size, 3), 255, dtype=np.uint8)
+        Drawer._draw_obj_pixels(zeros, obj)
+        Drawer._draw_obj_pixels(ones, obj)
+
+        mask = np.all(zeros == ones, axis=2)
+        ys, xs = np.nonzero(mask)
+        y_min, y_max = ys.min(), ys.max() + 1
+        x_min, x_max = xs.min(), xs.max() + 1
+
+        rgb = zeros[y_min:y_max, x_min:x_max].copy()
+        mask = mask[y_min:y_max, x_min:x_max].copy()
+        return Sprite(rgb, mask, int(x_min) - border, int(y_min) - border)
+
+    @staticmethod
+    def _draw_obj_pixels(img, obj):
+        """
+        Draw an object onto an image pixel by pixel
+        This is the reference implementation used to rasterise sprites
+
+        :param img: Numpy array (RGB) of image
+        :param obj: Dictionary corresponding to object to draw
+        """
+
+        obj_type = obj["class"]
+        if obj_type == "octopus":
+            Drawer._draw_octopus(img, obj)
+        elif obj_type == "fish":
+            Drawer._draw_fish(img, obj)
+        elif obj_type == "bag":
+            Drawer._draw_bag(img, obj)
+        elif obj_type == "rock":
+            Drawer._draw_rock(img, obj)
+        else:
+            raise UnknownObjectTypeException()
+
     @staticmethod
     def _draw_octopus(img, octopus):
         x1, y1, x2, y2 = octopus["position"]
@@ -255,3 +536,54 @@ class Drawer:
             Drawer._set_pixel_colour(img, x_centre + x_diff, y_centre + y_diff, rgb_tuple)
         elif rotation == 3:
             Drawer._set_pixel_colour(img, x_centre - y_diff, y_centre + x_diff, rgb_tuple)  # -1
+
+
+def _build_palette_lut():
+    lut = np.full(256 * 256, UNKNOWN_COLOUR, dtype=np.uint8)
+    for idx, (_, g, b) in enumerate(PALETTE):
+        key = (g << 8) | b
+        assert lut[key] == UNKNOWN_COLOUR, "Palette colours must have unique green and blue channels"
+        lut[key] = idx
+
+    return lut
+
+
+def _build_sprites():
+    sprites = {}
+    for obj_type, colours in SPRITE_COLOURS.items():
+        colours = [None] if colours is None else colours
+        for rotation in ROTATIONS:
+            for colour in colours:
+                sprites[(obj_type, rotation, colour)] = Drawer._rasterise_sprite(obj_type, rotation, colour)
+
+    return sprites
+
+
+SPRITE_SIZES = {
+    "octopus": OCTOPUS,
+    "fish": FISH,
+    "bag": BAG,
+    "rock": ROCK
+}
+
+# Colours each class can be drawn in, None means the class is always drawn in the same colour
+SPRITE_COLOURS = {
+    "octopus": ROCK_COLOURS + [OCTO_COLOUR],
+    "fish": None,
+    "bag": None,
+    "rock": ROCK_COLOURS + [OCTO_COLOUR]
+}
+
+BACKGROUND = np.empty((FRAME_SIZE, FRAME_SIZE, 3), dtype=np.uint8)
+BACKGROUND[:, :] = (BACKGROUND_R, BACKGROUND_G, BACKGROUND_B)
+
+UNKNOWN_COLOUR = 255
+PALETTE_RGB = np.array(PALETTE, dtype=np.uint8)
+PALETTE_LUT = _build_palette_lut()
+BACKGROUND_IDXS = Drawer.to_palette(BACKGROUND)
+
+SPRITES = _build_sprites()
+
+# Backgrounds and sprites upsampled for drawing at each scale, populated on first use
+SCALED_BACKGROUNDS = {(1, False): BACKGROUND, (1, True): BACKGROUND_IDXS}
+SCALED_SPRITES = {1: SPRITES}
@@ -0,0 +1,162 @@
+import json
+import time
+import argparse
+from pathlib import Path
+
+from hvqadata.util.func import parallel_imap, print_progress
+from hvqadata.util.layout import DatasetLayout
+from hvqadata.util.tables import build_tables, concat_tables, add_offsets, save_tables
+from hvqadata.util import sqlite
+
+
+VIDEOS_PER_CHUNK = 256
+
+# Number of chunks of rows inserted into the database in each transaction
+CHUNKS_PER_TRANSACTION = 40
+
+EXPORT_FORMATS = ["tables", "sqlite"]
+
+
+def export_tables(data_dir, out_file, workers=1, compressed=True):
+    """
+    Export a dataset as columnar tables of videos, objects, events and questions (see hvqadata.util.tables)
+    Chunks of videos are read and flattened by a pool of <workers> processes
+
+    :param data_dir: Dataset directory
+    :param out_file: Path of .npz file to write
+    :param workers: Number of processes
+    :param compressed: Compress the file with zlib
+    """
+
+    layout = DatasetLayout.load(data_dir)
+    video_nums = layout.video_nums()
+    starts = range(0, len(video_nums), VIDEOS_PER_CHUNK)
+    tasks = [(video_nums[start:start + VIDEOS_PER_CHUNK], layout) for start in starts]
+
+    print("Exporting tables...")
+    start_time = time.time()
+
+    chunks = []
+    num_videos_done = 0
+    for tables in parallel_imap(_chunk_tables, tasks, workers):
+        chunks.append(tables)
+        num_videos = len(tables["videos"]["video_id"])
+        print_progress("Exported", num_videos_done + num_videos, len(video_nums), num_videos_done)
+        num_videos_done += num_videos
+
+    layout.close()
+
+    tables = concat_tables(chunks)
+    add_offsets(tables)
+    save_tables(out_file, tables, compressed)
+
+    elapsed = time.time() - start_time
+    num_rows = {table: len(columns["video_id"]) for table, columns in tables.items() if table != "offsets"}
+    print(f"Successfully exported tables with {num_rows} rows to {out_file} in {elapsed:.1f}s")
+
+
+def _chunk_tables(task):
+    """
+    Read a chunk of videos and flatten them into tables
+
+    :param task: (List of video numbers, DatasetLayout)
+    :return: Dict of tables
+    """
+
+    video_nums, layout = task
+    return build_tables(_read_videos(video_nums, layout))
+
+
+def export_sqlite(data_dir, out_file, workers=1):
+    """
+    Export a dataset as an SQLite database with videos, frames, objects, events and questions tables
+    (see hvqadata.util.sqlite)
+    Chunks of videos are read and flattened by a pool of <workers> processes, while this process inserts the rows of
+    earlier chunks with executemany, in large transactions. Indexes are created once all rows are inserted.
+
+    :param data_dir: Dataset directory
+    :param out_file: Path of database to write, an existing database is replaced
+    :param workers: Number of processes
+    """
+
+    layout = DatasetLayout.load(data_dir)
+    video_nums = layout.video_nums()
+    starts = range(0, len(video_nums), VIDEOS_PER_CHUNK)
+    tasks = [(video_nums[start:start + VIDEOS_PER_CHUNK], layout) for start in starts]
+
+    out_file = Path(out_file)
+    if out_file.exists():
+        out_file.unlink()
+
+    print("Exporting SQLite database...")
+    start_time = time.time()
+
+    conn = sqlite.create_database(out_file)
+    num_videos_done = 0
+    for chunk_idx, rows in enumerate(parallel_imap(_chunk_sql_rows, tasks, workers)):
+        sqlite.insert_rows(conn, rows)
+        if (chunk_idx + 1) % CHUNKS_PER_TRANSACTION == 0:
+            conn.commit()
+
+        num_videos = len(rows["videos"])
+        print_progress("Exported", num_videos_done + num_videos, len(video_nums), num_videos_done)
+        num_videos_done += num_videos
+
+    layout.close()
+    print("Creating indexes...")
+    sqlite.finish_database(conn)
+
+    elapsed = time.time() - start_time
+    print(f"Successfully exported {num_videos_done} videos to {out_file} in {elapsed:.1f}s")
+
+
+def _chunk_sql_rows(task):
+    """
+    Read a chunk of videos and flatten them into database rows
+
+    :param task: (List of video numbers, DatasetLayout)
+    :return: Dict of list of row tuples for each table
+    """
+
+    video_nums, layout = task
+    rows = {table: [] for table in sqlite.INSERTS.keys()}
+    for video_num, video in _read_videos(video_nums, layout):
+        for table, table_rows in sqlite.video_rows(video_num, video).items():
+            rows[table].extend(table_rows)
+
+    return rows
+
+
+def _read_videos(video_nums, layout):
+    # Shards opened for the chunk are closed once it is read, each task in a worker process has its own layout
+    videos = []
+    with layout:
+        for video_num in video_nums:
+            json_text = layout.read_video(video_num)
+            if json_text is None:
+                print(f"WARNING: No json found for video {video_num}. Skipping...")
+                continue
+
+            videos.append((video_num, json.loads(json_text)))
+
+    return videos
+
+
+def main(export_format, data_dir, out_file, workers, uncompressed):
+    if export_format == "tables":
+        export_tables(data_dir, out_file, workers, not uncompressed)
+    elif export_format == "sqlite":
+        export_sqlite(data_dir, out_file, workers)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Script for exporting a built dataset to other formats")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of processes to use")
+    parser.add_argument("--uncompressed", action="store_true", default=False,
+                        help="Do not compress exported tables")
+    parser.add_argument("export_format", type=str, choices=EXPORT_FORMATS)
+    parser.add_argument("data_dir", type=str)
+    parser.add_argument("out_file", type=str)
+    args = parser.parse_args()
+    main(args.export_format, args.data_dir, args.out_file, args.workers, args.uncompressed)
@@ -0,0 +1,47 @@
+import io
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+
+from hvqadata.build import gen_video_dict
+from hvqadata.util.tables import build_tables, concat_tables, add_offsets
+
+try:
+    from hvqadata import analyse
+except ImportError:
+    analyse = None
+
+
+SEED = 0
+
+
+@unittest.skipIf(analyse is None, "matplotlib is not installed")
+class AnalyseTest(unittest.TestCase):
+    def setUp(self):
+        videos = [(video_num, gen_video_dict(SEED, video_num)) for video_num in range(4)]
+
+        self.video_dicts = [video for _, video in videos]
+        self.tables = concat_tables([build_tables(videos[:2]), build_tables(videos[2:])])
+        add_offsets(self.tables)
+
+    def output(self, func, arg):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout), mock.patch.object(analyse.plt, "show"):
+            func(arg)
+
+        return stdout.getvalue()
+
+    def test_tables_match_dicts(self):
+        funcs = [
+            (analyse.count_events, analyse.count_events_table),
+            (analyse.count_colours, analyse.count_colours_table),
+            (analyse.count_rotations, analyse.count_rotations_table),
+            (analyse.count_fish_eaten, analyse.count_fish_eaten_table),
+            (analyse.analyse_questions, analyse.analyse_questions_table),
+            (analyse.analyse_answers, analyse.analyse_answers_table)
+        ]
+        for dict_func, table_func in funcs:
+            with self.subTest(func=dict_func.__name__):
+                expected = self.output(dict_func, self.video_dicts)
+                self.assertNotEqual("", expected)
+                self.assertEqual(expected, self.output(table_func, self.tables))
@@ -0,0 +1,47 @@
+import random
+import unittest
+
+import hvqadata.util.backend as backend
+from hvqadata.video.video import Video
+from hvqadata.util.definitions import CLOSE_OCTO
+
+
+def gen_videos(backend_name, num_videos=20):
+    backend.set_backend(backend_name)
+    random.seed(0)
+    videos = []
+    for _ in range(num_videos):
+        video = Video()
+        video.random_video()
+        videos.append(video.to_dict())
+
+    return videos
+
+
+class BackendTest(unittest.TestCase):
+    def setUp(self):
+        self.prev_backend = backend.get_backend().name
+        self.expected = gen_videos("python")
+
+    def tearDown(self):
+        backend.set_backend(self.prev_backend)
+
+    def test_numpy_backend_parity(self):
+        self.assertEqual(self.expected, gen_videos("numpy"))
+
+    @unittest.skipUnless(backend.numba is not None, "numba is not installed")
+    def test_numba_backend_parity(self):
+        self.assertEqual(self.expected, gen_videos("numba"))
+
+    def test_close_to_box(self):
+        box = [100, 100, 116, 116]
+        boxes = [[120, 120, 130, 130], [130, 100, 140, 110], [90, 90, 130, 130], [50, 105, 60, 110]]
+        expected = [True, False, True, False]
+        for name in backend.available_backends():
+            close = backend.BACKENDS[name].close_to_box(box, boxes, CLOSE_OCTO)
+            self.assertEqual(expected, close, f"Backend: {name}")
+            self.assertEqual([], backend.BACKENDS[name].close_to_box(box, [], CLOSE_OCTO))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            backend.set_backend("fortran")
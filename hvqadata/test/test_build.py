@@ -0,0 +1,187 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from PIL import Image
+from pathlib import Path
+
+from hvqadata.build import FrameOptions, write_json, create_videos, build_videos, build_distributed, unique_frames, \
+    main
+from hvqadata.util.jobs import JobTable
+from hvqadata.util.clips import NPY
+from hvqadata.util.compression import NONE, GZIP, ZSTD
+from hvqadata.util.layout import DatasetLayout, JSON_FORMATS, BUCKETED, FLAT, FILES, JSONL, LAYOUT_FILE
+from hvqadata.util.schema import SCHEMA_V2
+from hvqadata.util.manifest import MANIFEST_FILE
+
+
+NUM_VIDEOS = 4
+SEED = 1234
+
+# Chunks are small enough to spread the videos across every worker
+VIDEOS_PER_CHUNK = 1
+
+
+class BuildTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def new_dataset(self, name, **layout_args):
+        Path(name).mkdir()
+        DatasetLayout(name, **layout_args).save()
+        return name
+
+    def read_frames(self, video_dir):
+        num_frames = len(list(video_dir.glob("frame_*.png")))
+        return [np.array(Image.open(video_dir / f"frame_{i}.png")) for i in range(num_frames)]
+
+    def run_main(self, out_dir, **flags):
+        args = dict(num_videos=NUM_VIDEOS, json_only=True, frames_only=False, frame_options=FrameOptions(),
+                    workers=1, seed=SEED, single_pass=False, resume=False, verify=False, distributed=False,
+                    finalize=False, range_size=2, stale_timeout=60.0, layout=None, json_format=None, tar_shards=False,
+                    videos_per_shard=1, max_shard_bytes=None, frame_store=False, json_compression=None,
+                    json_dict=False, json_schema=None)
+        args.update(flags)
+        main(out_dir, **args)
+
+    def resume(self, out_dir, layout=None, json_only=True, frame_store=False):
+        self.run_main(out_dir, resume=True, layout=layout, json_only=json_only, frame_store=frame_store)
+
+    def read_files(self, out_dir):
+        out_dir = Path(out_dir)
+        return {str(path.relative_to(out_dir)): path.read_bytes() for path in sorted(out_dir.rglob("*"))
+                if path.is_file()}
+
+    def test_dedup_links_repeated_frames(self):
+        write_json("out", NUM_VIDEOS, seed=SEED)
+        create_videos("out", FrameOptions())
+        video_dirs = [Path("out") / str(video_num) for video_num in range(NUM_VIDEOS)]
+        expected = [self.read_frames(video_dir) for video_dir in video_dirs]
+        create_videos("out", FrameOptions(dedup=True))
+
+        num_repeated = 0
+        for video_dir, expected_frames in zip(video_dirs, expected):
+            frames = json.loads((video_dir / "video.json").read_text())["frames"]
+            _, frame_idxs = unique_frames(frames)
+
+            # Frames are linked to the first occurrence of the same frame, distinct frames are separate files
+            first_inodes = {}
+            for i, frame_idx in enumerate(frame_idxs):
+                inode = (video_dir / f"frame_{i}.png").stat().st_ino
+                if frame_idx in first_inodes:
+                    self.assertEqual(first_inodes[frame_idx], inode)
+                    num_repeated += 1
+                else:
+                    self.assertNotIn(inode, first_inodes.values())
+                    first_inodes[frame_idx] = inode
+
+            frames = self.read_frames(video_dir)
+            self.assertEqual(len(expected_frames), len(frames))
+            for expected_frame, frame in zip(expected_frames, frames):
+                self.assertTrue((expected_frame == frame).all())
+
+        self.assertGreater(num_repeated, 0)
+
+    @mock.patch("hvqadata.build.VIDEOS_PER_CHUNK", VIDEOS_PER_CHUNK)
+    def test_create_videos_workers(self):
+        write_json("workers_1", NUM_VIDEOS, seed=SEED)
+        shutil.copytree("workers_1", "workers_2")
+        for workers in [1, 2]:
+            create_videos(f"workers_{workers}", FrameOptions(), workers=workers)
+
+        files = self.read_files("workers_1")
+        self.assertIn("0/frame_0.png", files)
+        self.assertEqual(files, self.read_files("workers_2"))
+
+    @mock.patch("hvqadata.build.VIDEOS_PER_CHUNK", VIDEOS_PER_CHUNK)
+    def test_write_json_workers(self):
+        for json_format in JSON_FORMATS:
+            with self.subTest(json_format=json_format):
+                for workers in [1, 3]:
+                    out_dir = self.new_dataset(f"{json_format}_{workers}", json_format=json_format)
+                    write_json(out_dir, NUM_VIDEOS, workers=workers, seed=SEED)
+
+                self.assertEqual(list(range(NUM_VIDEOS)), DatasetLayout.load(f"{json_format}_1").video_nums())
+                self.assertEqual(self.read_files(f"{json_format}_1"), self.read_files(f"{json_format}_3"))
+
+    def test_single_pass_matches_two_phase(self):
+        for json_format in JSON_FORMATS:
+            for dedup in [False, True]:
+                with self.subTest(json_format=json_format, dedup=dedup):
+                    options = FrameOptions(dedup=dedup)
+                    two_phase_dir = self.new_dataset(f"two_phase_{json_format}_{dedup}", json_format=json_format)
+                    write_json(two_phase_dir, NUM_VIDEOS, seed=SEED)
+                    create_videos(two_phase_dir, options)
+
+                    single_pass_dir = self.new_dataset(f"single_pass_{json_format}_{dedup}", json_format=json_format)
+                    build_videos(single_pass_dir, NUM_VIDEOS, options, seed=SEED)
+
+                    # Only single pass builds have a manifest
+                    files = self.read_files(single_pass_dir)
+                    self.assertIn(MANIFEST_FILE, files)
+                    del files[MANIFEST_FILE]
+                    self.assertEqual(self.read_files(two_phase_dir), files)
+
+    def test_distributed_settings_mismatch(self):
+        out_dir = "distributed"
+        JobTable(out_dir).create({"num_videos": NUM_VIDEOS, "range_size": 2, "seed": SEED, "json_only": True,
+                                  "options": FrameOptions().key(), "layout": FLAT, "json_compression": NONE,
+                                  "json_schema": SCHEMA_V2})
+        with self.assertRaisesRegex(ValueError, "json_schema is 2"):
+            build_distributed(out_dir, NUM_VIDEOS, json_only=True)
+
+    def test_resume_creates_layout(self):
+        out_dir = "resume"
+        self.resume(out_dir, BUCKETED)
+
+        layout = DatasetLayout.load(out_dir)
+        self.assertEqual(BUCKETED, layout.name)
+        self.assertEqual([(video_num, layout.video_dir(video_num)) for video_num in range(NUM_VIDEOS)],
+                         layout.video_dirs())
+
+        # The saved layout is kept when resuming without the flag, and conflicting flags are rejected
+        self.resume(out_dir)
+        self.assertEqual(BUCKETED, DatasetLayout.load(out_dir).name)
+        with self.assertRaises(SystemExit):
+            self.resume(out_dir, FLAT)
+
+    def test_resume_frame_store_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.resume("frame_store", json_only=False, frame_store=True)
+        self.assertFalse(Path("frame_store").exists())
+
+    def test_tar_shards_rejects_formats(self):
+        flags = [{"json_only": True}, {"json_schema": SCHEMA_V2}, {"json_compression": GZIP}, {"layout": FLAT},
+                 {"json_format": FILES}, {"frame_options": FrameOptions(container=NPY)}]
+        for flag in flags:
+            with self.subTest(flag=flag):
+                with self.assertRaises(SystemExit):
+                    self.run_main("tar_shards", **{"json_only": False, "tar_shards": True, **flag})
+                self.assertFalse(Path("tar_shards").exists())
+
+    def test_resume_jsonl_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.run_main("new_jsonl", resume=True, json_format=JSONL)
+        self.assertFalse(Path("new_jsonl").exists())
+
+        out_dir = self.new_dataset("jsonl", json_format=JSONL)
+        with self.assertRaises(SystemExit):
+            self.resume(out_dir)
+        self.assertEqual([LAYOUT_FILE], os.listdir(out_dir))
+
+    @mock.patch("hvqadata.util.compression.zstandard", None)
+    def test_missing_zstd_keeps_dataset(self):
+        out_dir = self.new_dataset("zstd")
+        with self.assertRaises(SystemExit):
+            self.run_main(out_dir, json_compression=ZSTD)
+        self.assertEqual([LAYOUT_FILE], os.listdir(out_dir))
+        self.assertEqual(NONE, DatasetLayout.load(out_dir).json_compression)
@@ -0,0 +1,56 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from hvqadata.build import FrameOptions, draw_video_frames, save_video_frames, gen_video_dict
+from hvqadata.draw import Drawer
+from hvqadata.util.clips import read_clip, CONTAINERS
+
+
+SEED = 0
+
+
+class ClipTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.frames = gen_video_dict(SEED, 0)["frames"]
+        self.expected = Drawer.draw_frames(self.frames)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        for container in CONTAINERS:
+            for palette in [False, True]:
+                with self.subTest(container=container, palette=palette):
+                    options = FrameOptions(dedup=True, palette=palette, container=container)
+                    video_dir = Path(self.tmp_dir.name) / f"{container}_{palette}"
+                    np_imgs, frame_idxs = draw_video_frames(self.frames, options)
+                    num_frames, _, records = save_video_frames(video_dir, np_imgs, frame_idxs, options)
+
+                    self.assertEqual(len(self.frames), num_frames)
+                    self.assertEqual(sorted(records.keys()), sorted(path.name for path in video_dir.iterdir()))
+                    self.assertTrue((self.expected == read_clip(video_dir)).all())
+
+    def test_palette_indices(self):
+        options = FrameOptions(palette=True, container="npy")
+        video_dir = Path(self.tmp_dir.name)
+        np_imgs, frame_idxs = draw_video_frames(self.frames, options)
+        save_video_frames(video_dir, np_imgs, frame_idxs, options)
+        self.assertEqual(self.expected.shape[:3], read_clip(video_dir, rgb=False).shape)
+
+    def test_rebuild_other_container(self):
+        for old in CONTAINERS:
+            for new in CONTAINERS:
+                with self.subTest(old=old, new=new):
+                    video_dir = Path(self.tmp_dir.name) / f"{old}_{new}"
+                    options = FrameOptions(container=old)
+                    np_imgs, frame_idxs = draw_video_frames(self.frames[::-1], options)
+                    save_video_frames(video_dir, np_imgs, frame_idxs, options)
+
+                    # The stale reversed frames of the old container must not be read
+                    options = FrameOptions(container=new)
+                    np_imgs, frame_idxs = draw_video_frames(self.frames, options)
+                    _, _, records = save_video_frames(video_dir, np_imgs, frame_idxs, options)
+                    self.assertEqual(sorted(records.keys()), sorted(path.name for path in video_dir.iterdir()))
+                    self.assertTrue((self.expected == read_clip(video_dir)).all())
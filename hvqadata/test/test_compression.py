@@ -0,0 +1,83 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from hvqadata.build import gen_video_dict
+from hvqadata.util import compression
+from hvqadata.util.compression import JsonCodec, NONE, GZIP, ZSTD, JSON_FILES, train_dictionary
+from hvqadata.util.layout import DatasetLayout, BUCKETED
+
+
+SEED = 0
+
+
+class CompressionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmp_dir.name)
+
+        self.texts = [json.dumps(gen_video_dict(SEED, video_num)) for video_num in range(3)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_gzip_codec(self):
+        codec = JsonCodec(GZIP)
+        data = codec.compress(self.texts[0])
+        self.assertLess(len(data), len(self.texts[0]) // 4)
+        self.assertEqual(self.texts[0], codec.decompress(data))
+        self.assertEqual(data, codec.compress(self.texts[0]))
+
+    def test_layout_round_trip(self):
+        layout = DatasetLayout(self.data_dir, BUCKETED, json_compression=GZIP)
+        layout.save()
+        for video_num, text in enumerate(self.texts):
+            layout.write_video(video_num, text)
+
+        loaded = DatasetLayout.load(self.data_dir)
+        self.assertEqual(GZIP, loaded.json_compression)
+        self.assertEqual(layout.video_dir(1) / JSON_FILES[GZIP], loaded.json_file(1))
+        self.assertEqual([0, 1, 2], loaded.video_nums())
+        self.assertEqual(self.texts, [loaded.read_video(video_num) for video_num in range(3)])
+
+    def test_detect_compression(self):
+        DatasetLayout(self.data_dir, json_compression=GZIP).write_video(0, self.texts[0])
+        DatasetLayout(self.data_dir).write_video(1, self.texts[1])
+
+        layout = DatasetLayout(self.data_dir)
+        self.assertEqual(self.texts[0], layout.read_video(0))
+        self.assertEqual(self.texts[1], layout.read_video(1))
+        self.assertIsNone(layout.read_video(2))
+
+    def test_layout_file_preferred(self):
+        # A stale file of another compression is ignored when the layout's own file exists
+        for stale, current in [(NONE, GZIP), (GZIP, NONE)]:
+            with self.subTest(stale=stale, current=current):
+                data_dir = self.data_dir / current
+                DatasetLayout(data_dir, json_compression=stale).write_video(0, self.texts[0])
+                layout = DatasetLayout(data_dir, json_compression=current)
+                layout.write_video(0, self.texts[1])
+                self.assertEqual(self.texts[1], layout.read_video(0))
+
+    @unittest.skipUnless(compression.zstandard is not None, "zstandard is not installed")
+    def test_zstd_dict(self):
+        layout = DatasetLayout(self.data_dir, json_compression=ZSTD, json_dict=True)
+        layout.save_dict(train_dictionary(self.texts * 10, 4096))
+        layout.save()
+        for video_num, text in enumerate(self.texts):
+            layout.write_video(video_num, text)
+
+        loaded = DatasetLayout.load(self.data_dir)
+        self.assertEqual(self.texts, [loaded.read_video(video_num) for video_num in range(3)])
+        self.assertTrue(loaded.json_file(0).name.endswith(".zst"))
+
+    def test_jsonl_not_compressed(self):
+        with self.assertRaises(ValueError):
+            DatasetLayout(self.data_dir, json_format="jsonl", json_compression=GZIP)
+
+        self.assertEqual(NONE, DatasetLayout(self.data_dir, json_format="jsonl").json_compression)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from hvqadata.build import FrameOptions, build_videos
+from hvqadata.convert import convert_schema
+from hvqadata.util.layout import DatasetLayout
+from hvqadata.util.manifest import BuildManifest
+from hvqadata.util.schema import SCHEMA_V2
+
+
+NUM_VIDEOS = 3
+
+
+class ConvertTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.out_dir = Path(self.tmp_dir.name)
+        DatasetLayout(self.out_dir).save()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_manifest_updated(self):
+        options = FrameOptions()
+        build_videos(self.out_dir, NUM_VIDEOS, options, seed=0)
+        convert_schema(self.out_dir, SCHEMA_V2)
+
+        layout = DatasetLayout.load(self.out_dir)
+        self.assertEqual(SCHEMA_V2, layout.json_schema)
+
+        manifest = BuildManifest(self.out_dir)
+        manifest.load()
+        for video_num in range(NUM_VIDEOS):
+            self.assertTrue(manifest.is_complete(video_num, layout.video_dir(video_num), options.key(), verify=True))
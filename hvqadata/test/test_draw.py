@@ -0,0 +1,111 @@
+import random
+import unittest
+
+import numpy as np
+
+from hvqadata.draw import Drawer, PALETTE_RGB
+from hvqadata.video.video import Video
+from hvqadata.util.definitions import *
+from hvqadata.util.exceptions import UnknownPropertyValueException
+
+
+def draw_frame_pixels(frame_dict):
+    img = np.empty((FRAME_SIZE, FRAME_SIZE, 3), dtype=np.uint8)
+    img[:, :] = (BACKGROUND_R, BACKGROUND_G, BACKGROUND_B)
+    for obj in frame_dict["objects"]:
+        Drawer._draw_obj_pixels(img, obj)
+
+    return img
+
+
+class DrawerTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.videos = []
+        for _ in range(5):
+            video = Video()
+            video.random_video()
+            self.videos.append(video.to_dict())
+
+    def test_draw_frame_matches_pixel_drawing(self):
+        for video in self.videos:
+            for frame in video["frames"]:
+                expected = draw_frame_pixels(frame)
+                img = Drawer.draw_frame(frame)
+                self.assertEqual(np.uint8, img.dtype)
+                np.testing.assert_array_equal(expected, img)
+
+    def test_draw_frame_all_sprites(self):
+        for obj_type, colour, size in [("octopus", "blue", OCTOPUS), ("fish", FISH_COLOUR, FISH),
+                                       ("bag", BAG_COLOUR, BAG), ("rock", "green", ROCK)]:
+            for rotation in ROTATIONS:
+                width, height = size if rotation in [0, 2] else size[::-1]
+                position = [100, 100, 100 + width - 1, 100 + height - 1]
+                obj = {"position": position, "class": obj_type, "colour": colour, "rotation": rotation}
+                frame = {"objects": [obj]}
+                np.testing.assert_array_equal(draw_frame_pixels(frame), Drawer.draw_frame(frame))
+
+    def test_draw_frames_matches_draw_frame(self):
+        frames = [frame for video in self.videos for frame in video["frames"]]
+        imgs = Drawer.draw_frames(frames)
+        self.assertEqual((len(frames), FRAME_SIZE, FRAME_SIZE, 3), imgs.shape)
+        for frame, img in zip(frames, imgs):
+            np.testing.assert_array_equal(Drawer.draw_frame(frame), img)
+
+    def test_draw_frames_overlapping_objects(self):
+        rock = {"position": [100, 100, 111, 111], "class": "rock", "colour": "blue", "rotation": 0}
+        octopus = {"position": [105, 105, 121, 121], "class": "octopus", "colour": "red", "rotation": 2}
+        frames = [{"objects": [rock, octopus]}, {"objects": [octopus, rock]}]
+        imgs = Drawer.draw_frames(frames)
+        for frame, img in zip(frames, imgs):
+            np.testing.assert_array_equal(draw_frame_pixels(frame), img)
+
+    def test_draw_frames_reuses_out(self):
+        frames = self.videos[0]["frames"]
+        out = np.zeros((len(frames), FRAME_SIZE, FRAME_SIZE, 3), dtype=np.uint8)
+        imgs = Drawer.draw_frames(frames, out=out)
+        self.assertIs(out, imgs)
+        np.testing.assert_array_equal(Drawer.draw_frames(frames), out)
+
+    def test_draw_video_matches_draw_frame(self):
+        for video in self.videos:
+            frames = video["frames"]
+            imgs = Drawer.draw_video(frames)
+            self.assertEqual((len(frames), FRAME_SIZE, FRAME_SIZE, 3), imgs.shape)
+            for frame, img in zip(frames, imgs):
+                np.testing.assert_array_equal(Drawer.draw_frame(frame), img)
+
+    def test_draw_scaled_matches_upsampled_frame(self):
+        frames = self.videos[0]["frames"]
+        for scale in [2, 3]:
+            expected = [Drawer.draw_frame(frame).repeat(scale, axis=0).repeat(scale, axis=1) for frame in frames]
+            np.testing.assert_array_equal(expected[0], Drawer.draw_frame(frames[0], scale))
+            np.testing.assert_array_equal(expected, Drawer.draw_frames(frames, scale=scale))
+            np.testing.assert_array_equal(expected, Drawer.draw_video(frames, scale))
+
+    def test_to_palette_round_trip(self):
+        imgs = Drawer.draw_frames(self.videos[0]["frames"])
+        idxs = Drawer.to_palette(imgs)
+        self.assertEqual(imgs.shape[:-1], idxs.shape)
+        np.testing.assert_array_equal(imgs, PALETTE_RGB[idxs])
+
+    def test_draw_indexed_matches_rgb(self):
+        frames = self.videos[1]["frames"]
+        expected = Drawer.draw_frames(frames)
+        np.testing.assert_array_equal(expected[0], Drawer.to_rgb(Drawer.draw_frame(frames[0], indexed=True)))
+        for scale in [1, 2]:
+            expected = Drawer.draw_frames(frames, scale=scale)
+            idxs = Drawer.draw_frames(frames, scale=scale, indexed=True)
+            self.assertEqual(expected.shape[:-1], idxs.shape)
+            np.testing.assert_array_equal(expected, Drawer.to_rgb(idxs))
+            np.testing.assert_array_equal(idxs, Drawer.draw_video(frames, scale, indexed=True))
+
+    def test_to_palette_unknown_colour(self):
+        img = Drawer.draw_frame(self.videos[0]["frames"][0])
+        img[0, 0] = (1, 2, 3)
+        with self.assertRaises(UnknownPropertyValueException):
+            Drawer.to_palette(img)
+
+    def test_draw_frames_empty(self):
+        imgs = Drawer.draw_frames([])
+        self.assertEqual((0, FRAME_SIZE, FRAME_SIZE, 3), imgs.shape)
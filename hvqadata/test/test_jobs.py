@@ -0,0 +1,110 @@
+import os
+import time
+import tempfile
+import unittest
+
+from hvqadata.util.jobs import JobTable, Heartbeat
+
+
+class JobTableTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+
+        self.table = JobTable("out", stale_timeout=60)
+        self.table.create({"num_videos": 10, "range_size": 4})
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def other_worker(self, stale_timeout=60):
+        table = JobTable("out", stale_timeout)
+        table.worker = "other"
+        table.load()
+        return table
+
+    def test_ranges(self):
+        self.assertEqual([(0, 4), (4, 8), (8, 10)], self.table.ranges())
+
+    def test_join_uses_existing_config(self):
+        table = JobTable("out")
+        config = table.create({"num_videos": 20, "range_size": 5})
+        self.assertEqual({"num_videos": 10, "range_size": 4}, config)
+
+    def test_claims_are_exclusive(self):
+        other = self.other_worker()
+        self.assertEqual((0, 4), self.table.claim())
+        self.assertEqual((4, 8), other.claim())
+        self.assertEqual((8, 10), self.table.claim())
+        self.assertIsNone(other.claim())
+
+    def test_complete(self):
+        start, _ = self.table.claim()
+        self.table.complete(start, [{"video": 0}])
+        self.assertTrue(self.table.is_done(start))
+        self.assertEqual([{"video": 0}], self.table.records(start))
+
+        # Done ranges are never claimed again
+        self.assertEqual((4, 8), self.other_worker().claim())
+
+    def test_reclaim_stale(self):
+        start, _ = self.table.claim()
+        claim_file = self.table.dir / f"{start}.claim"
+        old_time = time.time() - 120
+        os.utime(claim_file, (old_time, old_time))
+
+        other = self.other_worker()
+        self.assertEqual((0, 4), other.claim())
+        self.assertFalse(self.table.heartbeat(start))
+        self.assertTrue(other.heartbeat(start))
+
+    def test_heartbeat_keeps_claim(self):
+        clock = FakeClock(1000.0)
+        table = JobTable("out", stale_timeout=60, clock=clock)
+        table.load()
+        start, _ = table.claim()
+
+        clock.now += 50
+        self.assertTrue(table.heartbeat(start))
+        clock.now += 50
+
+        other = self.other_worker()
+        other.clock = clock
+        self.assertNotEqual((0, 4), other.claim())
+
+    def test_heartbeat_detects_lost_claim(self):
+        clock = FakeClock(1000.0)
+        self.table.clock = clock
+        start, _ = self.table.claim()
+
+        # The heartbeat thread never fires during the test, the claim is only checked by held() and stop()
+        heartbeat = Heartbeat(self.table, start, interval=3600)
+        self.assertTrue(heartbeat.held())
+
+        clock.now += 120
+        other = self.other_worker()
+        other.clock = clock
+        self.assertEqual((0, 4), other.claim())
+
+        self.assertFalse(heartbeat.held())
+        self.assertTrue(heartbeat.lost)
+        self.assertFalse(heartbeat.stop())
+        self.assertTrue(other.holds(start))
+
+    def test_heartbeat_detects_removed_claim(self):
+        start, _ = self.table.claim()
+        heartbeat = Heartbeat(self.table, start, interval=3600)
+        (self.table.dir / f"{start}.claim").unlink()
+
+        self.assertFalse(heartbeat.held())
+        self.assertFalse(heartbeat.stop())
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,45 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from hvqadata.util.layout import DatasetLayout, BUCKETED, FLAT
+
+
+class DatasetLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_default_flat(self):
+        layout = DatasetLayout.load(self.data_dir)
+        self.assertEqual(FLAT, layout.name)
+        self.assertEqual(self.data_dir / "12", layout.video_dir(12))
+
+    def test_bucketed_dirs(self):
+        layout = DatasetLayout(self.data_dir, BUCKETED)
+        self.assertEqual(self.data_dir / "00" / "00" / "12", layout.video_dir(12))
+        self.assertEqual(self.data_dir / "00" / "01" / "256", layout.video_dir(256))
+        self.assertEqual(self.data_dir / "0f" / "42" / "1000000", layout.video_dir(1000000))
+
+    def test_save_load(self):
+        DatasetLayout(self.data_dir, BUCKETED).save()
+        self.assertEqual(BUCKETED, DatasetLayout.load(self.data_dir).name)
+
+    def test_video_dirs(self):
+        for name in [FLAT, BUCKETED]:
+            with self.subTest(name=name):
+                data_dir = self.data_dir / name
+                layout = DatasetLayout(data_dir, name)
+                video_nums = [700, 3, 100000, 256, 10]
+                for video_num in video_nums:
+                    layout.video_dir(video_num).mkdir(parents=True)
+
+                # Files and other directories are ignored
+                layout.save()
+                (data_dir / "jobs").mkdir()
+
+                expected = [(video_num, layout.video_dir(video_num)) for video_num in sorted(video_nums)]
+                self.assertEqual(expected, layout.video_dirs())
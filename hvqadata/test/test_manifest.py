@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from hvqadata.util.manifest import BuildManifest, file_record
+
+
+class BuildManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+
+        self.video_dir = Path("out/0")
+        self.video_dir.mkdir(parents=True)
+        self.data = [b"json", b"frame 0", b"frame 1"]
+        files = ["video.json", "frame_0.png", "frame_1.png"]
+        for file, data in zip(files, self.data):
+            (self.video_dir / file).write_bytes(data)
+
+        manifest = BuildManifest("out")
+        manifest.start(5)
+        records = [file_record(data) for data in self.data]
+        frame_records = {"frame_0.png": records[1], "frame_1.png": records[2]}
+        manifest.record([BuildManifest.video_record(0, "opts", records[0], frame_records)])
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def load(self):
+        manifest = BuildManifest("out")
+        manifest.load()
+        return manifest
+
+    def test_load(self):
+        manifest = self.load()
+        self.assertEqual(5, manifest.seed)
+        self.assertTrue(manifest.is_complete(0, self.video_dir, "opts", verify=True))
+        self.assertTrue(manifest.is_complete(0, self.video_dir, None))
+        self.assertFalse(manifest.is_complete(1, self.video_dir, "opts"))
+
+    def test_options_changed(self):
+        manifest = self.load()
+        self.assertFalse(manifest.is_complete(0, self.video_dir, "other opts"))
+
+    def test_missing_file(self):
+        (self.video_dir / "frame_1.png").unlink()
+        manifest = self.load()
+        self.assertFalse(manifest.is_complete(0, self.video_dir, "opts"))
+        self.assertTrue(manifest.is_complete(0, self.video_dir, None))
+
+    def test_corrupt_file(self):
+        (self.video_dir / "frame_0.png").write_bytes(b"frame 2")
+        manifest = self.load()
+        self.assertTrue(manifest.is_complete(0, self.video_dir, "opts"))
+        self.assertFalse(manifest.is_complete(0, self.video_dir, "opts", verify=True))
+
+    def test_partial_line(self):
+        with (Path("out") / "manifest.jsonl").open("a") as f:
+            f.write('{"video": 1, "opt')
+
+        manifest = self.load()
+        self.assertEqual([0], list(manifest.videos.keys()))
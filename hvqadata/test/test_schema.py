@@ -0,0 +1,46 @@
+import json
+import unittest
+
+from hvqadata.build import gen_video_dict
+from hvqadata.util.schema import to_schema, video_frames, schema_version, SCHEMA_V1, SCHEMA_V2
+from hvqadata.util.exceptions import UnknownSchemaException
+
+
+SEED = 0
+
+
+class SchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.videos = [gen_video_dict(SEED, video_num) for video_num in range(10)]
+
+    def test_round_trip(self):
+        for video in self.videos:
+            compact = json.loads(json.dumps(to_schema(video, SCHEMA_V2)))
+            self.assertEqual(SCHEMA_V2, schema_version(compact))
+            self.assertEqual(video, to_schema(compact, SCHEMA_V1))
+            self.assertEqual(video["frames"], video_frames(compact))
+
+    def test_static_objects_removed(self):
+        for video in self.videos:
+            compact = to_schema(video, SCHEMA_V2)
+            self.assertEqual(len(video["frames"]), len(compact["octopus"]))
+            self.assertEqual(len(video["frames"][0]["objects"]) - 1, len(compact["static_objects"]))
+
+            num_eaten = sum(event.startswith("eat") for frame_events in video["events"] for event in frame_events)
+            num_removed = sum(obj["removed"] is not None for obj in compact["static_objects"])
+            self.assertEqual(num_eaten, num_removed)
+
+    def test_same_schema(self):
+        video = self.videos[0]
+        self.assertIs(video, to_schema(video, SCHEMA_V1))
+        self.assertEqual(SCHEMA_V1, schema_version(video))
+
+    def test_unknown_schema(self):
+        with self.assertRaises(UnknownSchemaException):
+            to_schema(self.videos[0], 3)
+        with self.assertRaises(UnknownSchemaException):
+            video_frames({"version": 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import tempfile
+import unittest
+
+from hvqadata.util.shards import JsonlShardWriter, JsonlShardReader, shard_file
+from hvqadata.util.layout import DatasetLayout, JSONL
+
+
+class JsonlShardTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_by_id(self):
+        videos = {video_num: json.dumps({"video": video_num, "text": "é" * video_num}) for video_num in range(10)}
+        with JsonlShardWriter(self.data_dir, videos_per_shard=3) as writer:
+            for video_num in [4, 0, 9, 1, 2, 3, 5, 8, 7, 6]:
+                writer.write(video_num, videos[video_num])
+
+        self.assertTrue(shard_file(self.data_dir, 3).exists())
+        with JsonlShardReader(self.data_dir) as reader:
+            self.assertEqual(list(range(10)), reader.video_nums())
+            for video_num, text in videos.items():
+                self.assertEqual(text, reader.read(video_num))
+
+    def test_missing_videos(self):
+        with JsonlShardWriter(self.data_dir) as writer:
+            writer.write(2, "{}")
+
+        with JsonlShardReader(self.data_dir) as reader:
+            self.assertEqual([2], reader.video_nums())
+            self.assertIsNone(reader.read(0))
+            self.assertIsNone(reader.read(5))
+            self.assertEqual("{}", reader.read(2))
+
+    def test_empty(self):
+        JsonlShardWriter(self.data_dir).close()
+        with JsonlShardReader(self.data_dir) as reader:
+            self.assertEqual([], reader.video_nums())
+
+    def test_layout_close(self):
+        with JsonlShardWriter(self.data_dir, videos_per_shard=2) as writer:
+            for video_num in range(4):
+                writer.write(video_num, json.dumps({"video": video_num}))
+
+        layout = DatasetLayout(self.data_dir, json_format=JSONL)
+        with layout:
+            self.assertEqual('{"video": 3}', layout.read_video(3))
+            reader = layout._reader
+            self.assertEqual(1, len(reader._fds))
+
+        self.assertEqual({}, reader._fds)
+        self.assertIsNone(layout._reader)
+
+        # Shards are reopened when the layout is read from again
+        self.assertEqual('{"video": 0}', layout.read_video(0))
+        layout.close()
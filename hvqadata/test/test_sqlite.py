@@ -0,0 +1,69 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from hvqadata.build import gen_video_dict
+from hvqadata.util import sqlite
+
+
+SEED = 0
+
+
+class SqliteTest(unittest.TestCase):
+    def setUp(self):
+        self.videos = [(video_num, gen_video_dict(SEED, video_num)) for video_num in [0, 2, 5]]
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = Path(self.tmp_dir.name) / "videos.db"
+        conn = sqlite.create_database(path)
+        for video_num, video in self.videos:
+            sqlite.insert_rows(conn, sqlite.video_rows(video_num, video))
+        sqlite.finish_database(conn)
+
+        self.conn = sqlite3.connect(path)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp_dir.cleanup()
+
+    def test_rows_match_videos(self):
+        for video_num, video in self.videos:
+            rows = self.conn.execute("SELECT frame_idx, class, colour, rotation, x1, y1, x2, y2 FROM objects "
+                                     "WHERE video_id = ? ORDER BY frame_idx, obj_idx", (video_num,)).fetchall()
+            expected = [(frame_idx, obj["class"], obj["colour"], obj["rotation"], *obj["position"])
+                        for frame_idx, frame in enumerate(video["frames"]) for obj in frame["objects"]]
+            self.assertEqual(expected, rows)
+
+            rows = self.conn.execute("SELECT question, answer FROM questions WHERE video_id = ? ORDER BY q_idx",
+                                     (video_num,)).fetchall()
+            self.assertEqual(list(zip(video["questions"], video["answers"])), rows)
+
+    def test_event_query(self):
+        for video_num, video in self.videos:
+            rows = self.conn.execute("SELECT frame_idx, event, from_colour, to_colour, description FROM events "
+                                     "WHERE video_id = ? ORDER BY frame_idx, rowid", (video_num,)).fetchall()
+            self.assertEqual([event for frame_events in video["events"] for event in frame_events],
+                             [description for _, _, _, _, description in rows])
+
+            for frame_idx, event, from_colour, to_colour, description in rows:
+                if event == "change colour":
+                    self.assertEqual(f"change colour from {from_colour} to {to_colour}", description)
+                else:
+                    self.assertEqual(event, description)
+                    self.assertIsNone(from_colour)
+
+        expected = sorted(video_num for video_num, video in self.videos
+                          if any("move" in frame_events for frame_events in video["events"][:10]))
+        rows = self.conn.execute("SELECT DISTINCT video_id FROM events WHERE event = 'move' AND frame_idx < 10 "
+                                 "ORDER BY video_id").fetchall()
+        self.assertEqual(expected, [video_id for video_id, in rows])
+
+    def test_indexes(self):
+        names = [name for name, in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        for statement in sqlite.INDEXES:
+            self.assertIn(statement.split(" ")[2], names)
+
+
+if __name__ == '__main__':
+    unittest.main()
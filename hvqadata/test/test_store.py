@@ -0,0 +1,47 @@
+import json
+import tempfile
+import unittest
+
+import numpy as np
+
+from hvqadata.build import FrameOptions, write_video_json, create_frame_store, gen_video_dict
+from hvqadata.draw import Drawer
+from hvqadata.util.layout import DatasetLayout
+from hvqadata.util.store import FrameStore
+
+
+SEED = 0
+
+
+class FrameStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp_dir.name
+        layout = DatasetLayout(self.data_dir)
+
+        self.expected = {}
+        for video_num in [0, 1, 3]:
+            video_dict = gen_video_dict(SEED, video_num)
+            write_video_json(layout, video_num, json.dumps(video_dict))
+            self.expected[video_num] = Drawer.draw_frames(video_dict["frames"])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_rgb_store(self):
+        create_frame_store(self.data_dir, FrameOptions(static_layer=True))
+        store = FrameStore(self.data_dir)
+        self.assertEqual(3, len(store))
+        self.assertNotIn(2, store)
+        for video_num, frames in self.expected.items():
+            video = store.video(video_num)
+            self.assertIsInstance(video, np.memmap)
+            self.assertFalse(video.flags.writeable)
+            self.assertTrue((frames == video).all())
+
+    def test_palette_store(self):
+        create_frame_store(self.data_dir, FrameOptions(dedup=True, palette=True))
+        store = FrameStore(self.data_dir)
+        self.assertTrue(store.palette)
+        for video_num, frames in self.expected.items():
+            self.assertTrue((frames == store.rgb_video(video_num)).all())
@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from hvqadata.build import gen_video_dict
+from hvqadata.util.definitions import CLASSES, COLOURS, EVENTS
+from hvqadata.util.tables import build_tables, concat_tables, add_offsets, save_tables, load_tables, video_slice, \
+    event_codes, NO_CODE
+
+
+SEED = 0
+
+
+class TablesTest(unittest.TestCase):
+    def setUp(self):
+        self.videos = [(video_num, gen_video_dict(SEED, video_num)) for video_num in [0, 2, 5]]
+
+        self.tables = concat_tables([build_tables(self.videos[:1]), build_tables(self.videos[1:])])
+        add_offsets(self.tables)
+
+    def test_event_codes(self):
+        self.assertEqual((EVENTS.index("move"), NO_CODE, NO_CODE), event_codes("move"))
+        expected = (EVENTS.index("change colour"), COLOURS.index("red"), COLOURS.index("blue"))
+        self.assertEqual(expected, event_codes("change colour from red to blue"))
+
+    def test_rows_match_videos(self):
+        self.assertEqual([0, 2, 5], self.tables["videos"]["video_id"].tolist())
+        for video_idx, (video_num, video) in enumerate(self.videos):
+            objects = video_slice(self.tables, "objects", video_idx)
+            expected = [(frame_idx, obj["class"], obj["colour"], obj["rotation"], obj["position"])
+                        for frame_idx, frame in enumerate(video["frames"]) for obj in frame["objects"]]
+            actual = [(frame_idx, CLASSES[cls], COLOURS[colour], rotation, [x1, y1, x2, y2])
+                      for frame_idx, cls, colour, rotation, x1, y1, x2, y2
+                      in zip(*[objects[col].tolist() for col in ["frame_idx", "class_code", "colour_code", "rotation",
+                                                                  "x1", "y1", "x2", "y2"]])]
+            self.assertEqual(expected, actual)
+            self.assertTrue((objects["video_id"] == video_num).all())
+
+            events = video_slice(self.tables, "events", video_idx)
+            self.assertEqual(sum(len(frame_events) for frame_events in video["events"]), len(events["event_code"]))
+
+            qa = video_slice(self.tables, "qa", video_idx)
+            self.assertEqual(video["questions"], qa["question"].tolist())
+            self.assertEqual(video["answers"], qa["answer"].tolist())
+
+    def test_concat_empty(self):
+        tables = concat_tables([])
+        add_offsets(tables)
+        for table, columns in concat_tables([build_tables([])]).items():
+            for col, values in columns.items():
+                self.assertEqual(0, len(tables[table][col]))
+                self.assertEqual(values.dtype, tables[table][col].dtype)
+
+        self.assertEqual([0], tables["offsets"]["objects"].tolist())
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "tables.npz"
+            save_tables(path, self.tables)
+            loaded = load_tables(path)
+
+        self.assertEqual(self.tables.keys(), loaded.keys())
+        for table, columns in self.tables.items():
+            for col, values in columns.items():
+                self.assertEqual(values.dtype, loaded[table][col].dtype)
+                self.assertEqual(values.tolist(), loaded[table][col].tolist())
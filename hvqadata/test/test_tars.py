@@ -0,0 +1,45 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from hvqadata.util.tars import TarShardWriter, TarShardReader, iter_tar_shard
+
+
+class TarShardTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.out_dir = self.tmp_dir.name
+        self.videos = [(video_num, f'{{"video": {video_num}}}', [bytes([video_num, i]) for i in range(3)])
+                       for video_num in range(7)]
+
+        with TarShardWriter(self.out_dir, videos_per_shard=3) as writer:
+            for video in self.videos:
+                writer.write(*video)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_stream(self):
+        reader = TarShardReader(self.out_dir)
+        self.assertEqual(3, len(reader.shard_files()))
+        samples = [(sample["video_num"], sample["json"], sample["frames"]) for sample in reader]
+        self.assertEqual(self.videos, samples)
+
+    def test_shard_of(self):
+        reader = TarShardReader(self.out_dir)
+        shard_file = reader.shard_of(4)
+        self.assertEqual([3, 4, 5], [sample["video_num"] for sample in iter_tar_shard(shard_file)])
+        self.assertIsNone(reader.shard_of(7))
+
+    def test_max_bytes(self):
+        # Each video is 4 members of 1024 bytes, so a third video would take a shard over 9000 bytes
+        out_dir = Path(self.out_dir) / "max_bytes"
+        out_dir.mkdir()
+        with TarShardWriter(out_dir, videos_per_shard=3, max_bytes=9000) as writer:
+            for video in self.videos:
+                writer.write(*video)
+
+        reader = TarShardReader(out_dir)
+        self.assertEqual([[0, 1], [2, 3], [4, 5], [6]], [shard["videos"] for shard in reader.index["shards"]])
+        samples = [(sample["video_num"], sample["json"], sample["frames"]) for sample in reader]
+        self.assertEqual(self.videos, samples)
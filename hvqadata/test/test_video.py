@@ -1,9 +1,10 @@
+import random
 import unittest
 
 from hvqadata.video.video import Video
 from hvqadata.video.frame_object import FrameObject
 from hvqadata.video.frame import Frame
-from hvqadata.util.func import close_to
+from hvqadata.util.func import close_to, video_rng
 
 
 frames = []
@@ -165,3 +166,21 @@ class VideoTest(unittest.TestCase):
         disappear = self.video._find_disappear_objs(frames_)
 
         self.assertEqual(expected, disappear)
+
+
+class VideoSeedTest(unittest.TestCase):
+    def gen_video(self, seed, video_num):
+        video = Video(video_rng(seed, video_num))
+        video.random_video()
+        return video.to_dict()
+
+    def test_video_rng_reproducible(self):
+        # Generating other videos, or using the global random module, must not affect the video
+        expected = self.gen_video(7, 3)
+        self.gen_video(7, 2)
+        random.random()
+        self.assertEqual(expected, self.gen_video(7, 3))
+
+    def test_video_rng_differs_between_videos(self):
+        self.assertNotEqual(self.gen_video(7, 3), self.gen_video(7, 4))
+        self.assertNotEqual(self.gen_video(7, 3), self.gen_video(8, 3))
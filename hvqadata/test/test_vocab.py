@@ -0,0 +1,57 @@
+import random
+import unittest
+
+import numpy as np
+
+from hvqadata.video.video import Video
+from hvqadata.util.definitions import EVENTS, COLOURS, COLOUR_CHANGE_EVENT, CHANGE_COLOUR_EVENT
+from hvqadata.util.exceptions import UnknownEventException
+from hvqadata.util.vocab import CHANGE_COLOUR, EVENT_CODES, COLOUR_CODES, NUM_EVENTS, event_type, event_colours, \
+    event_str, parse_event, parse_events, count_event_types, colour_change_code
+
+
+class VocabTest(unittest.TestCase):
+    def test_event_round_trip(self):
+        events = [event for event in EVENTS if event != CHANGE_COLOUR_EVENT]
+        events += [COLOUR_CHANGE_EVENT.format(from_colour=from_colour, to_colour=to_colour)
+                   for from_colour in COLOURS for to_colour in COLOURS]
+
+        codes = [parse_event(event) for event in events]
+        self.assertEqual(len(events), len(set(codes)))
+        self.assertEqual(events, [event_str(code) for code in codes])
+
+    def test_colour_change(self):
+        code = parse_event("change colour from red to blue")
+        self.assertEqual(CHANGE_COLOUR, event_type(code))
+        self.assertEqual((COLOUR_CODES["red"], COLOUR_CODES["blue"]), event_colours(code))
+        self.assertEqual(code, colour_change_code(COLOUR_CODES["red"], COLOUR_CODES["blue"]))
+        self.assertEqual((None, None), event_colours(EVENT_CODES["move"]))
+
+    def test_unknown_event(self):
+        with self.assertRaises(UnknownEventException):
+            parse_event("change colour from red")
+        with self.assertRaises(UnknownEventException):
+            parse_event("swim")
+
+    def test_video_events(self):
+        video = Video(random.Random(3))
+        video.random_video()
+        video_dict = video.to_dict()
+
+        codes, frame_idxs = parse_events(video_dict["events"])
+        self.assertEqual([event for events in video.events for event in events], codes.tolist())
+        self.assertEqual(len(video.events) - 1, frame_idxs.max())
+
+        expected = [sum(event.startswith(name) for events in video_dict["events"] for event in events)
+                    for name in EVENTS]
+        self.assertEqual(expected, count_event_types(codes).tolist())
+        self.assertEqual(dict(enumerate(expected)), video._count_events())
+        self.assertEqual(NUM_EVENTS, len(video._event_frame_idxs()))
+
+    def test_event_type_array(self):
+        codes = np.array([parse_event("move"), parse_event("change colour from red to green"), parse_event("nothing")])
+        self.assertEqual([EVENT_CODES["move"], CHANGE_COLOUR, EVENT_CODES["nothing"]], event_type(codes).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import threading
+import unittest
+
+from hvqadata.util.writer import AsyncWriter
+
+
+class AsyncWriterTest(unittest.TestCase):
+    def test_results(self):
+        with AsyncWriter(num_threads=3, max_queue=2) as writer:
+            futures = [writer.submit(pow, idx, 2) for idx in range(20)]
+
+        self.assertEqual([idx ** 2 for idx in range(20)], [future.result() for future in futures])
+        self.assertEqual(20, writer.stats.num_jobs)
+        self.assertLessEqual(writer.stats.max_depth, 2)
+
+    def test_backpressure(self):
+        release = threading.Event()
+        writer = AsyncWriter(num_threads=1, max_queue=1)
+        writer.submit(release.wait)
+        writer.submit(release.wait)
+
+        # Queue is full, so a third job can only be submitted once the writer thread is released
+        submitter = threading.Thread(target=writer.submit, args=(release.wait,))
+        submitter.start()
+        submitter.join(0.1)
+        self.assertTrue(submitter.is_alive())
+
+        release.set()
+        submitter.join()
+        writer.close()
+        self.assertGreater(writer.stats.stall_time, 0.05)
+
+    def test_error_raised_on_close(self):
+        writer = AsyncWriter(num_threads=2, max_queue=4)
+        future = writer.submit(int, "not an int")
+        with self.assertRaises(ValueError):
+            writer.close()
+        self.assertIsInstance(future.exception(), ValueError)
+
+    def test_error_raised_on_submit(self):
+        writer = AsyncWriter(num_threads=1, max_queue=4)
+        future = writer.submit(int, "not an int")
+        future.exception()
+        with self.assertRaises(ValueError):
+            writer.submit(pow, 2, 2)
+        with self.assertRaises(ValueError):
+            writer.close()
+
+    def test_context_manager_error(self):
+        with self.assertRaises(ValueError):
+            with AsyncWriter(num_threads=1, max_queue=4) as writer:
+                writer.submit(int, "not an int").exception()
+                writer.submit(pow, 2, 2)
@@ -0,0 +1,214 @@
+# *** Acceleration backends for simulation kernels ***
+# The backend is selected with the HVQA_BACKEND environment variable (python, numpy or numba)
+# The python backend is the reference implementation, all backends produce identical results
+
+import os
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+BACKEND_ENV_VAR = "HVQA_BACKEND"
+DEFAULT_BACKEND = "python"
+
+
+class PythonBackend:
+
+    name = "python"
+
+    @staticmethod
+    def close_to_box(box, boxes, border):
+        """
+        Find which boxes are close to <box>
+        A border is created around <box>, another box is close if it is within the border
+
+        :param box: Position [x1, y1, x2, y2]
+        :param boxes: List of positions
+        :param border: Number of pixels in border
+        :return: List of bools, one for each of <boxes>
+        """
+
+        box_x1, box_y1, box_x2, box_y2 = box
+        box_x1 -= border
+        box_x2 += border
+        box_y1 -= border
+        box_y2 += border
+
+        close = []
+        for x1, y1, x2, y2 in boxes:
+            x_overlap = x2 >= box_x2 and x1 <= box_x1
+            y_overlap = y2 >= box_y2 and y1 <= box_y1
+            match_x = box_x1 <= x1 <= box_x2 or box_x1 <= x2 <= box_x2 or x_overlap
+            match_y = box_y1 <= y1 <= box_y2 or box_y1 <= y2 <= box_y2 or y_overlap
+            close.append(match_x and match_y)
+
+        return close
+
+    @staticmethod
+    def move_box(box, rotation, move_pixels, max_pixel):
+        """
+        Move a box forward (in direction of rotation)
+
+        :param box: Position [x1, y1, x2, y2]
+        :param rotation: Rotation (0: up, 1: right, 2: down, 3: left)
+        :param move_pixels: Number of pixels to move by
+        :param max_pixel: Boxes must be strictly less than this value on both axes
+        :return: New position, or None if the box would leave the frame
+        """
+
+        x1, y1, x2, y2 = box
+        if rotation == 0:
+            y1 -= move_pixels
+            y2 -= move_pixels
+        elif rotation == 1:
+            x1 += move_pixels
+            x2 += move_pixels
+        elif rotation == 2:
+            y1 += move_pixels
+            y2 += move_pixels
+        elif rotation == 3:
+            x1 -= move_pixels
+            x2 -= move_pixels
+
+        if (0 <= x1 < max_pixel) and (0 <= x2 < max_pixel) and (0 <= y1 < max_pixel) and (0 <= y2 < max_pixel):
+            return [x1, y1, x2, y2]
+
+        return None
+
+
+class NumpyBackend(PythonBackend):
+
+    name = "numpy"
+
+    @staticmethod
+    def close_to_box(box, boxes, border):
+        if len(boxes) == 0:
+            return []
+
+        box_x1, box_y1, box_x2, box_y2 = box
+        box_x1 -= border
+        box_x2 += border
+        box_y1 -= border
+        box_y2 += border
+
+        x1, y1, x2, y2 = np.array(boxes, dtype=np.int64).T
+        x_overlap = (x2 >= box_x2) & (x1 <= box_x1)
+        y_overlap = (y2 >= box_y2) & (y1 <= box_y1)
+        match_x = ((box_x1 <= x1) & (x1 <= box_x2)) | ((box_x1 <= x2) & (x2 <= box_x2)) | x_overlap
+        match_y = ((box_y1 <= y1) & (y1 <= box_y2)) | ((box_y1 <= y2) & (y2 <= box_y2)) | y_overlap
+        return (match_x & match_y).tolist()
+
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _close_to_box_jit(box_x1, box_y1, box_x2, box_y2, boxes, border):
+        box_x1 -= border
+        box_x2 += border
+        box_y1 -= border
+        box_y2 += border
+
+        close = np.zeros(boxes.shape[0], dtype=np.bool_)
+        for idx in range(boxes.shape[0]):
+            x1, y1, x2, y2 = boxes[idx, 0], boxes[idx, 1], boxes[idx, 2], boxes[idx, 3]
+            x_overlap = x2 >= box_x2 and x1 <= box_x1
+            y_overlap = y2 >= box_y2 and y1 <= box_y1
+            match_x = box_x1 <= x1 <= box_x2 or box_x1 <= x2 <= box_x2 or x_overlap
+            match_y = box_y1 <= y1 <= box_y2 or box_y1 <= y2 <= box_y2 or y_overlap
+            close[idx] = match_x and match_y
+
+        return close
+
+    @numba.njit(cache=True)
+    def _move_box_jit(x1, y1, x2, y2, rotation, move_pixels, max_pixel):
+        if rotation == 0:
+            y1 -= move_pixels
+            y2 -= move_pixels
+        elif rotation == 1:
+            x1 += move_pixels
+            x2 += move_pixels
+        elif rotation == 2:
+            y1 += move_pixels
+            y2 += move_pixels
+        elif rotation == 3:
+            x1 -= move_pixels
+            x2 -= move_pixels
+
+        valid = (0 <= x1 < max_pixel) and (0 <= x2 < max_pixel) and (0 <= y1 < max_pixel) and (0 <= y2 < max_pixel)
+        return valid, x1, y1, x2, y2
+
+
+class NumbaBackend(PythonBackend):
+
+    name = "numba"
+
+    @staticmethod
+    def close_to_box(box, boxes, border):
+        if len(boxes) == 0:
+            return []
+
+        box_x1, box_y1, box_x2, box_y2 = box
+        boxes = np.array(boxes, dtype=np.int64)
+        return _close_to_box_jit(box_x1, box_y1, box_x2, box_y2, boxes, border).tolist()
+
+    @staticmethod
+    def move_box(box, rotation, move_pixels, max_pixel):
+        x1, y1, x2, y2 = box
+        valid, x1, y1, x2, y2 = _move_box_jit(x1, y1, x2, y2, rotation, move_pixels, max_pixel)
+        if valid:
+            return [int(x1), int(y1), int(x2), int(y2)]
+
+        return None
+
+
+BACKENDS = {
+    PythonBackend.name: PythonBackend,
+    NumpyBackend.name: NumpyBackend,
+    NumbaBackend.name: NumbaBackend
+}
+
+_backend = None
+
+
+def available_backends():
+    return [name for name in BACKENDS.keys() if name != NumbaBackend.name or numba is not None]
+
+
+def set_backend(name):
+    """
+    Select the backend used for simulation kernels
+    The choice is also stored in the environment so that worker processes use the same backend
+    If numba is requested but not installed, the python backend is used instead
+
+    :param name: Name of backend (python, numpy or numba)
+    :return: Backend class
+    """
+
+    global _backend
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}. Available backends: {available_backends()}")
+
+    if name == NumbaBackend.name and numba is None:
+        print(f"WARNING: numba is not installed. Using {DEFAULT_BACKEND} backend...")
+        name = DEFAULT_BACKEND
+
+    os.environ[BACKEND_ENV_VAR] = name
+    _backend = BACKENDS[name]
+    return _backend
+
+
+def get_backend():
+    """
+    Get the backend used for simulation kernels, selecting it from the environment on first use
+
+    :return: Backend class
+    """
+
+    if _backend is None:
+        return set_backend(os.environ.get(BACKEND_ENV_VAR, DEFAULT_BACKEND))
+
+    return _backend
@@ -0,0 +1,100 @@
+# *** Containers which hold every frame of a video in one file, and a reader for the frames of a video ***
+
+import numpy as np
+from pathlib import Path
+from PIL import Image, ImageSequence
+
+from hvqadata.draw import Drawer
+
+
+PNG_FRAMES = "png"
+NPY = "npy"
+NPZ = "npz"
+APNG = "apng"
+CONTAINERS = [PNG_FRAMES, NPY, NPZ, APNG]
+
+CLIP_FILES = {
+    NPY: "frames.npy",
+    NPZ: "frames.npz",
+    APNG: "frames.png"
+}
+
+# Display time of each APNG frame in ms, identical consecutive frames are merged by PIL into one longer frame
+APNG_FRAME_DURATION = 100
+
+
+def read_clip(video_dir, rgb=True):
+    """
+    Read every frame of a video, from a clip container or from frame_{i}.png files
+
+    :param video_dir: Path of video directory
+    :param rgb: Convert palette frames to RGB
+    :return: Numpy array of frames, [num_frames, height, width, 3] (or [num_frames, height, width] if palette frames
+             are not converted)
+    """
+
+    video_dir = Path(video_dir)
+    if (video_dir / CLIP_FILES[NPY]).exists():
+        np_imgs = np.load(video_dir / CLIP_FILES[NPY])
+    elif (video_dir / CLIP_FILES[NPZ]).exists():
+        with np.load(video_dir / CLIP_FILES[NPZ]) as clip:
+            np_imgs = clip["frames"]
+    elif (video_dir / CLIP_FILES[APNG]).exists():
+        np_imgs = _read_apng(video_dir / CLIP_FILES[APNG])
+    else:
+        np_imgs = _read_png_frames(video_dir)
+
+    if rgb and np_imgs.ndim == 3:
+        np_imgs = Drawer.to_rgb(np_imgs)
+
+    return np_imgs
+
+
+def remove_other_containers(video_dir, container):
+    """
+    Delete the frame files of every container other than <container>, so a rebuilt video is never read from the
+    stale files of an earlier build
+
+    :param video_dir: Path of video directory
+    :param container: Container being written
+    """
+
+    video_dir = Path(video_dir)
+    files = [video_dir / file_name for other, file_name in CLIP_FILES.items() if other != container]
+    if container != PNG_FRAMES:
+        files += list(video_dir.glob("frame_*.png"))
+
+    for file in files:
+        if file.exists():
+            file.unlink()
+
+
+def _from_image(img):
+    if img.mode == "P":
+        return np.array(img)
+
+    return np.array(img.convert("RGB"))
+
+
+def _read_apng(clip_file):
+    np_imgs = []
+    with Image.open(clip_file) as img:
+        for frame in ImageSequence.Iterator(img):
+            num_repeats = round(frame.info["duration"] / APNG_FRAME_DURATION)
+            np_imgs += [_from_image(frame)] * num_repeats
+
+    return np.stack(np_imgs)
+
+
+def _read_png_frames(video_dir):
+    np_imgs = []
+    frame_file = video_dir / "frame_0.png"
+    while frame_file.exists():
+        with Image.open(frame_file) as img:
+            np_imgs.append(_from_image(img))
+        frame_file = video_dir / f"frame_{len(np_imgs)}.png"
+
+    if len(np_imgs) == 0:
+        raise FileNotFoundError(f"No frames found in {video_dir}")
+
+    return np.stack(np_imgs)
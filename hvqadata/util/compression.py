@@ -0,0 +1,120 @@
+# *** Compression of video json files ***
+# Json is stored as plain text (none), gzip or zstd, zstd can use a dictionary trained on sample videos
+# zstd requires the optional zstandard package
+
+import gzip
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+NONE = "none"
+GZIP = "gzip"
+ZSTD = "zstd"
+COMPRESSIONS = [NONE, GZIP, ZSTD]
+
+JSON_FILES = {
+    NONE: "video.json",
+    GZIP: "video.json.gz",
+    ZSTD: "video.json.zst"
+}
+
+DICT_FILE = "json.zdict"
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# Trained dictionaries are most effective on small files, like the json of a single video
+DICT_SIZE = 112640
+DICT_SAMPLES = 1000
+
+
+def train_dictionary(texts, size=DICT_SIZE):
+    """
+    Train a zstd dictionary on sample json texts
+
+    :param texts: List of json str
+    :param size: Maximum size of the dictionary in bytes
+    :return: Dictionary bytes
+    """
+
+    _check_zstd()
+    zdict = zstandard.train_dictionary(size, [text.encode() for text in texts])
+    return zdict.as_bytes()
+
+
+class JsonCodec:
+
+    def __init__(self, compression=NONE, zdict=None):
+        """
+        Compresses and decompresses video json
+        zstd compressors are not thread safe, so each thread uses its own
+
+        :param compression: Compression (none, gzip or zstd)
+        :param zdict: Trained zstd dictionary bytes, or None
+        """
+
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}. Available compressions: {COMPRESSIONS}")
+        if compression == ZSTD or zdict is not None:
+            _check_zstd()
+
+        self.compression = compression
+        self.zdict = zdict
+        self._local = threading.local()
+
+    def compress(self, text):
+        """
+        :param text: Json str
+        :return: Compressed bytes
+        """
+
+        data = text.encode()
+        if self.compression == GZIP:
+            return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+        if self.compression == ZSTD:
+            return self._zstd_objects()[0].compress(data)
+
+        return data
+
+    def decompress(self, data, compression=None):
+        """
+        :param data: Compressed bytes
+        :param compression: Compression of <data>, the codec's compression if None
+        :return: Json str
+        """
+
+        compression = self.compression if compression is None else compression
+        if compression == GZIP:
+            data = gzip.decompress(data)
+        elif compression == ZSTD:
+            _check_zstd()
+            data = self._zstd_objects()[1].decompress(data)
+
+        return data.decode()
+
+    def _zstd_objects(self):
+        if getattr(self._local, "compressor", None) is None:
+            zdict = None if self.zdict is None else zstandard.ZstdCompressionDict(self.zdict)
+            self._local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict)
+            self._local.decompressor = zstandard.ZstdDecompressor(dict_data=zdict)
+
+        return self._local.compressor, self._local.decompressor
+
+    def __getstate__(self):
+        # Thread local compressors cannot be pickled, each process creates its own
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+
+def _check_zstd():
+    if zstandard is None:
+        raise ImportError("zstd compression requires the zstandard package: pip install zstandard")
@@ -4,6 +4,7 @@
 # *** Image and video definitions ***
 
 ROTATIONS = [0, 1, 2, 3]
+ROTATION_NAMES = ["upward-facing", "right-facing", "downward-facing", "left-facing"]
 
 OCTOPUS = (17, 17)
 FISH = (9, 11)
@@ -28,8 +29,8 @@ ROTATE_RIGHT_EVENT = "rotate right"
 
 EAT_FISH_EVENT = "eat a fish"
 EAT_BAG_EVENT = "eat a bag"
+CHANGE_COLOUR_EVENT = "change colour"
 COLOUR_CHANGE_EVENT = "change colour from {from_colour} to {to_colour}"
-CHANGE_COLOUR_LENGTH = 13
 
 
 # *** QA Pairs ***
@@ -39,7 +40,9 @@ QS_PER_VIDEO = 10
 QUESTION_OBJ_PROPS = ["colour", "rotation"]
 
 ACTIONS = [MOVE_EVENT, ROTATE_LEFT_EVENT, ROTATE_RIGHT_EVENT]
-EVENTS = [MOVE_EVENT, ROTATE_LEFT_EVENT, ROTATE_RIGHT_EVENT, EAT_FISH_EVENT, EAT_BAG_EVENT, "change colour", NO_EVENT]
+# Every event type, the index of each value is its integer code (see util.vocab)
+EVENTS = [MOVE_EVENT, ROTATE_LEFT_EVENT, ROTATE_RIGHT_EVENT, EAT_FISH_EVENT, EAT_BAG_EVENT, CHANGE_COLOUR_EVENT,
+          NO_EVENT]
 
 MAX_OCCURRENCE = 5
 OCCURRENCES = {
@@ -56,7 +59,7 @@ EVENTS_TO_NOUN = {
     ROTATE_RIGHT_EVENT: "rotating right",
     EAT_FISH_EVENT: "eating a fish",
     EAT_BAG_EVENT: "eating a bag",
-    "change colour": "changing colour"
+    CHANGE_COLOUR_EVENT: "changing colour"
 }
 
 
@@ -79,6 +82,10 @@ OCTO_COLOUR = "red"
 FISH_COLOUR = "silver"
 BAG_COLOUR = "white"
 
+# Every object class and colour, the index of each value is its integer code (see util.vocab)
+CLASSES = ["octopus", "fish", "bag", "rock"]
+COLOURS = [OCTO_COLOUR, FISH_COLOUR, BAG_COLOUR] + ROCK_COLOURS
+
 BLACK_RGB = (0, 0, 0)
 
 # Background
@@ -97,3 +104,17 @@ BROWN_ROCK_RGB = (182, 122, 28)
 BLUE_ROCK_RGB = (0, 0, 255)
 PURPLE_ROCK_RGB = (182, 37, 218)
 GREEN_ROCK_RGB = (0, 255, 0)
+
+# Every colour which can appear in a frame, used for palette-mode images
+PALETTE = [
+    (BACKGROUND_R, BACKGROUND_G, BACKGROUND_B),
+    OCTO_RGB,
+    FISH_RGB,
+    BAG_RGB,
+    BROWN_ROCK_RGB,
+    BLUE_ROCK_RGB,
+    PURPLE_ROCK_RGB,
+    GREEN_ROCK_RGB,
+    GREY_RBG,
+    BLACK_RGB
+]
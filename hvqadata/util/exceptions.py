@@ -11,3 +11,11 @@ class UnknownPropertyException(BaseException):
 
 class UnknownPropertyValueException(BaseException):
     pass
+
+
+class UnknownSchemaException(BaseException):
+    pass
+
+
+class UnknownEventException(BaseException):
+    pass
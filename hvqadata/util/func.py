@@ -1,10 +1,12 @@
 # *** Util functions ***
 
 import json
-from pathlib import Path
+import random
+import multiprocessing
 
 from hvqadata.util.exceptions import *
-from hvqadata.util.definitions import CLOSE_OCTO as CLOSE_TO
+from hvqadata.util.layout import DatasetLayout
+from hvqadata.util.definitions import CLOSE_OCTO as CLOSE_TO, ROTATIONS, ROTATION_NAMES
 
 
 def append_in_dict_(coll, key, elem):
@@ -32,6 +34,60 @@ def increment_in_map_(coll, key):
     coll[key] = curr_value + 1
 
 
+def video_rng(seed, video_num):
+    """
+    Create the random number generator for a video
+    The generator only depends on the dataset seed and the video number,
+    so a video is the same whether it is built alone, serially or by any number of workers
+
+    :param seed: Dataset seed (int)
+    :param video_num: Video number (int)
+    :return: random.Random
+    """
+
+    return random.Random(f"{seed}:{video_num}")
+
+
+def parallel_imap(func, tasks, workers, initializer=None, initargs=()):
+    """
+    Apply <func> to each task, using a pool of <workers> processes if <workers> is greater than one
+    Results are yielded in the same order as <tasks>
+
+    :param func: Function of a single task
+    :param tasks: List of tasks
+    :param workers: Number of processes
+    :param initializer: Function called once in each process before any tasks
+    :param initargs: Arguments for <initializer>
+    :return: Generator of results
+    """
+
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+
+        for task in tasks:
+            yield func(task)
+
+    else:
+        with multiprocessing.Pool(workers, initializer, initargs) as pool:
+            yield from pool.imap(func, tasks)
+
+
+def print_progress(desc, done, total, prev_done):
+    """
+    Print progress each time another 10% of <total> is completed
+
+    :param desc: Description of the work
+    :param done: Amount of work completed
+    :param total: Total amount of work
+    :param prev_done: Amount of work completed when progress was last updated
+    """
+
+    step = max(1, total // 10)
+    if done // step != prev_done // step or done == total:
+        print(f"{desc} {done}/{total} videos ({(done / max(1, total)) * 100:.0f}%)")
+
+
 def format_rotation_value(rotation):
     """
     Produce a readable str referring to the rotation of an object
@@ -40,39 +96,29 @@ def format_rotation_value(rotation):
     :return: Rotation str
     """
 
-    if rotation == 0:
-        val = "upward-facing"
-    elif rotation == 1:
-        val = "right-facing"
-    elif rotation == 2:
-        val = "downward-facing"
-    elif rotation == 3:
-        val = "left-facing"
-    else:
+    if rotation not in ROTATIONS:
         raise UnknownPropertyValueException(f"Unknown rotation value: {rotation}")
 
-    return val
+    return ROTATION_NAMES[rotation]
 
 
 def get_video_dicts(data_dir):
-    directory = Path(data_dir)
+    layout = DatasetLayout.load(data_dir)
 
     dicts = []
     num_dicts = 0
-    for video_dir in directory.iterdir():
-        json_file = video_dir / "video.json"
-        if json_file.exists():
-            with json_file.open() as f:
-                json_text = f.read()
-
-            video_dict = json.loads(json_text)
-            dicts.append(video_dict)
-            num_dicts += 1
-
-        else:
-            print(f"WARNING: {json_file} does not exist. Skipping...")
-
-    print(f"Successfully extracted {num_dicts} video dictionaries from json files")
+    with layout:
+        for video_num in layout.video_nums():
+            json_text = layout.read_video(video_num)
+            if json_text is not None:
+                video_dict = json.loads(json_text)
+                dicts.append(video_dict)
+                num_dicts += 1
+
+            else:
+                print(f"WARNING: {layout.json_file(video_num)} does not exist. Skipping...")
+
+    print(f"Successfully extracted {num_dicts} video dictionaries from json")
     return dicts
 
 
@@ -0,0 +1,277 @@
+# *** Job table for builds spread across several machines ***
+# The table is a directory of small files on a shared filesystem, so no broker service is needed
+# Files are only ever created exclusively (O_EXCL / link) or renamed, which are atomic on NFS
+
+import os
+import json
+import time
+import socket
+import threading
+from pathlib import Path
+
+
+JOBS_DIR = "jobs"
+TABLE_FILE = "table.json"
+
+
+def worker_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobTable:
+
+    def __init__(self, out_dir, stale_timeout=120.0, clock=time.time):
+        """
+        Table of video ranges, stored in <out_dir>/jobs
+        Each range is claimed by a worker by exclusively creating <range>.claim, the worker keeps its claim alive by
+        updating the file's modification time (heartbeat). A claim which has not been updated for <stale_timeout>
+        seconds belongs to a dead worker and can be taken by another worker.
+        A finished range is marked by <range>.done, which holds the manifest records of its videos.
+        Note: Machines must have roughly synchronised clocks
+
+        :param out_dir: Output directory of the build
+        :param stale_timeout: Seconds after which a claim without a heartbeat is stale
+        :param clock: Function returning the current time in seconds, used for heartbeats and staleness
+        """
+
+        self.dir = Path(out_dir) / JOBS_DIR
+        self.stale_timeout = stale_timeout
+        self.clock = clock
+        self.worker = worker_name()
+        self.config = None
+
+    def create(self, config):
+        """
+        Create the table, or join the existing table
+        The config of the first worker to create the table is used by every worker
+
+        :param config: Dict, must contain num_videos and range_size
+        :return: Config of the table
+        """
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        table_file = self.dir / TABLE_FILE
+        tmp_file = self.dir / f"{TABLE_FILE}.{self.worker}"
+        tmp_file.write_text(json.dumps(config))
+        try:
+            os.link(tmp_file, table_file)
+        except FileExistsError:
+            pass
+        finally:
+            tmp_file.unlink()
+
+        self.config = json.loads(table_file.read_text())
+        return self.config
+
+    def load(self):
+        """
+        Read the config of an existing table
+
+        :return: Config of the table
+        """
+
+        self.config = json.loads((self.dir / TABLE_FILE).read_text())
+        return self.config
+
+    def ranges(self):
+        """
+        :return: List of (start, end) video ranges
+        """
+
+        num_videos = self.config["num_videos"]
+        range_size = self.config["range_size"]
+        return [(start, min(start + range_size, num_videos)) for start in range(0, num_videos, range_size)]
+
+    def is_done(self, start):
+        return self._done_file(start).exists()
+
+    def claim(self):
+        """
+        Claim the next range which is not done and not held by a live worker
+
+        :return: (start, end) or None if no range can be claimed
+        """
+
+        for start, end in self.ranges():
+            if not self.is_done(start) and self._try_claim(start):
+                # The previous owner may have finished the range just before its claim was taken
+                if self.is_done(start):
+                    self.release(start)
+                    continue
+
+                return start, end
+
+        return None
+
+    def heartbeat(self, start):
+        """
+        Refresh the claim on a range
+
+        :param start: Start of range
+        :return: Whether the claim is still held by this worker
+        """
+
+        if not self.holds(start):
+            return False
+
+        now = self.clock()
+        try:
+            os.utime(self._claim_file(start), (now, now))
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def holds(self, start):
+        """
+        :param start: Start of range
+        :return: Whether this worker holds the claim on a range
+        """
+
+        try:
+            return self._claim_file(start).read_text() == self.worker
+        except FileNotFoundError:
+            return False
+
+    def keep_alive(self, start):
+        """
+        Start a thread which sends heartbeats for a claimed range
+        Call stop() on the returned Heartbeat once the range is finished
+
+        :param start: Start of range
+        :return: Heartbeat
+        """
+
+        return Heartbeat(self, start, self.stale_timeout / 4)
+
+    def complete(self, start, records):
+        """
+        Mark a range as done and release its claim
+
+        :param start: Start of range
+        :param records: List of manifest records, one for each video in the range
+        """
+
+        done_file = self._done_file(start)
+        tmp_file = done_file.with_name(f"{done_file.name}.{self.worker}")
+        tmp_file.write_text("".join(json.dumps(record) + "\n" for record in records))
+        os.replace(tmp_file, done_file)
+        self.release(start)
+
+    def release(self, start):
+        claim_file = self._claim_file(start)
+        try:
+            if claim_file.read_text() == self.worker:
+                claim_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def records(self, start):
+        """
+        Read the manifest records of a finished range
+
+        :param start: Start of range
+        :return: List of manifest records
+        """
+
+        with self._done_file(start).open() as f:
+            return [json.loads(line) for line in f]
+
+    def _try_claim(self, start):
+        claim_file = self._claim_file(start)
+        try:
+            fd = os.open(claim_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if self._is_stale(claim_file) and self._take_stale_claim(claim_file):
+                return self._try_claim(start)
+            return False
+
+        with os.fdopen(fd, "w") as f:
+            f.write(self.worker)
+
+        now = self.clock()
+        os.utime(claim_file, (now, now))
+        return True
+
+    def _take_stale_claim(self, claim_file):
+        # Only one worker can rename the claim, so only one worker can remove it
+        taken_file = claim_file.with_name(f"{claim_file.name}.{self.worker}")
+        try:
+            os.rename(claim_file, taken_file)
+        except FileNotFoundError:
+            return False
+
+        # Another worker may have replaced the stale claim before the rename, so put a live claim back
+        if not self._is_stale(taken_file):
+            try:
+                os.link(taken_file, claim_file)
+            except FileExistsError:
+                pass
+            taken_file.unlink()
+            return False
+
+        taken_file.unlink()
+        return True
+
+    def _is_stale(self, claim_file):
+        try:
+            return self.clock() - claim_file.stat().st_mtime > self.stale_timeout
+        except FileNotFoundError:
+            return False
+
+    def _claim_file(self, start):
+        return self.dir / f"{start}.claim"
+
+    def _done_file(self, start):
+        return self.dir / f"{start}.done"
+
+
+class Heartbeat:
+
+    def __init__(self, table, start, interval):
+        """
+        Thread which refreshes a claim every <interval> seconds until stopped
+        <lost> is set once the claim is found to be taken by another worker (or removed),
+        the claim's owner should check held() between videos and stop working on the range once it is lost
+
+        :param table: JobTable
+        :param start: Start of claimed range
+        :param interval: Seconds between heartbeats
+        """
+
+        self.lost = False
+        self._table = table
+        self._start = start
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def held(self):
+        """
+        Check whether the claim is still held, without refreshing it
+
+        :return: bool
+        """
+
+        if not self.lost and not self._table.holds(self._start):
+            self.lost = True
+
+        return not self.lost
+
+    def stop(self):
+        """
+        Stop sending heartbeats
+
+        :return: Whether the claim is still held
+        """
+
+        self._stop.set()
+        self._thread.join()
+        return not self.lost and self._table.heartbeat(self._start)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            if not self._table.heartbeat(self._start):
+                self.lost = True
+                break
@@ -0,0 +1,257 @@
+# *** Directory layouts for datasets ***
+
+import os
+import json
+from pathlib import Path
+
+from hvqadata.util.shards import JsonlShardReader
+from hvqadata.util.compression import JsonCodec, COMPRESSIONS, NONE, JSON_FILES, DICT_FILE
+from hvqadata.util.schema import SCHEMAS, SCHEMA_V1
+from hvqadata.util.exceptions import UnknownSchemaException
+
+
+LAYOUT_FILE = "layout.json"
+
+FLAT = "flat"
+BUCKETED = "bucketed"
+LAYOUTS = [FLAT, BUCKETED]
+
+# Each bucket directory holds 2 ** BUCKET_BITS entries
+BUCKET_BITS = 8
+
+FILES = "files"
+JSONL = "jsonl"
+JSON_FORMATS = [FILES, JSONL]
+
+
+class DatasetLayout:
+
+    def __init__(self, data_dir, name=FLAT, json_format=FILES, json_compression=NONE, json_dict=False,
+                 json_schema=SCHEMA_V1):
+        """
+        Where each video's directory is placed within a dataset directory, and how its json is stored
+          - flat: <data_dir>/<video_num>/
+          - bucketed: <data_dir>/<aa>/<bb>/<video_num>/, where aa and bb are the hex digits of video_num >> 16 and
+            (video_num >> 8) & 0xff. Each directory holds at most 256 entries (up to 16M videos), so lookups,
+            listings and creates stay fast with millions of videos, and consecutive videos share a directory
+        Json is either stored as video.json in each video's directory (files),
+        or packed into JSONL shards in <data_dir> (jsonl, see JsonlShardWriter)
+        Json files can be compressed with gzip (video.json.gz) or zstd (video.json.zst), optionally with a zstd
+        dictionary stored in <data_dir>/json.zdict. Files are read by their name, so any compression can be read
+        New json is written with the layout's schema (see hvqadata.util.schema), json of either schema can be read
+        The layout is stored in <data_dir>/layout.json, datasets without this file are flat with json files
+
+        :param data_dir: Dataset directory
+        :param name: Layout name (flat or bucketed)
+        :param json_format: Json format (files or jsonl)
+        :param json_compression: Compression of json files (none, gzip or zstd)
+        :param json_dict: Compress json files with the dataset's zstd dictionary
+        :param json_schema: Schema version of new json
+        """
+
+        if name not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {name}. Available layouts: {LAYOUTS}")
+        if json_format not in JSON_FORMATS:
+            raise ValueError(f"Unknown json format: {json_format}. Available formats: {JSON_FORMATS}")
+        if json_compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown json compression: {json_compression}. Available compressions: {COMPRESSIONS}")
+        if json_format == JSONL and json_compression != NONE:
+            raise ValueError("JSONL shards cannot be compressed")
+        if json_schema not in SCHEMAS:
+            raise UnknownSchemaException(f"Unknown json schema: {json_schema}. Available schemas: {SCHEMAS}")
+
+        self.data_dir = Path(data_dir)
+        self.name = name
+        self.json_format = json_format
+        self.json_compression = json_compression
+        self.json_dict = json_dict
+        self.json_schema = json_schema
+        self._reader = None
+        self._codec = None
+
+    @staticmethod
+    def load(data_dir):
+        """
+        Read the layout of a dataset
+
+        :param data_dir: Dataset directory
+        :return: DatasetLayout
+        """
+
+        layout_file = Path(data_dir) / LAYOUT_FILE
+        if not layout_file.exists():
+            return DatasetLayout(data_dir)
+
+        config = json.loads(layout_file.read_text())
+        return DatasetLayout(data_dir, config["layout"], config.get("json_format", FILES),
+                             config.get("json_compression", NONE), config.get("json_dict", False),
+                             config.get("json_schema", SCHEMA_V1))
+
+    def save(self):
+        config = {
+            "layout": self.name,
+            "json_format": self.json_format,
+            "json_compression": self.json_compression,
+            "json_dict": self.json_dict,
+            "json_schema": self.json_schema
+        }
+        layout_file = self.data_dir / LAYOUT_FILE
+        tmp_file = layout_file.with_name(f"{LAYOUT_FILE}.{os.getpid()}")
+        tmp_file.write_text(json.dumps(config))
+        os.replace(tmp_file, layout_file)
+
+    def save_dict(self, zdict):
+        """
+        Save the dataset's zstd dictionary, which must be saved before any json files are written with it
+
+        :param zdict: Dictionary bytes
+        """
+
+        dict_file = self.data_dir / DICT_FILE
+        tmp_file = dict_file.with_name(f"{DICT_FILE}.{os.getpid()}")
+        tmp_file.write_bytes(zdict)
+        os.replace(tmp_file, dict_file)
+        self._codec = None
+
+    @property
+    def codec(self):
+        if self._codec is None:
+            zdict = (self.data_dir / DICT_FILE).read_bytes() if self.json_dict else None
+            self._codec = JsonCodec(self.json_compression, zdict)
+
+        return self._codec
+
+    def json_file(self, video_num):
+        """
+        :param video_num: Video number
+        :return: Path of the video's json file, when written with this layout's compression
+        """
+
+        return self.video_dir(video_num) / JSON_FILES[self.json_compression]
+
+    def video_nums(self):
+        """
+        Find every video in the dataset
+
+        :return: Sorted list of video numbers
+        """
+
+        if self.json_format == JSONL:
+            return self._shard_reader().video_nums()
+
+        return [video_num for video_num, _ in self.video_dirs()]
+
+    def read_video(self, video_num):
+        """
+        Read the json text of a video
+
+        :param video_num: Video number
+        :return: Json text, or None if the video does not exist
+        """
+
+        if self.json_format == JSONL:
+            return self._shard_reader().read(video_num)
+
+        # Files of other compressions are only read when the layout's own file is absent,
+        # so a stale file left by an earlier build is never returned instead of the layout's file
+        json_file = self.json_file(video_num)
+        if json_file.exists():
+            return self.codec.decompress(json_file.read_bytes())
+
+        video_dir = self.video_dir(video_num)
+        for compression in COMPRESSIONS:
+            json_file = video_dir / JSON_FILES[compression]
+            if compression != self.json_compression and json_file.exists():
+                return self.codec.decompress(json_file.read_bytes(), compression)
+
+        return None
+
+    def write_video(self, video_num, text):
+        """
+        Write the json file of a video, compressed with the layout's compression
+
+        :param video_num: Video number
+        :param text: Json text
+        :return: Bytes written
+        """
+
+        data = self.codec.compress(text)
+        json_file = self.json_file(video_num)
+        json_file.parent.mkdir(parents=True, exist_ok=True)
+        json_file.write_bytes(data)
+        return data
+
+    def _shard_reader(self):
+        if self._reader is None:
+            self._reader = JsonlShardReader(self.data_dir)
+
+        return self._reader
+
+    def close(self):
+        """
+        Close the dataset's open JSONL shards, they are reopened if the layout is read from again
+        """
+
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getstate__(self):
+        # Shard readers hold open files, so each process opens its own (and loads its own codec)
+        state = self.__dict__.copy()
+        state["_reader"] = None
+        state["_codec"] = None
+        return state
+
+    def video_dir(self, video_num):
+        """
+        :param video_num: Video number
+        :return: Path of the video's directory
+        """
+
+        if self.name == BUCKETED:
+            outer = video_num >> (2 * BUCKET_BITS)
+            inner = (video_num >> BUCKET_BITS) & ((1 << BUCKET_BITS) - 1)
+            return self.data_dir / f"{outer:02x}" / f"{inner:02x}" / str(video_num)
+
+        return self.data_dir / str(video_num)
+
+    def video_dirs(self):
+        """
+        Find the directory of every video in the dataset
+
+        :return: List of (video_num, Path), sorted by video number
+        """
+
+        if self.name == BUCKETED:
+            bucket_dirs = [inner for outer in _bucket_dirs(self.data_dir) for inner in _bucket_dirs(outer)]
+        else:
+            bucket_dirs = [self.data_dir]
+
+        video_dirs = []
+        for bucket_dir in bucket_dirs:
+            with os.scandir(bucket_dir) as entries:
+                video_dirs += [(int(entry.name), Path(entry.path)) for entry in entries
+                               if entry.name.isdigit() and entry.is_dir()]
+
+        return sorted(video_dirs)
+
+
+def _bucket_dirs(directory):
+    with os.scandir(directory) as entries:
+        return sorted([Path(entry.path) for entry in entries if _is_hex(entry.name) and entry.is_dir()])
+
+
+def _is_hex(name):
+    try:
+        int(name, 16)
+    except ValueError:
+        return False
+
+    return True
@@ -0,0 +1,133 @@
+# *** Build manifest for resumable builds ***
+
+import json
+import hashlib
+from pathlib import Path
+
+
+MANIFEST_FILE = "manifest.jsonl"
+
+
+def file_record(data):
+    """
+    Create the manifest record for a file
+
+    :param data: Bytes written to the file
+    :return: [hash: str, size: int]
+    """
+
+    return [hashlib.blake2b(data, digest_size=16).hexdigest(), len(data)]
+
+
+class BuildManifest:
+
+    def __init__(self, out_dir):
+        """
+        Append-only record of the videos completed by a build, stored as <out_dir>/manifest.jsonl
+        The first line holds the dataset seed, each following line records one completed video:
+        its frame options, and the hash and size of its json file and of each frame file
+        A video recorded more than once uses its latest record
+
+        :param out_dir: Output directory of the build
+        """
+
+        self.out_dir = Path(out_dir)
+        self.path = self.out_dir / MANIFEST_FILE
+        self.seed = None
+        self.videos = {}
+
+    def load(self):
+        """
+        Read the manifest from disk, if it exists
+        Lines which cannot be parsed (eg. written during a crash) are ignored
+        """
+
+        if not self.path.exists():
+            return
+
+        with self.path.open() as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                if "seed" in record:
+                    self.seed = record["seed"]
+                elif "video" in record:
+                    self.videos[record["video"]] = record
+
+    def start(self, seed):
+        """
+        Start a new manifest, removing any existing manifest
+
+        :param seed: Dataset seed
+        """
+
+        self.seed = seed
+        self.videos = {}
+        with self.path.open("w") as f:
+            f.write(json.dumps({"seed": seed}) + "\n")
+
+    def record(self, records):
+        """
+        Append records for completed videos
+
+        :param records: List of video records, see video_record
+        """
+
+        with self.path.open("a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+                self.videos[record["video"]] = record
+
+    @staticmethod
+    def video_record(video_num, options_key, json_record, frame_records):
+        """
+        Create the record for a completed video
+
+        :param video_num: Video number
+        :param options_key: String identifying the frame options, None if no frames were written
+        :param json_record: File record of the video's json file
+        :param frame_records: Dict of file record for each frame file, by file name (None if no frames were written)
+        :return: Dict
+        """
+
+        return {
+            "video": video_num,
+            "options": options_key,
+            "json": json_record,
+            "frames": frame_records
+        }
+
+    def is_complete(self, video_num, video_dir, options_key, verify=False, json_name="video.json"):
+        """
+        Returns whether a video's files are complete and up to date
+        Files are checked against their recorded size, and their recorded hash if <verify>
+
+        :param video_num: Video number
+        :param video_dir: Path of video directory
+        :param options_key: String identifying the required frame options, None if frames are not required
+        :param verify: Check the hash of each file
+        :param json_name: Name of the video's json file (which depends on its compression)
+        :return: bool
+        """
+
+        record = self.videos.get(video_num)
+        if record is None:
+            return False
+
+        files = [(video_dir / json_name, record["json"])]
+        if options_key is not None:
+            if record["frames"] is None or record["options"] != options_key:
+                return False
+
+            files += [(video_dir / file_name, rec) for file_name, rec in record["frames"].items()]
+
+        for file, (file_hash, size) in files:
+            if not file.exists() or file.stat().st_size != size:
+                return False
+            if verify and file_record(file.read_bytes())[0] != file_hash:
+                return False
+
+        return True
@@ -0,0 +1,126 @@
+# *** Schemas of video dictionaries ***
+# v1 stores every object of every frame:
+#   {"frames": [{"objects": [{"position", "class", "colour", "rotation"}, ...]}, ...], "events", "questions", ...}
+# v2 stores each static object once, since static objects never change and only ever disappear,
+# and the octopus (which is always the last object of a frame) separately for each frame:
+#   {"version": 2, "static_objects": [{"position", "class", "colour", "rotation", "removed"}, ...],
+#    "octopus": [{"position", "colour", "rotation"} or None, ...], "events", "questions", ...}
+# "removed" is the index of the first frame without the object, or None if it is never removed
+# Events, questions, answers and question types are identical in both schemas
+
+from hvqadata.util.exceptions import UnknownSchemaException
+
+
+SCHEMA_V1 = 1
+SCHEMA_V2 = 2
+SCHEMAS = [SCHEMA_V1, SCHEMA_V2]
+
+OCTOPUS = "octopus"
+
+VIDEO_KEYS = ["events", "questions", "answers", "question_types"]
+
+
+def schema_version(video):
+    """
+    :param video: Video dictionary
+    :return: Schema version of the video, dictionaries without a version are v1
+    """
+
+    version = video.get("version", SCHEMA_V1)
+    if version not in SCHEMAS:
+        raise UnknownSchemaException(f"Unknown video schema version: {version}")
+
+    return version
+
+
+def video_frames(video):
+    """
+    Get the frames of a video, in the v1 format, from a video of either schema
+    Note: Frames of a v2 video share their static object dictionaries, so they should not be modified
+
+    :param video: Video dictionary
+    :return: List of frame dictionaries
+    """
+
+    if schema_version(video) == SCHEMA_V1:
+        return video["frames"]
+
+    static_objects = [(_object_dict(obj), obj["removed"]) for obj in video["static_objects"]]
+    frames = []
+    for frame_idx, octopus in enumerate(video["octopus"]):
+        objects = [obj for obj, removed in static_objects if removed is None or frame_idx < removed]
+        if octopus is not None:
+            objects.append({"position": octopus["position"], "class": OCTOPUS, "colour": octopus["colour"],
+                            "rotation": octopus["rotation"]})
+        frames.append({"objects": objects})
+
+    return frames
+
+
+def to_schema(video, version):
+    """
+    Convert a video dictionary of either schema to <version>, the conversion is lossless
+
+    :param video: Video dictionary
+    :param version: Schema version
+    :return: Video dictionary, <video> itself if it is already of <version>
+    """
+
+    if version not in SCHEMAS:
+        raise UnknownSchemaException(f"Unknown video schema version: {version}")
+    if schema_version(video) == version:
+        return video
+
+    if version == SCHEMA_V1:
+        return {"frames": video_frames(video), **{key: video[key] for key in VIDEO_KEYS}}
+
+    return {"version": SCHEMA_V2, **_delta_encode(video["frames"]), **{key: video[key] for key in VIDEO_KEYS}}
+
+
+def _object_dict(obj):
+    return {"position": obj["position"], "class": obj["class"], "colour": obj["colour"], "rotation": obj["rotation"]}
+
+
+def _delta_encode(frames):
+    """
+    Find the static objects and octopus states of v1 frames
+
+    :param frames: List of v1 frame dictionaries
+    :return: Dict with static_objects and octopus lists
+    """
+
+    first_objects = frames[0]["objects"]
+    static_objects = [dict(obj, removed=None) for obj in first_objects if obj["class"] != OCTOPUS]
+
+    # Static objects are kept in order, so the objects of each frame are a subsequence of those of the last frame
+    keys = [_object_key(obj) for obj in static_objects]
+    octopus = []
+    for frame_idx, frame in enumerate(frames):
+        objects = frame["objects"]
+        octo = None
+        if len(objects) > 0 and objects[-1]["class"] == OCTOPUS:
+            octo = {"position": objects[-1]["position"], "colour": objects[-1]["colour"],
+                    "rotation": objects[-1]["rotation"]}
+            objects = objects[:-1]
+        octopus.append(octo)
+
+        frame_keys = [_object_key(obj) for obj in objects]
+        present = [key for key, obj in zip(keys, static_objects) if obj["removed"] is None]
+        if not _is_subsequence(frame_keys, present):
+            raise ValueError(f"Static objects of frame {frame_idx} are not a subsequence of the previous frame")
+
+        frame_keys = set(frame_keys)
+        for key, obj in zip(keys, static_objects):
+            if obj["removed"] is None and key not in frame_keys:
+                obj["removed"] = frame_idx
+
+    return {"static_objects": static_objects, "octopus": octopus}
+
+
+def _object_key(obj):
+    return obj["class"], obj["colour"], obj["rotation"], tuple(obj["position"])
+
+
+def _is_subsequence(items, seq):
+    it = iter(seq)
+    return all(item in it for item in items)
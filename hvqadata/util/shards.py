@@ -0,0 +1,146 @@
+# *** Packed JSONL shards of videos ***
+# Videos are stored one per line in videos-<shard>.jsonl files, with a binary index (videos.idx) holding the shard,
+# byte offset and length of every video, so any video can be read by id with a single pread
+
+import os
+import numpy as np
+from pathlib import Path
+
+
+INDEX_FILE = "videos.idx"
+VIDEOS_PER_SHARD = 4096
+
+# Entry i of the index locates video i, missing videos have a length of 0
+INDEX_DTYPE = np.dtype([("shard", "<u4"), ("offset", "<u8"), ("length", "<u4")])
+
+
+def shard_file(data_dir, shard):
+    return Path(data_dir) / f"videos-{shard:05d}.jsonl"
+
+
+class JsonlShardWriter:
+
+    def __init__(self, data_dir, videos_per_shard=VIDEOS_PER_SHARD):
+        """
+        Write videos to JSONL shards, a new shard is started every <videos_per_shard> videos
+        The index is written on close, so a dataset can only be read once its writer is closed
+        Not thread safe, videos should be written from a single thread
+        Can be used as a context manager
+
+        :param data_dir: Dataset directory
+        :param videos_per_shard: Number of videos in each shard
+        """
+
+        self.data_dir = Path(data_dir)
+        self.videos_per_shard = videos_per_shard
+        self._entries = {}
+        self._shard = -1
+        self._file = None
+        self._num_in_shard = 0
+        self._offset = 0
+
+    def write(self, video_num, text):
+        """
+        Append a video to the current shard
+
+        :param video_num: Video number
+        :param text: Json text of video, without newlines
+        """
+
+        if self._file is None or self._num_in_shard == self.videos_per_shard:
+            self._next_shard()
+
+        data = text.encode() + b"\n"
+        self._file.write(data)
+        self._entries[video_num] = (self._shard, self._offset, len(data) - 1)
+        self._offset += len(data)
+        self._num_in_shard += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        num_videos = max(self._entries.keys(), default=-1) + 1
+        index = np.zeros(num_videos, dtype=INDEX_DTYPE)
+        for video_num, entry in self._entries.items():
+            index[video_num] = entry
+
+        index_file = self.data_dir / INDEX_FILE
+        tmp_file = index_file.with_name(f"{INDEX_FILE}.{os.getpid()}")
+        index.tofile(tmp_file)
+        os.replace(tmp_file, index_file)
+
+    def _next_shard(self):
+        if self._file is not None:
+            self._file.close()
+
+        self._shard += 1
+        self._file = shard_file(self.data_dir, self._shard).open("wb")
+        self._num_in_shard = 0
+        self._offset = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class JsonlShardReader:
+
+    def __init__(self, data_dir):
+        """
+        Random access reader for videos stored in JSONL shards
+        The index is memory mapped and shards are opened on first use
+
+        :param data_dir: Dataset directory
+        """
+
+        self.data_dir = Path(data_dir)
+        index_file = self.data_dir / INDEX_FILE
+        if index_file.stat().st_size == 0:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        else:
+            self.index = np.memmap(index_file, dtype=INDEX_DTYPE, mode="r")
+        self._fds = {}
+
+    def video_nums(self):
+        """
+        :return: List of the numbers of every video in the shards
+        """
+
+        return np.flatnonzero(self.index["length"]).tolist()
+
+    def read(self, video_num):
+        """
+        Read the json text of a video
+
+        :param video_num: Video number
+        :return: Json text, or None if the video is not in the shards
+        """
+
+        if not 0 <= video_num < len(self.index):
+            return None
+
+        shard, offset, length = self.index[video_num].tolist()
+        if length == 0:
+            return None
+
+        fd = self._fds.get(shard)
+        if fd is None:
+            fd = os.open(shard_file(self.data_dir, shard), os.O_RDONLY)
+            self._fds[shard] = fd
+
+        return os.pread(fd, length, offset).decode()
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
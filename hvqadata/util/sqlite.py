@@ -0,0 +1,119 @@
+# *** SQLite database of a dataset ***
+
+import sqlite3
+
+from hvqadata.util.definitions import EVENTS, COLOURS
+from hvqadata.util.schema import video_frames
+from hvqadata.util.vocab import event_type, event_colours, parse_event
+
+
+SCHEMA = [
+    "CREATE TABLE videos (video_id INTEGER PRIMARY KEY, num_frames INTEGER, num_questions INTEGER)",
+    "CREATE TABLE frames (video_id INTEGER, frame_idx INTEGER, num_objects INTEGER, "
+    "PRIMARY KEY (video_id, frame_idx)) WITHOUT ROWID",
+    "CREATE TABLE objects (video_id INTEGER, frame_idx INTEGER, obj_idx INTEGER, class TEXT, colour TEXT, "
+    "rotation INTEGER, x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER)",
+    "CREATE TABLE events (video_id INTEGER, frame_idx INTEGER, event TEXT, from_colour TEXT, to_colour TEXT, "
+    "description TEXT)",
+    "CREATE TABLE questions (video_id INTEGER, q_idx INTEGER, question_type INTEGER, question TEXT, answer TEXT)"
+]
+
+# Indexes are created once every row is inserted, which is much faster than updating them on each insert
+INDEXES = [
+    "CREATE INDEX objects_video ON objects (video_id, frame_idx)",
+    "CREATE INDEX objects_class ON objects (class, colour)",
+    "CREATE INDEX events_video ON events (video_id, frame_idx)",
+    "CREATE INDEX events_event ON events (event, frame_idx)",
+    "CREATE INDEX questions_video ON questions (video_id)",
+    "CREATE INDEX questions_type ON questions (question_type, answer)",
+    "CREATE INDEX questions_answer ON questions (answer)"
+]
+
+INSERTS = {
+    "videos": "INSERT INTO videos VALUES (?, ?, ?)",
+    "frames": "INSERT INTO frames VALUES (?, ?, ?)",
+    "objects": "INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "events": "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+    "questions": "INSERT INTO questions VALUES (?, ?, ?, ?, ?)"
+}
+
+
+def video_rows(video_id, video):
+    """
+    Flatten a video dictionary into rows of each table
+    Events are stored by type (eg. 'change colour'), with their colours and full description in separate columns
+
+    :param video_id: Video number
+    :param video: Video dictionary, of either schema
+    :return: Dict of list of row tuples for each table
+    """
+
+    frames = []
+    objects = []
+    for frame_idx, frame in enumerate(video_frames(video)):
+        frames.append((video_id, frame_idx, len(frame["objects"])))
+        for obj_idx, obj in enumerate(frame["objects"]):
+            objects.append((video_id, frame_idx, obj_idx, obj["class"], obj["colour"], obj["rotation"],
+                            *obj["position"]))
+
+    events = []
+    for frame_idx, frame_events in enumerate(video["events"]):
+        for event in frame_events:
+            code = parse_event(event)
+            from_colour, to_colour = event_colours(code)
+            if from_colour is not None:
+                from_colour, to_colour = COLOURS[from_colour], COLOURS[to_colour]
+            events.append((video_id, frame_idx, EVENTS[event_type(code)], from_colour, to_colour, event))
+
+    questions = [(video_id, q_idx, q_type, question, answer) for q_idx, (q_type, question, answer)
+                 in enumerate(zip(video["question_types"], video["questions"], video["answers"]))]
+
+    videos = [(video_id, len(frames), len(video["questions"]))]
+    return {"videos": videos, "frames": frames, "objects": objects, "events": events, "questions": questions}
+
+
+def create_database(path):
+    """
+    Create an empty database, configured for fast bulk inserts
+    Journaling and syncing are turned off, so the database is only valid once it has been closed by finish_database
+
+    :param path: Path of database file
+    :return: sqlite3.Connection
+    """
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+    return conn
+
+
+def insert_rows(conn, rows):
+    """
+    Insert rows of each table, in the current transaction
+
+    :param conn: sqlite3.Connection
+    :param rows: Dict of list of row tuples for each table
+    """
+
+    for table, table_rows in rows.items():
+        conn.executemany(INSERTS[table], table_rows)
+
+
+def finish_database(conn):
+    """
+    Commit, create indexes and close the database
+
+    :param conn: sqlite3.Connection
+    """
+
+    conn.commit()
+    for statement in INDEXES:
+        conn.execute(statement)
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
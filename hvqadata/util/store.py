@@ -0,0 +1,105 @@
+# *** Memory-mapped store of every frame in a dataset ***
+# frames.npy holds a [num_videos, num_frames, height, width, 3] (or palette index) uint8 array,
+# frame_store.json maps video numbers to rows of the array
+
+import os
+import json
+import numpy as np
+from pathlib import Path
+
+from hvqadata.draw import Drawer
+
+
+STORE_FILE = "frames.npy"
+SIDECAR_FILE = "frame_store.json"
+
+
+class FrameStore:
+
+    def __init__(self, data_dir):
+        """
+        Read-only view of a dataset's frame store
+        The array is memory mapped, so frames are read from the page cache (shared between processes) on access,
+        and are never decoded
+
+        :param data_dir: Dataset directory
+        """
+
+        self.data_dir = Path(data_dir)
+        with (self.data_dir / SIDECAR_FILE).open() as f:
+            sidecar = json.load(f)
+
+        self.video_nums = sidecar["video_nums"]
+        self.rows = {video_num: row for row, video_num in enumerate(self.video_nums) if video_num is not None}
+        self.frames = np.load(self.data_dir / STORE_FILE, mmap_mode="r")
+
+    @staticmethod
+    def create(data_dir, num_videos, frame_shape):
+        """
+        Preallocate the array of a frame store
+        Rows are written by opening the array with open_rows, the store can only be read once its sidecar is written
+
+        :param data_dir: Dataset directory
+        :param num_videos: Number of rows
+        :param frame_shape: Shape of the frames of a video, eg. (32, 256, 256, 3)
+        """
+
+        shape = (num_videos, *frame_shape)
+        frames = np.lib.format.open_memmap(Path(data_dir) / STORE_FILE, mode="w+", dtype=np.uint8, shape=shape)
+        del frames
+
+    @staticmethod
+    def open_rows(data_dir):
+        """
+        Open the array of a frame store for writing, each process can write its own rows
+
+        :param data_dir: Dataset directory
+        :return: Writable memory-mapped numpy array
+        """
+
+        return np.load(Path(data_dir) / STORE_FILE, mmap_mode="r+")
+
+    @staticmethod
+    def write_sidecar(data_dir, video_nums):
+        """
+        Write the mapping from rows to video numbers
+
+        :param data_dir: Dataset directory
+        :param video_nums: Video number of each row, None for rows without a video
+        """
+
+        sidecar_file = Path(data_dir) / SIDECAR_FILE
+        tmp_file = sidecar_file.with_name(f"{SIDECAR_FILE}.{os.getpid()}")
+        tmp_file.write_text(json.dumps({"video_nums": video_nums}))
+        os.replace(tmp_file, sidecar_file)
+
+    @property
+    def palette(self):
+        return self.frames.ndim == 4
+
+    def video(self, video_num):
+        """
+        Get the frames of a video without copying them
+
+        :param video_num: Video number
+        :return: Read-only numpy view of the video's frames
+        """
+
+        return self.frames[self.rows[video_num]]
+
+    def rgb_video(self, video_num):
+        """
+        Get the frames of a video as RGB, palette indices are expanded (which copies the frames)
+
+        :param video_num: Video number
+        :return: Numpy array of RGB frames
+        """
+
+        frames = self.video(video_num)
+        return Drawer.to_rgb(frames) if self.palette else frames
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, video_num):
+        return video_num in self.rows
@@ -0,0 +1,173 @@
+# *** Columnar tables of a dataset ***
+# Each table is a dict of equal length numpy columns, with one row per object, event or question
+# Classes, colours and event types are stored as integer codes (see util.vocab)
+# Rows of each video are contiguous and in the same order as the videos table, the offsets table locates them
+
+import numpy as np
+
+from hvqadata.util.schema import video_frames
+from hvqadata.util.vocab import CLASS_CODES, COLOUR_CODES, event_type, event_colours, parse_event
+
+
+NO_CODE = 255
+
+TABLES = ["videos", "objects", "events", "qa"]
+
+COLUMN_DTYPES = {
+    "videos": {"video_id": np.int32, "num_frames": np.uint8, "num_transitions": np.uint8, "num_objects": np.int32,
+               "num_events": np.int32, "num_questions": np.int32},
+    "objects": {"video_id": np.int32, "frame_idx": np.uint8, "class_code": np.uint8, "colour_code": np.uint8,
+                "rotation": np.uint8, "x1": np.int16, "y1": np.int16, "x2": np.int16, "y2": np.int16},
+    "events": {"video_id": np.int32, "frame_idx": np.uint8, "event_code": np.uint8, "from_colour": np.uint8,
+               "to_colour": np.uint8},
+    "qa": {"video_id": np.int32, "question_type": np.uint8, "question": str, "answer": str}
+}
+
+# Column of the videos table which counts the rows of each video in another table
+OFFSET_COUNTS = {"objects": "num_objects", "events": "num_events", "qa": "num_questions"}
+
+
+def event_codes(event):
+    """
+    Find the codes of an event string
+
+    :param event: Event str, eg. 'move' or 'change colour from red to blue'
+    :return: (event code, from colour code, to colour code), colour codes are NO_CODE unless the event changes colour
+    """
+
+    code = parse_event(event)
+    from_colour, to_colour = event_colours(code)
+    if from_colour is None:
+        return event_type(code), NO_CODE, NO_CODE
+
+    return event_type(code), from_colour, to_colour
+
+
+def video_rows(video_id, video):
+    """
+    Flatten a video dictionary into rows of each table
+
+    :param video_id: Video number
+    :param video: Video dictionary, of either schema
+    :return: Dict of list of row tuples for each table, columns are in the order of COLUMN_DTYPES
+    """
+
+    frames = video_frames(video)
+    objects = []
+    for frame_idx, frame in enumerate(frames):
+        for obj in frame["objects"]:
+            x1, y1, x2, y2 = obj["position"]
+            objects.append((video_id, frame_idx, CLASS_CODES[obj["class"]], COLOUR_CODES[obj["colour"]],
+                            obj["rotation"], x1, y1, x2, y2))
+
+    events = []
+    for frame_idx, frame_events in enumerate(video["events"]):
+        for event in frame_events:
+            events.append((video_id, frame_idx, *event_codes(event)))
+
+    qa = list(zip([video_id] * len(video["questions"]), video["question_types"], video["questions"],
+                  video["answers"]))
+
+    videos = [(video_id, len(frames), len(video["events"]), len(objects), len(events), len(qa))]
+    return {"videos": videos, "objects": objects, "events": events, "qa": qa}
+
+
+def build_tables(videos):
+    """
+    Build the tables of a list of videos
+
+    :param videos: List of (video number, video dictionary)
+    :return: Dict of tables, each a dict of numpy columns
+    """
+
+    rows = {table: [] for table in TABLES}
+    for video_id, video in videos:
+        for table, table_rows in video_rows(video_id, video).items():
+            rows[table].extend(table_rows)
+
+    return {table: _to_columns(table, table_rows) for table, table_rows in rows.items()}
+
+
+def concat_tables(tables_list):
+    """
+    Join tables of consecutive chunks of videos
+
+    :param tables_list: List of dicts of tables
+    :return: Dict of tables, empty tables if <tables_list> is empty
+    """
+
+    if len(tables_list) == 0:
+        return {table: _to_columns(table, []) for table in TABLES}
+
+    return {table: {col: np.concatenate([tables[table][col] for tables in tables_list]) for col in columns}
+            for table, columns in COLUMN_DTYPES.items()}
+
+
+def add_offsets(tables):
+    """
+    Add the offsets table, which gives the first row of each video in the objects, events and qa tables
+    offsets[table][i] to offsets[table][i + 1] are the rows of the i-th video in the videos table
+    Note: Updates <tables> in place
+
+    :param tables: Dict of tables
+    """
+
+    videos = tables["videos"]
+    tables["offsets"] = {
+        table: np.concatenate([[0], np.cumsum(videos[count_col], dtype=np.int64)])
+        for table, count_col in OFFSET_COUNTS.items()
+    }
+
+
+def save_tables(path, tables, compressed=True):
+    """
+    Save tables as a single .npz file, with one array for each column named <table>.<column>
+
+    :param path: Path of file
+    :param tables: Dict of tables
+    :param compressed: Compress the file with zlib
+    """
+
+    arrays = {f"{table}.{col}": values for table, columns in tables.items() for col, values in columns.items()}
+    if compressed:
+        np.savez_compressed(path, **arrays)
+    else:
+        np.savez(path, **arrays)
+
+
+def load_tables(path):
+    """
+    Load tables saved by save_tables
+
+    :param path: Path of file
+    :return: Dict of tables, each a dict of numpy columns
+    """
+
+    tables = {}
+    with np.load(path) as arrays:
+        for name in arrays.files:
+            table, col = name.split(".", 1)
+            tables.setdefault(table, {})[col] = arrays[name]
+
+    return tables
+
+
+def video_slice(tables, table, video_idx):
+    """
+    Get the rows of one video
+
+    :param tables: Dict of tables, including the offsets table (see add_offsets)
+    :param table: Name of table
+    :param video_idx: Row of the video in the videos table
+    :return: Dict of numpy column views
+    """
+
+    offsets = tables["offsets"][table]
+    start, end = offsets[video_idx], offsets[video_idx + 1]
+    return {col: values[start:end] for col, values in tables[table].items()}
+
+
+def _to_columns(table, rows):
+    dtypes = COLUMN_DTYPES[table]
+    columns = list(zip(*rows)) if len(rows) > 0 else [[] for _ in dtypes]
+    return {col: np.array(values, dtype=dtype) for (col, dtype), values in zip(dtypes.items(), columns)}
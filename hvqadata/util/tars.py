@@ -0,0 +1,180 @@
+# *** Tar shards of videos (WebDataset-style) ***
+# Each shard-<n>.tar holds a run of consecutive videos, each stored as <key>.json followed by <key>.frame_<i>.png,
+# where <key> is the zero-padded video number. shards.json indexes the shards.
+# Shards can be streamed sequentially without being extracted
+
+import io
+import os
+import json
+import tarfile
+from pathlib import Path
+
+
+INDEX_FILE = "shards.json"
+VIDEOS_PER_TAR_SHARD = 1000
+MAX_TAR_SHARD_BYTES = 2 ** 30
+
+# Tar members are a header block followed by their data, padded to a whole number of blocks
+TAR_BLOCK_SIZE = 512
+
+
+def video_key(video_num):
+    return f"{video_num:08d}"
+
+
+class TarShardWriter:
+
+    def __init__(self, out_dir, videos_per_shard=VIDEOS_PER_TAR_SHARD, max_bytes=MAX_TAR_SHARD_BYTES):
+        """
+        Write videos to tar shards, a new shard is started once a shard holds <videos_per_shard> videos,
+        or when the next video would take its members over <max_bytes> (a larger video gets a shard of its own)
+        A shard is written to a temporary file and renamed once it is complete, the index is written on close
+        Members have fixed metadata, so the same videos always produce the same shards
+        Not thread safe, videos should be written from a single thread
+        Can be used as a context manager
+
+        :param out_dir: Directory to write shards to
+        :param videos_per_shard: Maximum number of videos in each shard
+        :param max_bytes: Maximum size of the members of each shard in bytes, or None for no limit
+        """
+
+        self.out_dir = Path(out_dir)
+        self.videos_per_shard = videos_per_shard
+        self.max_bytes = max_bytes
+        self.shards = []
+        self._tar = None
+        self._tmp_file = None
+        self._shard_bytes = 0
+
+    def write(self, video_num, json_text, frames):
+        """
+        Append a video to the current shard
+
+        :param video_num: Video number
+        :param json_text: Json text of video
+        :param frames: List of encoded PNGs (bytes), one for each frame
+        """
+
+        json_data = json_text.encode()
+        video_bytes = sum(_member_bytes(len(data)) for data in [json_data, *frames])
+        if self._tar is None or len(self.shards[-1]["videos"]) == self.videos_per_shard or \
+                (self.max_bytes is not None and self._shard_bytes + video_bytes > self.max_bytes):
+            self._next_shard()
+
+        key = video_key(video_num)
+        self._add(f"{key}.json", json_data)
+        for i, data in enumerate(frames):
+            self._add(f"{key}.frame_{i}.png", data)
+
+        self.shards[-1]["videos"].append(video_num)
+        self._shard_bytes += video_bytes
+
+    def close(self):
+        self._finish_shard()
+
+        index = {"videos_per_shard": self.videos_per_shard, "max_bytes": self.max_bytes, "shards": self.shards}
+        index_file = self.out_dir / INDEX_FILE
+        tmp_file = index_file.with_name(f"{INDEX_FILE}.{os.getpid()}")
+        tmp_file.write_text(json.dumps(index))
+        os.replace(tmp_file, index_file)
+
+    def _add(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mode = 0o644
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def _next_shard(self):
+        self._finish_shard()
+
+        shard_name = f"shard-{len(self.shards):05d}.tar"
+        self._tmp_file = self.out_dir / f"{shard_name}.tmp"
+        self._tar = tarfile.open(self._tmp_file, "w", format=tarfile.USTAR_FORMAT)
+        self.shards.append({"file": shard_name, "videos": []})
+        self._shard_bytes = 0
+
+    def _finish_shard(self):
+        if self._tar is None:
+            return
+
+        self._tar.close()
+        shard_file = self.out_dir / self.shards[-1]["file"]
+        os.replace(self._tmp_file, shard_file)
+        self.shards[-1]["size"] = shard_file.stat().st_size
+        self._tar = None
+        self._tmp_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _member_bytes(size):
+    return TAR_BLOCK_SIZE + -(-size // TAR_BLOCK_SIZE) * TAR_BLOCK_SIZE
+
+
+class TarShardReader:
+
+    def __init__(self, shard_dir):
+        """
+        Streaming reader for videos stored in tar shards
+
+        :param shard_dir: Directory containing shards and their index
+        """
+
+        self.shard_dir = Path(shard_dir)
+        with (self.shard_dir / INDEX_FILE).open() as f:
+            self.index = json.load(f)
+
+    def shard_files(self):
+        """
+        :return: List of paths of every shard, eg. to split shards between data loader workers
+        """
+
+        return [self.shard_dir / shard["file"] for shard in self.index["shards"]]
+
+    def shard_of(self, video_num):
+        """
+        :param video_num: Video number
+        :return: Path of the shard containing the video, or None if no shard contains it
+        """
+
+        for shard in self.index["shards"]:
+            if video_num in shard["videos"]:
+                return self.shard_dir / shard["file"]
+
+        return None
+
+    def __iter__(self):
+        for shard_file in self.shard_files():
+            yield from iter_tar_shard(shard_file)
+
+
+def iter_tar_shard(shard_file):
+    """
+    Stream the videos in a tar shard, in the order they were written
+    The shard is read sequentially, members are never extracted to disk
+
+    :param shard_file: Path of shard
+    :return: Generator of dicts, each with video_num, json (text) and frames (list of PNG bytes)
+    """
+
+    sample = None
+    with tarfile.open(shard_file, "r|") as tar:
+        for member in tar:
+            key, ext = member.name.split(".", 1)
+            data = tar.extractfile(member).read()
+            if sample is None or sample["video_num"] != int(key):
+                if sample is not None:
+                    yield sample
+                sample = {"video_num": int(key), "json": None, "frames": []}
+
+            if ext == "json":
+                sample["json"] = data.decode()
+            else:
+                sample["frames"].append(data)
+
+    if sample is not None:
+        yield sample
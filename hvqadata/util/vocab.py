@@ -0,0 +1,114 @@
+# *** Integer-coded vocabularies of object classes, colours, rotations and events ***
+# The code of a class, colour or event type is its index in CLASSES, COLOURS or EVENTS, a rotation is its own code
+# Codes are used internally and in compact outputs, strings are only produced for json and questions
+# A colour change event's code also holds its colours, so any event is a single int:
+#   CHANGE_COLOUR + NUM_EVENTS * (1 + from colour * NUM_COLOURS + to colour)
+# The type of an event code (or numpy array of codes) is code % NUM_EVENTS
+
+import numpy as np
+
+from hvqadata.util.definitions import *
+from hvqadata.util.exceptions import UnknownEventException
+
+
+CLASS_CODES = {cls: code for code, cls in enumerate(CLASSES)}
+COLOUR_CODES = {colour: code for code, colour in enumerate(COLOURS)}
+EVENT_CODES = {event: code for code, event in enumerate(EVENTS)}
+
+NUM_CLASSES = len(CLASSES)
+NUM_COLOURS = len(COLOURS)
+NUM_EVENTS = len(EVENTS)
+
+MOVE = EVENT_CODES[MOVE_EVENT]
+ROTATE_LEFT = EVENT_CODES[ROTATE_LEFT_EVENT]
+ROTATE_RIGHT = EVENT_CODES[ROTATE_RIGHT_EVENT]
+EAT_FISH = EVENT_CODES[EAT_FISH_EVENT]
+EAT_BAG = EVENT_CODES[EAT_BAG_EVENT]
+CHANGE_COLOUR = EVENT_CODES[CHANGE_COLOUR_EVENT]
+NOTHING = EVENT_CODES[NO_EVENT]
+
+ACTION_CODES = [EVENT_CODES[action] for action in ACTIONS]
+
+
+def colour_change_code(from_colour, to_colour):
+    """
+    :param from_colour: Colour code of the octopus before the change
+    :param to_colour: Colour code of the octopus after the change
+    :return: Event code
+    """
+
+    return CHANGE_COLOUR + NUM_EVENTS * (1 + from_colour * NUM_COLOURS + to_colour)
+
+
+def event_type(code):
+    """
+    :param code: Event code, or numpy array of event codes
+    :return: Event type code (index in EVENTS), or numpy array of type codes
+    """
+
+    return code % NUM_EVENTS
+
+
+def event_colours(code):
+    """
+    :param code: Event code
+    :return: (from colour code, to colour code) of a colour change event, (None, None) for other events
+    """
+
+    if code < NUM_EVENTS:
+        return None, None
+
+    from_colour, to_colour = divmod(code // NUM_EVENTS - 1, NUM_COLOURS)
+    return from_colour, to_colour
+
+
+def event_str(code):
+    """
+    :param code: Event code
+    :return: Event str, eg. 'move' or 'change colour from red to blue'
+    """
+
+    if code < NUM_EVENTS:
+        return EVENTS[code]
+
+    from_colour, to_colour = event_colours(code)
+    return COLOUR_CHANGE_EVENT.format(from_colour=COLOURS[from_colour], to_colour=COLOURS[to_colour])
+
+
+def parse_event(event):
+    """
+    :param event: Event str, eg. 'move' or 'change colour from red to blue'
+    :return: Event code
+    """
+
+    code = EVENT_CODES.get(event)
+    if code is not None:
+        return code
+
+    words = event.split(" ")
+    if event.startswith(CHANGE_COLOUR_EVENT) and len(words) == 6:
+        return colour_change_code(COLOUR_CODES[words[3]], COLOUR_CODES[words[5]])
+
+    raise UnknownEventException(f"Unknown event: {event}")
+
+
+def parse_events(frame_events):
+    """
+    Code the events of a video
+
+    :param frame_events: List of lists of event strs, one list for each frame transition
+    :return: (numpy array of event codes, numpy array of the frame transition of each event)
+    """
+
+    codes = [parse_event(event) for events in frame_events for event in events]
+    frame_idxs = [idx for idx, events in enumerate(frame_events) for _ in events]
+    return np.array(codes, dtype=np.int32), np.array(frame_idxs, dtype=np.int32)
+
+
+def count_event_types(codes):
+    """
+    :param codes: Numpy array (or list) of event codes
+    :return: Numpy array of the number of events of each type
+    """
+
+    return np.bincount(event_type(np.asarray(codes, dtype=np.int32)), minlength=NUM_EVENTS)
@@ -0,0 +1,123 @@
+# *** Asynchronous writer stage for builds ***
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class WriterStats:
+
+    def __init__(self):
+        """
+        Metrics collected by an AsyncWriter
+        """
+
+        self.num_jobs = 0
+        self.total_depth = 0
+        self.max_depth = 0
+        self.stall_time = 0.0
+
+    def merge(self, other):
+        """
+        Add the metrics of another writer to this one
+        Note: Updates self in place
+
+        :param other: WriterStats
+        """
+
+        self.num_jobs += other.num_jobs
+        self.total_depth += other.total_depth
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.stall_time += other.stall_time
+
+    def __str__(self):
+        mean_depth = self.total_depth / max(1, self.num_jobs)
+        return f"{self.num_jobs} jobs, mean queue depth {mean_depth:.2f}, max queue depth {self.max_depth}, " \
+               f"producers stalled for {self.stall_time:.2f}s"
+
+
+class AsyncWriter:
+
+    def __init__(self, num_threads, max_queue):
+        """
+        Run write jobs on dedicated threads, fed by a bounded queue
+        Submitting a job blocks while the queue is full, which limits the memory held by waiting jobs
+        Can be used as a context manager, all jobs are finished on exit
+
+        :param num_threads: Number of writer threads
+        :param max_queue: Maximum number of jobs waiting in the queue
+        """
+
+        self.stats = WriterStats()
+        self._queue = queue.Queue(max_queue)
+        self._error = None
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(num_threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func, *args):
+        """
+        Add a job to the queue, blocking while the queue is full
+        Raises the first error raised by any earlier job, so producers stop as soon as a write fails
+
+        :param func: Function to run on a writer thread
+        :param args: Arguments for <func>
+        :return: Future of the result of <func>
+        """
+
+        if self._error is not None:
+            raise self._error
+
+        future = Future()
+        depth = self._queue.qsize()
+        start = time.perf_counter()
+        self._queue.put((future, func, args))
+        self.stats.stall_time += time.perf_counter() - start
+        self.stats.num_jobs += 1
+        self.stats.total_depth += depth
+        self.stats.max_depth = max(self.stats.max_depth, depth)
+        return future
+
+    def close(self):
+        """
+        Wait for all jobs to finish and stop the writer threads
+        Raises the first error raised by any job
+
+        :return: WriterStats
+        """
+
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+        return self.stats
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+
+            future, func, args = job
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                if self._error is None:
+                    self._error = e
+                future.set_exception(e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.close()
+        except BaseException:
+            # Don't replace an error which is already being raised
+            if exc_type is None:
+                raise
@@ -2,17 +2,22 @@ import math
 import random
 
 from hvqadata.video.frame_object import FrameObject
+from hvqadata.util.backend import get_backend
 from hvqadata.util.definitions import *
 from hvqadata.util.exceptions import *
+from hvqadata.util.vocab import NOTHING, EAT_FISH, EAT_BAG, COLOUR_CODES, colour_change_code
 
 
 class Frame:
 
-    def __init__(self):
+    def __init__(self, rng=random):
         """
         Initialisation method
+
+        :param rng: Random number generator (random.Random or the random module) used to create and move objects
         """
 
+        self.rng = rng
         self.static_objects = []
         self._remaining_segments = [(i, j) for i in range(NUM_SEGMENTS) for j in range(NUM_SEGMENTS)]
         self.octopus = None
@@ -34,7 +39,7 @@ class Frame:
         :return: List of four points: x1, y1, x2, y2
         """
 
-        x_seg, y_seg = random.choice(self._remaining_segments)
+        x_seg, y_seg = self.rng.choice(self._remaining_segments)
         self._remaining_segments.remove((x_seg, y_seg))
 
         width = obj_size[0]
@@ -43,8 +48,8 @@ class Frame:
             width = obj_size[1]
             height = obj_size[0]
 
-        obj_x = random.randint((x_seg * SEGMENT_SIZE) + EDGE, ((x_seg + 1) * SEGMENT_SIZE) - (width + EDGE))
-        obj_y = random.randint((y_seg * SEGMENT_SIZE) + EDGE, ((y_seg + 1) * SEGMENT_SIZE) - (height + EDGE))
+        obj_x = self.rng.randint((x_seg * SEGMENT_SIZE) + EDGE, ((x_seg + 1) * SEGMENT_SIZE) - (width + EDGE))
+        obj_y = self.rng.randint((y_seg * SEGMENT_SIZE) + EDGE, ((y_seg + 1) * SEGMENT_SIZE) - (height + EDGE))
 
         return [obj_x, obj_y, obj_x + width - 1, obj_y + height - 1]
 
@@ -62,15 +67,15 @@ class Frame:
 
     def _gen_static_objects(self, obj_type):
         if obj_type == "fish":
-            num_objs = random.randint(MIN_FISH, MAX_FISH)
+            num_objs = self.rng.randint(MIN_FISH, MAX_FISH)
             objs = self._create_fish(num_objs)
 
         elif obj_type == "rock":
-            num_objs = random.randint(MIN_ROCK, MAX_ROCK)
+            num_objs = self.rng.randint(MIN_ROCK, MAX_ROCK)
             objs = self._create_rocks(num_objs)
 
         elif obj_type == "bag":
-            num_objs = random.randint(MIN_BAG, MAX_BAG)
+            num_objs = self.rng.randint(MIN_BAG, MAX_BAG)
             objs = self._create_bags(num_objs)
 
         else:
@@ -82,7 +87,7 @@ class Frame:
     def _create_fish(self, num_objs):
         obj_list = []
         rotations = ROTATIONS[:]
-        random.shuffle(rotations)
+        self.rng.shuffle(rotations)
         for idx in range(num_objs):
             idx = idx % len(rotations)
             rotation = rotations[idx]
@@ -95,7 +100,7 @@ class Frame:
     def _create_rocks(self, num_objs):
         obj_list = []
         colours = ROCK_COLOURS[:]
-        random.shuffle(colours)
+        self.rng.shuffle(colours)
         for idx in range(num_objs):
             idx = idx % len(colours)
             colour = colours[idx]
@@ -108,7 +113,7 @@ class Frame:
     def _create_bags(self, num_objs):
         obj_list = []
         rotations = ROTATIONS[:]
-        random.shuffle(rotations)
+        self.rng.shuffle(rotations)
         for idx in range(num_objs):
             idx = idx % len(rotations)
             rotation = rotations[idx]
@@ -122,20 +127,20 @@ class Frame:
         """
         Move or rotate the octopus
 
-        :return Next frame, with all objects updated and list of events which occurred
+        :return Next frame, with all objects updated and list of codes of events which occurred
         """
 
-        next_frame = Frame()
+        next_frame = Frame(self.rng)
         next_frame.static_objects = [obj.copy(next_frame) for obj in self.static_objects]
 
         # If the octopus has already disappeared then nothing happens
         if self.octopus is None:
             next_frame.octopus = None
-            return next_frame, [NO_EVENT]
+            return next_frame, [NOTHING]
 
         next_frame.octopus = self.octopus.copy(next_frame)
 
-        rand = random.random()
+        rand = self.rng.random()
         if rand <= ROT_PROB:
             event = next_frame.octopus.rotate()
         else:
@@ -151,36 +156,42 @@ class Frame:
         If the octopus is close to a bag, both objects disappear
         If the octopus is close to a rock, the octopus changes colour to the rock's colour
 
-        :return: List of events
+        :return: List of event codes
         """
 
         events = []
         remove_octopus = False
 
+        # Objects don't move while the frame is updated, so closeness can be found for all objects at once
+        positions = [obj.position for obj in self.static_objects]
+        close = get_backend().close_to_box(self.octopus.position, positions, CLOSE_OCTO)
+        close_objs = set([id(obj) for obj, is_close in zip(self.static_objects, close) if is_close])
+
         rock_dist = None
         closest_rock_idx = None
         for idx, obj in enumerate(self.static_objects):
-            if self.close_to_octopus(obj) and obj.obj_type == "rock":
+            if id(obj) in close_objs and obj.obj_type == "rock":
                 dist = self.distance(obj, self.octopus)
                 if rock_dist is None or dist < rock_dist:
                     rock_dist = dist
                     closest_rock_idx = idx
 
         for idx, obj in enumerate(self.static_objects):
-            if self.close_to_octopus(obj):
+            if id(obj) in close_objs:
                 if obj.obj_type == "fish":
                     self.static_objects.remove(obj)
-                    events.append(EAT_FISH_EVENT)
+                    events.append(EAT_FISH)
 
                 elif obj.obj_type == "bag":
                     self.static_objects.remove(obj)
                     remove_octopus = True
-                    events.append(EAT_BAG_EVENT)
+                    events.append(EAT_BAG)
 
                 # Need nested check so we can throw UnknownObjectType
                 elif obj.obj_type == "rock":
                     if idx == closest_rock_idx and obj.colour != self.octopus.colour:
-                        events.append(COLOUR_CHANGE_EVENT.format(from_colour=self.octopus.colour, to_colour=obj.colour))
+                        from_colour = COLOUR_CODES[self.octopus.colour]
+                        events.append(colour_change_code(from_colour, COLOUR_CODES[obj.colour]))
                         self.octopus.colour = obj.colour
 
                 else:
@@ -212,25 +223,8 @@ class Frame:
         :return: bool
         """
 
-        octo_x1, octo_y1, octo_x2, octo_y2 = self.octopus.position
-        octo_x1 -= CLOSE_OCTO
-        octo_x2 += CLOSE_OCTO
-        octo_y1 -= CLOSE_OCTO
-        octo_y2 += CLOSE_OCTO
-
-        x1, y1, x2, y2 = obj.position
-        obj_corners = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
-
-        x_overlap = x2 >= octo_x2 and x1 <= octo_x1
-        y_overlap = y2 >= octo_y2 and y1 <= octo_y1
-
-        for x, y in obj_corners:
-            match_x = octo_x1 <= x <= octo_x2 or x_overlap
-            match_y = octo_y1 <= y <= octo_y2 or y_overlap
-            if match_x and match_y:
-                return True
-
-        return False
+        [close] = get_backend().close_to_box(self.octopus.position, [obj.position], CLOSE_OCTO)
+        return close
 
     def to_dict(self):
         objs = self.get_objects()
@@ -1,7 +1,7 @@
-import random
-
+from hvqadata.util.backend import get_backend
 from hvqadata.util.definitions import *
 from hvqadata.util.exceptions import *
+from hvqadata.util.vocab import MOVE, ROTATE_LEFT, ROTATE_RIGHT
 
 
 class FrameObject:
@@ -52,7 +52,7 @@ class FrameObject:
     #         raise UnknownObjectTypeException()
 
     def init_octopus(self):
-        rot = random.choice(ROTATIONS)
+        rot = self.frame.rng.choice(ROTATIONS)
         box = self.frame.obj_box(OCTOPUS, rot)
         self.obj_type = "octopus"
         self.position = box
@@ -86,16 +86,16 @@ class FrameObject:
         Rotate the object left or right with equal probability
         Note: We assume the octopus is square
 
-        :return: Event (rotate_left or rotate_right) (str)
+        :return: Event code (rotate left or rotate right)
         """
 
-        rand = random.random()
+        rand = self.frame.rng.random()
         if rand < 0.5:
             self._rotate_left()
-            event = ROTATE_LEFT_EVENT
+            event = ROTATE_LEFT
         else:
             self._rotate_right()
-            event = ROTATE_RIGHT_EVENT
+            event = ROTATE_RIGHT
 
         return event
 
@@ -116,27 +116,14 @@ class FrameObject:
 
         :param move_pixels: Number of pixels the octopus is moved by
         :param frame_size: Max length of frame
-        :return: Event which occurred (only 'move' or 'rotate')
+        :return: Code of event which occurred (only move or rotate)
         """
 
-        x1, y1, x2, y2 = self.position
-        if self.rotation == 0:
-            y1 -= move_pixels
-            y2 -= move_pixels
-        elif self.rotation == 1:
-            x1 += move_pixels
-            x2 += move_pixels
-        elif self.rotation == 2:
-            y1 += move_pixels
-            y2 += move_pixels
-        elif self.rotation == 3:
-            x1 -= move_pixels
-            x2 -= move_pixels
-
         max_pixel = frame_size - EDGE
-        if (0 <= x1 < max_pixel) and (0 <= x2 < max_pixel) and (0 <= y1 < max_pixel) and (0 <= y2 < max_pixel):
-            self.position = [x1, y1, x2, y2]
-            event = MOVE_EVENT
+        position = get_backend().move_box(self.position, self.rotation, move_pixels, max_pixel)
+        if position is not None:
+            self.position = position
+            event = MOVE
         else:
             event = self.rotate()
 
@@ -4,12 +4,24 @@ import hvqadata.util.func as util
 from hvqadata.util.exceptions import UnknownObjectTypeException
 from hvqadata.video.frame import Frame
 from hvqadata.util.definitions import *
+from hvqadata.util.vocab import MOVE, EAT_BAG, NOTHING, NUM_EVENTS, ACTION_CODES, event_type, event_str, \
+    count_event_types
 
 
 class Video:
 
-    def __init__(self):
+    def __init__(self, rng=random):
+        """
+        Initialisation method
+
+        :param rng: Random number generator (random.Random or the random module) used for the whole video
+                    Use util.func.video_rng to create a generator which only depends on the video number
+        """
+
+        self.rng = rng
         self.frames = []
+
+        # Event codes (see util.vocab) of each frame transition
         self.events = []
         self.questions = []
         self.answers = []
@@ -32,7 +44,7 @@ class Video:
         ]
 
     def random_video(self):
-        initial = Frame()
+        initial = Frame(self.rng)
         initial.random_frame()
         self.frames.append(initial)
 
@@ -60,13 +72,13 @@ class Video:
             qa_pair = None
             func_idx = None
 
-            if cf_extra_sample and random.random() < cf_prob:
+            if cf_extra_sample and self.rng.random() < cf_prob:
                 qa_pair = self._gen_counterfactual_question()
                 func_idx = 8
 
             else:
                 func_idxs = list(range(len(self._question_funcs)))
-                random.shuffle(func_idxs)
+                self.rng.shuffle(func_idxs)
                 for func_idx in func_idxs:
                     q_func = self._question_funcs[func_idx]
                     qa_pair = q_func()
@@ -91,7 +103,7 @@ class Video:
         :return: (question: str, answer: str)
         """
 
-        frame_idx = random.randint(0, NUM_FRAMES - 1)
+        frame_idx = self.rng.randint(0, NUM_FRAMES - 1)
         frame = self.frames[frame_idx]
 
         # Find obj for question
@@ -114,7 +126,7 @@ class Video:
         if unique_prop != "class":
             props.remove(unique_prop)
 
-        idx = random.randint(0, len(props) - 1)
+        idx = self.rng.randint(0, len(props) - 1)
         prop = props[idx]
         prop_val = obj.get_prop_val(prop)
 
@@ -138,8 +150,8 @@ class Video:
 
         # Randomly select a (un)relation to use
         rel_q_prob = 0.5
-        rel_q = random.random() < rel_q_prob
-        idx = random.randint(0, len(self._relations) - 1)
+        rel_q = self.rng.random() < rel_q_prob
+        idx = self.rng.randint(0, len(self._relations) - 1)
         rel_func, rel_str = self._relations[idx]
 
         rels, frame_idx = self._sample_relation(rel_func, rel_q)
@@ -147,7 +159,7 @@ class Video:
         # If cannot find required relation use either above or below
         if rels is None:
             rel_funcs = [(util.above, "above"), (util.below, "below")]
-            random.shuffle(rel_funcs)
+            self.rng.shuffle(rel_funcs)
             for rel_func, rel_str_ in rel_funcs:
                 rels, frame_idx = self._sample_relation(rel_func, rel_q)
                 if rels is not None:
@@ -158,7 +170,7 @@ class Video:
         if rels is None:
             return None
 
-        rel_idx = random.randint(0, len(rels) - 1)
+        rel_idx = self.rng.randint(0, len(rels) - 1)
         rel = rels[rel_idx]
         obj1_str, obj2_str = rel
 
@@ -178,7 +190,7 @@ class Video:
 
         actions = {}
         for idx, events in enumerate(self.events):
-            events = [event for event in events if event in ACTIONS]
+            events = [event for event in events if event in ACTION_CODES]
 
             assert len(events) <= 1, f"Multiple actions in a single frame: {events}"
 
@@ -186,14 +198,14 @@ class Video:
                 util.append_in_dict_(actions, events[0], idx)
 
         action_set = list(actions.keys())
-        idx = random.randint(0, len(action_set) - 1)
+        idx = self.rng.randint(0, len(action_set) - 1)
         action = action_set[idx]
         frame_idxs = actions[action]
-        idx = random.randint(0, len(frame_idxs) - 1)
+        idx = self.rng.randint(0, len(frame_idxs) - 1)
         frame_idx = frame_idxs[idx]
 
         question = f"Which action occurred immediately after frame {frame_idx}?"
-        answer = action
+        answer = EVENTS[action]
 
         return question, answer
 
@@ -227,7 +239,7 @@ class Video:
                     rotation = obj.rotation
 
         props = list(deltas.keys())
-        random.shuffle(props)
+        self.rng.shuffle(props)
 
         prop = None
         delta = None
@@ -236,7 +248,7 @@ class Video:
         for prop_ in props:
             prop_deltas = deltas[prop_]
             if len(prop_deltas) != 0:
-                idx = random.randint(0, len(prop_deltas) - 1)
+                idx = self.rng.randint(0, len(prop_deltas) - 1)
                 delta = prop_deltas[idx]
                 prop = prop_
 
@@ -264,15 +276,14 @@ class Video:
         """
 
         event_counts = self._count_events()
-        if event_counts.get(NO_EVENT) is not None:
-            del event_counts[NO_EVENT]
+        del event_counts[NOTHING]
 
         events = list(event_counts.keys())
-        idx = random.randint(0, len(events) - 1)
+        idx = self.rng.randint(0, len(events) - 1)
         event = events[idx]
         count = event_counts[event]
 
-        question = f"How many times does the octopus {event}?"
+        question = f"How many times does the octopus {EVENTS[event]}?"
         answer = str(count)
 
         return question, answer
@@ -288,11 +299,10 @@ class Video:
         """
 
         event_counts = self._count_events()
-        if event_counts.get(NO_EVENT) is not None:
-            del event_counts[NO_EVENT]
+        del event_counts[NOTHING]
 
         events = list(event_counts.keys())
-        random.shuffle(events)
+        self.rng.shuffle(events)
 
         # Track the number of times each count occurs
         counts = {}
@@ -313,7 +323,7 @@ class Video:
             return None
 
         question = f"What does the octopus do {question_count} times?"
-        answer = question_event
+        answer = EVENTS[question_event]
 
         return question, answer
 
@@ -330,23 +340,20 @@ class Video:
         event_idxs = self._event_frame_idxs()
 
         # We don't care about frames that we know the octopus is not in
-        if event_idxs.get(NO_EVENT) is not None:
-            del event_idxs[NO_EVENT]
-        if event_idxs.get(EAT_BAG_EVENT) is not None:
-            del event_idxs[EAT_BAG_EVENT]
+        del event_idxs[NOTHING]
+        del event_idxs[EAT_BAG]
 
         # Move events are likely to be difficult to express succinctly
-        if event_idxs.get(MOVE_EVENT) is not None:
-            del event_idxs[MOVE_EVENT]
+        del event_idxs[MOVE]
 
         # Remove events which we can't make a question out of
         for event, idxs in event_idxs.items():
             idxs = [idx for idx in idxs if idx < NUM_FRAMES - 2]
-            idxs = [idx for idx in idxs if NO_EVENT not in set(self.events[idx + 1])]
+            idxs = [idx for idx in idxs if NOTHING not in self.events[idx + 1]]
             event_idxs[event] = idxs
 
         events = list(event_idxs.keys())
-        random.shuffle(events)
+        self.rng.shuffle(events)
 
         question_event = None
         nth = None
@@ -359,7 +366,7 @@ class Video:
                 idxs = idxs[:MAX_OCCURRENCE]
 
             if len(idxs) > 0:
-                idx = random.randint(0, len(idxs) - 1)
+                idx = self.rng.randint(0, len(idxs) - 1)
                 nth, frame_idx = list(enumerate(idxs))[idx]
                 question_event = event
                 if len(idxs) == 1:
@@ -371,13 +378,13 @@ class Video:
 
         # Find next action (answer)
         actions = self.events[frame_idx + 1]
-        actions = [action for action in actions if action in ACTIONS]
+        actions = [action for action in actions if action in ACTION_CODES]
 
         assert len(actions) == 1, f"Multiple (or no) actions in a single frame: {actions}"
 
-        action = actions[0]
+        action = EVENTS[actions[0]]
 
-        event_noun = EVENTS_TO_NOUN[question_event]
+        event_noun = EVENTS_TO_NOUN[EVENTS[question_event]]
         occurrence_str = self._format_occ_str(nth + 1, is_single_occ)
         question = f"What does the octopus do immediately after {event_noun}{occurrence_str}?"
         answer = action
@@ -396,7 +403,7 @@ class Video:
         # Find disappeared objs
         disappear = self._find_disappear_objs(self.frames)
         disappear = [obj for obj, _ in disappear]
-        random.shuffle(disappear)
+        self.rng.shuffle(disappear)
 
         # Find an obj with a unique rotation within the disappeared list
         unique_obj = None
@@ -438,7 +445,7 @@ class Video:
         unique_objs = self._find_unique_objs(self.frames[0])
         unique_rocks = [obj for obj, _ in unique_objs if obj.obj_type == "rock"]
         unique_colours = [rock.colour for rock in unique_rocks]
-        random.shuffle(unique_colours)
+        self.rng.shuffle(unique_colours)
 
         # If no unique rocks, we cannot sample this type of question
         if len(unique_rocks) == 0:
@@ -446,7 +453,7 @@ class Video:
 
         colour_changes = self._find_colour_changes(self.frames)
         idxs = list(range(len(colour_changes)))
-        random.shuffle(idxs)
+        self.rng.shuffle(idxs)
 
         if len(colour_changes) == 0:
             return None
@@ -507,7 +514,7 @@ class Video:
 
     def _sample_relation(self, rel_func, rel_q):
         frame_idxs = list(range(NUM_FRAMES))
-        random.shuffle(frame_idxs)
+        self.rng.shuffle(frame_idxs)
 
         frame_idx = None
         rels = None
@@ -529,26 +536,28 @@ class Video:
         return rels, frame_idx
 
     def _event_frame_idxs(self):
-        idxs = {event: [] for event in EVENTS}
+        """
+        Find the frame transitions in which each type of event occurs
+
+        :return: Dict from event type code to list of frame transition indices, for every event type
+        """
+
+        idxs = {code: [] for code in range(NUM_EVENTS)}
         for idx, events in enumerate(self.events):
             for event in events:
-                if event[:CHANGE_COLOUR_LENGTH] == "change colour":
-                    event = "change colour"
-
-                idxs[event].append(idx)
+                idxs[event_type(event)].append(idx)
 
         return idxs
 
     def _count_events(self):
-        counts = {event: 0 for event in EVENTS}
-        for events in self.events:
-            for event in events:
-                if event[:CHANGE_COLOUR_LENGTH] == "change colour":
-                    event = "change colour"
+        """
+        Count the events of each type
 
-                counts[event] += 1
+        :return: Dict from event type code to number of events, for every event type
+        """
 
-        return counts
+        counts = count_event_types([event for events in self.events for event in events])
+        return {code: int(count) for code, count in enumerate(counts)}
 
     def _find_unique_objs(self, frame):
         """
@@ -606,15 +615,15 @@ class Video:
         """
 
         objs = frame.get_objects()
-        classes = list(set([obj.obj_type for obj in objs]))
-        random.shuffle(classes)
+        classes = sorted(set([obj.obj_type for obj in objs]))
+        self.rng.shuffle(classes)
 
         unique_obj = None
         prop = None
 
         for cls in classes:
             cls_objs = [obj for obj in objs if obj.obj_type == cls]
-            random.shuffle(cls_objs)
+            self.rng.shuffle(cls_objs)
             for obj in cls_objs:
                 prop = self._unique_prop(obj, cls_objs)
                 if prop is not None:
@@ -629,8 +638,7 @@ class Video:
 
         return unique_obj, prop
 
-    @staticmethod
-    def _unique_prop(obj, objs):
+    def _unique_prop(self, obj, objs):
         """
         Find name of property which uniquely identifies <obj> within <objs>
         Return None if none exist
@@ -665,7 +673,7 @@ class Video:
 
         num_props = len(unique_props)
         if num_props > 1:
-            idx = random.randint(0, num_props - 1)
+            idx = self.rng.randint(0, num_props - 1)
             return unique_props[idx]
         elif num_props == 1:
             return unique_props[0]
@@ -699,7 +707,7 @@ class Video:
     def to_dict(self):
         return {
             "frames": [frame.to_dict() for frame in self.frames],
-            "events": self.events,
+            "events": [[event_str(event) for event in events] for events in self.events],
             "questions": self.questions,
             "answers": self.answers,
             "question_types": self.q_idxs